@@ -0,0 +1,55 @@
+#!/usr/bin/env python
+'''
+Pack cached data request versions into a bundle (zip archive) for use on machines without
+internet access, and import or verify such bundles.
+'''
+import argparse
+import sys
+
+import data_request_api.content.dreq_content as dc
+
+
+def parse_args():
+
+    parser = argparse.ArgumentParser(
+        description='Pack cached data request versions into a bundle, or import or verify a bundle.',
+        epilog='A bundle can also be used without importing it, by listing it as read-only '
+               'cache root in the cache_dir config option.'
+    )
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    create = subparsers.add_parser('create', help='pack cached versions into a bundle')
+    create.add_argument('bundle', help='path of the bundle (zip archive) to create')
+    create.add_argument('versions', nargs='*', default=['all'],
+                        help='versions to pack (default: all cached versions)')
+
+    import_ = subparsers.add_parser('import', help='extract a bundle into the cache')
+    import_.add_argument('bundle', help='path of the bundle')
+
+    verify = subparsers.add_parser('verify', help='verify a bundle against its hash manifest')
+    verify.add_argument('bundle', help='path of the bundle')
+
+    return parser.parse_args()
+
+
+def main():
+
+    args = parse_args()
+
+    if args.command == 'create':
+        versions = 'all' if args.versions == ['all'] else args.versions
+        versions = dc.export_bundle(args.bundle, version=versions)
+        print(f'Packed version(s) {versions} into {args.bundle}')
+    elif args.command == 'import':
+        versions = dc.import_bundle(args.bundle)
+        print(f'Imported version(s) {versions} into {dc._dreq_res}')
+    elif args.command == 'verify':
+        corrupt = dc.verify_bundle(args.bundle)
+        if corrupt:
+            print('Missing or corrupt file(s): ' + ', '.join(corrupt))
+            sys.exit(1)
+        print(f'{args.bundle} is intact')
+
+
+if __name__ == '__main__':
+    main()
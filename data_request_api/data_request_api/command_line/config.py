@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
 
 import argparse
+import time
 
 from data_request_api.utilities import config as dreqcfg
 
@@ -14,12 +15,17 @@ def main():
       i.e. create a config file with default values if it does not exist.
   list: List all keys in the config file.
   reset: Reset the config file to default values.
+  usage: List the disk usage and last access time of the cached versions.
+  evict: Evict the least recently used versions from the cache until it fits
+      into the cache budget (cache_max_size).
   <key> <value>: Update a specific key in the config file.
   help: print this help message.
 
 Examples:
   CMIP7_data_request_api_config offline true
-  CMIP7_data_request_api_config reset""",
+  CMIP7_data_request_api_config reset
+  CMIP7_data_request_api_config cache_max_size 2000000000
+  CMIP7_data_request_api_config evict""",
     )
 
     if parser.prog.startswith("config"):
@@ -48,6 +54,21 @@ Examples:
     elif args.command[0] == "list":
         for key, value in dreqcfg.load_config().items():
             print(f"{key}: {value}")
+    elif args.command[0] == "usage":
+        from data_request_api.content import dreq_content as dc
+
+        usage = dc.get_cache_usage()
+        for version, version_usage in usage.items():
+            last_access = time.strftime(
+                "%Y-%m-%d %H:%M:%S", time.localtime(version_usage["last_access"])
+            )
+            print(f"{version}: {version_usage['size']} bytes, last accessed {last_access}")
+        print(f"Total: {sum(u['size'] for u in usage.values())} bytes")
+    elif args.command[0] == "evict":
+        from data_request_api.content import dreq_content as dc
+
+        evicted = dc.evict()
+        print(f"Evicted version(s): {evicted}" if evicted else "No version evicted.")
     elif len(args.command) == 2:
         dreqcfg.update_config(args.command[0], args.command[1])
     else:
@@ -16,6 +16,33 @@ from data_request_api.content.utils import _parse_version
 BLOCK_SIZE = 1024  # 1 KB = 1024 B, 1 MB = 1024 KB, etc
 # BLOCK_SIZE = 1000  # 1 KB = 1000 B, 1 MB = 1000 KB, etc
 
+# Tables of the data request content used for the estimate - only these are loaded
+DREQ_TABLES = [
+    'Opportunity',
+    'Experiment Group',
+    'Experiments',
+    'Variable Group',
+    'Variables',
+    'Time Subset',
+    'CMIP7 Frequency',
+    'Spatial Shape',
+    'Temporal Shape',
+    'Coordinates and Dimensions',
+    'Cell Methods',
+    'Cell Measures',
+    'Physical Parameters',
+    'Modelling Realm',
+]
+# Tables used if available (depending on the data request version)
+DREQ_OPTIONAL_TABLES = [
+    'Priority Level',
+    'CMIP6 Frequency (legacy)',
+    'CF Standard Names',
+    'Structure',
+    'CMIP6 Table Identifiers (legacy)',
+    'Table Identifiers',
+]
+
 
 def file_size_str(size):
     '''
@@ -210,10 +237,11 @@ years: 1
 
     # Download specified version of data request content (if not locally cached)
     dc.retrieve(use_dreq_version)
-    # Load content into python dict
-    content = dc.load(use_dreq_version)
+    # Load content into python dict (only the tables needed for the estimate)
+    content = dc.load(use_dreq_version, tables=DREQ_TABLES, optional_tables=DREQ_OPTIONAL_TABLES)
     # Render data request tables as dreq_table objects
-    base = dq.create_dreq_tables_for_request(content, use_dreq_version)
+    base = dq.create_dreq_tables_for_request(content, use_dreq_version,
+                                             tables=DREQ_TABLES + DREQ_OPTIONAL_TABLES)
 
     dreq_tables = {
         'coordinates and dimensions': base['Coordinates and Dimensions'],
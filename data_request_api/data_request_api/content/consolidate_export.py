@@ -1,46 +1,83 @@
+import functools
+import hashlib
+import json
+import os
 import re
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
 
 from data_request_api.content.utils import _parse_version
 from data_request_api.utilities.logger import get_logger  # noqa
+from data_request_api.utilities.tools import iter_json_items
 
 from .mapping_table import (version_consistency,
                             version_consistency_drop_fields,
                             version_consistency_drop_tables,
                             version_consistency_fields)
 
-# Filtered records
-filtered_records = []
+# Regexes used to split comma-separated values (see _split_values)
+_split_pattern = re.compile(r'[",]')
+_whitespace_pattern = re.compile(r"\s*")
 
+# Compiled mapping plans - keyed by the hash of the mapping table and the table layout
+#  of the export they have been compiled for
+_plans = dict()
 
-def _map_record_id(record, records, keys):
-    """
-    Identifies a record_id in list of records using key.
-    """
-    matches = []
-    # For each of the specified "keys", check if there is an entry in "records"
-    #   that matches with "record"
-    for key in keys:
-        if key in record:
-            recval = record[key]
-            matches = [r for r, v in records.items() if key in v and v[key] == recval]
-            if len(matches) == 1:
-                break
-    return matches
+# Versions whose consolidated content is modified by hard-coded fixes (see _apply_hard_fixes),
+#  which can therefore not be consolidated incrementally
+_hard_fixes_versions = ["v1.2"]
 
 
-def _map_attribute(attr, records, keys):
+class _ConsolidationContext(object):
     """
-    Identifies a record_id in list of records using key and matching with the attribute value.
+    State of a single consolidation (see map_data), so that several consolidations
+    can run concurrently.
     """
-    # For the specified "key", check if there is an entry in "records"
-    #   that matches with "attr"
-    matches = []
-    for key in keys:
-        matches.extend([r for r, v in records.items() if key in v and v[key] == attr])
-        if len(matches) == 1:
-            break
-    return matches
+
+    def __init__(self, details=False):
+        # Ids of the records removed by the internal filters
+        self.filtered_records = set()
+        # Indexes of the attribute values of the records internal mappings refer to,
+        #  keyed by (base, table)
+        self.indexes = dict()
+        # Statistics - counters keyed by (category, table[, attribute]) and, if requested,
+        #  the record concerned by each count
+        self.counts = defaultdict(int)
+        self.details = [] if details else None
+
+    def count(self, key, record_id=None, n=1):
+        """Counts an event of the consolidation, keyed by (category, table[, attribute])."""
+        self.counts[key] += n
+        if self.details is not None:
+            detail = dict(zip(("category", "table", "attribute"), key))
+            detail["record"] = record_id
+            if n != 1:
+                detail["count"] = n
+            self.details.append(detail)
+
+    def merge(self, counts, details):
+        """Adds the statistics of a part of the consolidation done separately."""
+        for key, n in counts.items():
+            self.counts[key] += n
+        if self.details is not None:
+            self.details.extend(details)
+
+    def report(self):
+        """
+        Gets the statistics of the consolidation as a nested dict
+        {category: {table: {attribute: count}}} ({category: {table: count}} for
+        the counts that do not concern a specific attribute), with the list of
+        counted events under 'details' if requested.
+        """
+        report = dict()
+        for key in sorted(self.counts):
+            node = report
+            for name in key[:-1]:
+                node = node.setdefault(name, dict())
+            node[key[-1]] = self.counts[key]
+        if self.details is not None:
+            report["details"] = self.details
+        return report
 
 
 def _apply_consistency_fixes(data):
@@ -96,7 +133,7 @@ def _apply_hard_fixes(data):
     """
     Applies hard-coded fixes to the data request dictionary, such as merging or deletion of records.
     """
-    if data["Data Request"]["version"] == "v1.2":
+    if data["Data Request"]["version"] in _hard_fixes_versions:
         logger = get_logger()
         logger.debug(
             f"Consistency across versions / releases - applying hard fixes for version '{data['Data Request']['version']}'"
@@ -152,51 +189,39 @@ def _apply_hard_fixes_one_base(data, version):
     return data
 
 
-def _filter_references(val, key, table, rid, dtype=None):
+def _filter_references(val, key, table, rid, dtype=None, context=None):
     """
     Filters lists of or strings with comma-separated references to other records.
+    The references to the records filtered in the consolidation context are removed
+    and counted (without context, no references are filtered).
     """
-    global filtered_records
-    logger = get_logger()
+    if context is None:
+        context = _ConsolidationContext()
+    filtered_ids = context.filtered_records
 
     if isinstance(val, list):
-        filtered = [v for v in val if v not in filtered_records]
+        filtered = [
+            v for v in val if not (isinstance(v, str) and v in filtered_ids)
+        ]
         if len(filtered) != len(val):
+            context.count(("filtered_references", table, key), rid, len(val) - len(filtered))
             if filtered == []:
-                if len(val) == 1:
-                    logger.warning(
-                        f"'{table}': Filtered the only reference for '{key}' of record '{rid}'."
-                    )
-                else:
-                    logger.warning(
-                        f"'{table}': Filtered all {len(val)} references for '{key}' of record '{rid}'."
-                    )
-            else:
-                logger.debug(
-                    f"'{table}': Filtered {len(val) - len(filtered)} of {len(val)}"
-                    f" references for '{key}' of record '{rid}'."
-                )
+                context.count(("emptied_references", table, key), rid)
         return _fix_dtype(key, filtered, dtype)
     elif isinstance(val, str) and val.startswith("rec"):
         if "," in val:
             vallist = [v.strip() for v in val.split(",")]
-            filtered = [v for v in vallist if v not in filtered_records]
+            filtered = [v for v in vallist if v not in filtered_ids]
             if len(filtered) != len(vallist):
+                context.count(
+                    ("filtered_references", table, key), rid, len(vallist) - len(filtered)
+                )
                 if filtered == []:
-                    logger.warning(
-                        f"'{table}': Filtered all {len(vallist)} references for"
-                        f" '{key}' of record '{rid}'."
-                    )
-                else:
-                    logger.debug(
-                        f"'{table}': Filtered {len(vallist) - len(filtered)} of"
-                        f" {len(vallist)} references for '{key}' of record '{rid}'."
-                    )
+                    context.count(("emptied_references", table, key), rid)
             return _fix_dtype(key, ",".join(filtered), dtype)
-        elif val.strip() in filtered_records:
-            logger.warning(
-                f"'{table}': Filtered the only reference for '{key}' of record '{rid}'."
-            )
+        elif val.strip() in filtered_ids:
+            context.count(("filtered_references", table, key), rid)
+            context.count(("emptied_references", table, key), rid)
             return _fix_dtype(key, "", dtype)
         else:
             return _fix_dtype(key, _fix_str(val), dtype)
@@ -263,37 +288,20 @@ def _fix_str_nested(data):
 
 def _fix_dtype(fkey, fval, dtype=None):
     """Fixes data types for record fields."""
-    logger = get_logger()
-
     if dtype is None:
         return fval
     elif dtype == "str":
-        logger.debug(
-            f"Consolidate export: Converting field '{fkey}' ('{fval}') to string."
-        )
         return str(fval)
     elif dtype == "int":
-        logger.debug(
-            f"Consolidate export: Converting field '{fkey}' ('{fval}') to int."
-        )
         return int(_fix_numeric_str(fval))
     elif dtype == "float":
-        logger.debug(
-            f"Consolidate export: Converting field '{fkey}' ('{fval}') to float."
-        )
         return float(_fix_numeric_str(fval))
     elif dtype == "listofstr":
-        logger.debug(
-            f"Consolidate export: Converting field '{fkey}' to a list of strings."
-        )
         if isinstance(fval, list):
             return [str(v) for v in fval]
         else:
             return [str(fval)]
     elif dtype == "listofint":
-        logger.debug(
-            f"Consolidate export: Converting field '{fkey}' to a list of ints."
-        )
         if isinstance(fval, list):
             return [int(v) for v in fval]
         elif isinstance(fval, str):
@@ -306,9 +314,6 @@ def _fix_dtype(fkey, fval, dtype=None):
         else:
             return [int(fval)]
     elif dtype == "listoffloat":
-        logger.debug(
-            f"Consolidate export: Converting field '{fkey}' to a list of floats."
-        )
         if isinstance(fval, list):
             return [float(v) for v in fval]
         elif isinstance(fval, str):
@@ -321,13 +326,748 @@ def _fix_dtype(fkey, fval, dtype=None):
         else:
             return [float(fval)]
     else:
-        logger.warning(
+        get_logger().warning(
             f"Consolidate export: Unsupported data type '{dtype}' for field '{fkey}'."
         )
         return fval
 
 
-def map_data(data, mapping_table, version, **kwargs):
+def _get_source_tables(mapinfo, mapping_table):
+    """
+    Lists the (base, table) pairs of the source export read when mapping a table,
+    considering all table name aliases.
+    """
+    source_tables = [(mapinfo["source_base"], st) for st in mapinfo["source_table"]]
+    for intm in mapinfo["internal_mapping"].values():
+        if intm["table"] in mapping_table:
+            source_tables += [
+                (intm["base"], st)
+                for st in mapping_table[intm["table"]]["source_table"]
+            ]
+        if intm["base_copy_of_table"]:
+            source_tables.append((mapinfo["source_base"], intm["base_copy_of_table"]))
+    return source_tables
+
+
+def read_export(fic, mapping_table, fingerprints=None):
+    """
+    Reads an Airtable export from a file, parsing one table at a time.
+
+    The JSON text of the export is never held in memory as a whole. Tables of the
+    bases covered by the mapping table that are not read when mapping the data (see
+    map_data) are discarded right after being parsed. All other tables are returned,
+    i.e. they are in memory together before the mapping starts - with
+    release_source=True, map_data releases each of them once it has been mapped.
+
+    Parameters
+    ----------
+    fic : file object
+        The export file, opened in text mode.
+    mapping_table : dict
+        The mapping table that will be applied to the export.
+    fingerprints : dict, optional
+        If provided, filled with the fingerprints (sha256 hex digests of the JSON text)
+        of the tables of the export, as {base: {table: fingerprint}}.
+
+    Returns
+    -------
+    dict
+        The export, without the tables not needed for the mapping.
+    """
+    mapped_bases = {mapinfo["source_base"] for mapinfo in mapping_table.values()}
+    required = {
+        source_table
+        for mapinfo in mapping_table.values()
+        for source_table in _get_source_tables(mapinfo, mapping_table)
+    }
+    data = dict()
+    digests = None if fingerprints is None else dict()
+    for base, table, content in iter_json_items(fic, digests=digests):
+        if table is None:
+            data[base] = content
+        elif base not in mapped_bases or (base, table) in required:
+            data.setdefault(base, dict())[table] = content
+        else:
+            data.setdefault(base, dict())
+    if fingerprints is not None:
+        for (base, table), digest in digests.items():
+            fingerprints.setdefault(base, dict())[table] = digest
+    return data
+
+
+def _split_values(value):
+    """
+    Splits comma-separated values, ignoring commas within quotes.
+
+    Equivalent to re.split(r',\\s*(?=(?:[^"]|"[^"]*")*$)', value), ie. a comma separates
+    values if it is followed by an even number of quotes, but in linear time.
+    """
+    quotes_after = value.count('"')
+    values = []
+    start = 0
+    for match in _split_pattern.finditer(value):
+        if match.group() == '"':
+            quotes_after -= 1
+        elif quotes_after % 2 == 0:
+            values.append(value[start:match.start()])
+            start = _whitespace_pattern.match(value, match.end()).end()
+    values.append(value[start:])
+    return values
+
+
+def _compile_filter(filter_key, filter_val):
+    """
+    Compiles an internal filter (see mapping_table) into a predicate on records.
+
+    The predicate returns whether a record passes the filter, or None if the filter
+    does not decide on the record.
+    """
+    names = [filter_key] + filter_val["aliases"]
+    operator = filter_val["operator"]
+    values = filter_val.get("values", [])
+
+    def has_attribute(record):
+        return any(name in record for name in names)
+
+    if operator == "nonempty":
+
+        def predicate(record):
+            return any(bool(record[name]) for name in names if name in record)
+
+    elif operator == "in":
+
+        def predicate(record):
+            if not has_attribute(record):
+                return False
+            value = record[filter_key]
+            if isinstance(value, list):
+                return any(v in values for v in value)
+            return value in values
+
+    elif operator == "not in":
+
+        def predicate(record):
+            if not has_attribute(record):
+                return False
+            value = record[filter_key]
+            if isinstance(value, list):
+                return any(v not in values for v in value)
+            return None
+
+    else:
+
+        def predicate(record):
+            return False if not has_attribute(record) else None
+
+    return predicate
+
+
+def _compile_field(key, table, mapinfo):
+    """
+    Compiles the conversion of a record attribute of a source table into a tuple
+    (new attribute name, converter), or None if the attribute is dropped.
+    The converter is called with the attribute value, the record id and the
+    consolidation context.
+    """
+    if key in mapinfo["drop_keys"]:
+        return None
+    new_key = mapinfo["internal_consistency"].get(key, key)
+    dtype = mapinfo["field_dtypes"].get(new_key, None)
+    conversion = ("conversions", table, new_key)
+
+    def convert(value, record_id, context):
+        if dtype is not None:
+            context.counts[conversion] += 1
+        return _filter_references(value, key, table, record_id, dtype, context)
+
+    return new_key, convert
+
+
+def _compile_internal_mapping(attr, intm, table, mapinfo, mapping_table, layout, source_table):
+    """
+    Compiles the internal mapping of a record attribute (see mapping_table) for an export
+    with the given table layout.
+    """
+    logger = get_logger()
+    intm_table = [
+        tn
+        for tn in mapping_table.keys()
+        if tn in mapping_table[tn]["source_table"] and tn == intm["table"]
+    ][0]
+    intm_table_alias = [
+        tn for tn in mapping_table[intm_table]["source_table"] if tn in layout[intm["base"]]
+    ]
+    try:
+        intm_table_alias = intm_table_alias[0]
+    except IndexError:
+        errmsg = f"None of the following tables exist in the data: {mapping_table[intm['table']]['source_table']}."
+        logger.error(errmsg)
+        raise ValueError(errmsg)
+
+    # Errors are only raised once a record with this attribute is mapped
+    error = None
+    if intm["entry_type"] == "record_id":
+        if not intm["base_copy_of_table"]:
+            error = (
+                ValueError,
+                "A copy of the table in the same base is required if 'entry_type'"
+                " is set to 'record_id', but 'base_copy_of_table' is set to"
+                f" False: '{source_table}' - '{attr}'",
+            )
+        elif not intm["base"] in layout:
+            error = (KeyError, f"Base '{intm['base']}' not found in data.")
+        elif intm["base_copy_of_table"] not in layout[mapinfo["source_base"]]:
+            error = (
+                KeyError,
+                f"Table '{intm['base_copy_of_table']}' not found in base '{mapinfo['source_base']}'.",
+            )
+        map_by_key = list(intm["map_by_key"])
+    else:
+        map_by_key = (
+            [intm["map_by_key"]]
+            if isinstance(intm["map_by_key"], str)
+            else list(intm["map_by_key"])
+        )
+    return {
+        "attr": attr,
+        "target_attr": mapinfo["internal_consistency"].get(attr, attr),
+        # Attribute names used in other export types or release versions
+        "aliases": [
+            a for a, new in mapinfo["internal_consistency"].items() if new == attr
+        ],
+        "base": intm["base"],
+        "table_alias": intm_table_alias,
+        "base_copy_of_table": intm["base_copy_of_table"],
+        "operation": intm["operation"],
+        "entry_type": intm["entry_type"],
+        "map_by_key": map_by_key,
+        "error": error,
+    }
+
+
+def _compile_mapping(mapping_table, layout):
+    """
+    Compiles the mapping table into a plan for mapping exports with the given table layout.
+
+    The plan has one step per table of the mapping table. Each step holds the chosen
+    source table, the compiled filters and internal mappings and the source tables
+    that can be released afterwards (see map_data).
+
+    Parameters
+    ----------
+    mapping_table : dict
+        The mapping table.
+    layout : dict
+        The names of the tables (set) in each base of the export.
+
+    Returns
+    -------
+    list
+        The steps of the plan.
+    """
+    # Source tables can be released after the last table reading them has been mapped
+    last_read = dict()
+    for i, mapinfo in enumerate(mapping_table.values()):
+        for source_table in _get_source_tables(mapinfo, mapping_table):
+            last_read[source_table] = i
+    plan = []
+    for i, (table, mapinfo) in enumerate(mapping_table.items()):
+        step = {
+            "table": table,
+            "source_base": mapinfo["source_base"],
+            "source_table": None,
+            "release": [k for k, v in last_read.items() if v == i],
+            "read": set(_get_source_tables(mapinfo, mapping_table)),
+        }
+        plan.append(step)
+        if mapinfo["source_base"] not in layout:
+            step["missing"] = ("base", mapinfo["source_base"])
+            continue
+        source_tables = [
+            st for st in mapinfo["source_table"] if st in layout[mapinfo["source_base"]]
+        ]
+        if not source_tables:
+            step["missing"] = ("table", mapinfo["source_table"][0])
+            continue
+        step["source_table"] = source_tables[0]
+        step["filters"] = (
+            [
+                _compile_filter(filter_key, filter_val)
+                for filter_key, filter_val in mapinfo["internal_filters"].items()
+            ]
+            if "internal_filters" in mapinfo
+            else None
+        )
+        # Converters of the record attributes - compiled on first use
+        step["fields"] = dict()
+        step["compile_field"] = functools.partial(
+            _compile_field, table=table, mapinfo=mapinfo
+        )
+        step["internal_mapping"] = [
+            _compile_internal_mapping(
+                attr, intm, table, mapinfo, mapping_table, layout, source_tables[0]
+            )
+            for attr, intm in mapinfo["internal_mapping"].items()
+        ]
+    return plan
+
+
+def _get_layout(data):
+    """Gets the names of the tables (set) in each base of the export."""
+    return {base: set(tables) for base, tables in data.items()}
+
+
+def _get_plan(mapping_table, layout):
+    """
+    Gets the compiled plan to map exports with the given table layout with the mapping
+    table, compiling it if it has not been applied to such an export yet.
+    """
+    key = (
+        hashlib.sha256(
+            json.dumps(mapping_table, sort_keys=True, default=str).encode()
+        ).hexdigest(),
+        json.dumps({base: sorted(tables) for base, tables in layout.items()}, sort_keys=True),
+    )
+    if key not in _plans:
+        _plans[key] = _compile_mapping(mapping_table, layout)
+    return _plans[key]
+
+
+def _get_table_fingerprints(plan, sources, filtered):
+    """
+    Gets the fingerprints of the inputs of each mapped table, ie. of the source tables
+    read when mapping it (see read_export) and of the ids of the filtered records.
+    """
+    filtered_hash = hashlib.sha256("\n".join(sorted(filtered)).encode()).hexdigest()
+    fingerprints = dict()
+    for step in plan:
+        if step["source_table"] is None:
+            continue
+        inputs = sorted(
+            [base, source_table, sources.get(base, dict()).get(source_table)]
+            for base, source_table in step["read"]
+        )
+        fingerprints[step["table"]] = hashlib.sha256(
+            json.dumps([step["table"], inputs, filtered_hash]).encode()
+        ).hexdigest()
+    return fingerprints
+
+
+def _find_records(records, key, value, index):
+    """
+    Finds the ids of the records whose attribute 'key' equals 'value', using an index
+    of the attribute values (built on first use).
+    """
+    if key not in index:
+        index[key] = dict()
+        for record_id, record in records.items():
+            if key in record:
+                try:
+                    index[key].setdefault(_hashable(record[key]), []).append(record_id)
+                except TypeError:
+                    index[key] = None
+                    break
+    try:
+        if index[key] is not None:
+            return index[key].get(_hashable(value), [])
+    except TypeError:
+        pass
+    return [r for r, v in records.items() if key in v and v[key] == value]
+
+
+def _hashable(value):
+    """Converts a list to a tuple so that it can be used as dict key."""
+    return tuple(value) if isinstance(value, list) else value
+
+
+def _execute_plan(
+    mapping_table,
+    layout,
+    data,
+    version,
+    release_source=False,
+    workers=1,
+    details=False,
+    reuse=None,
+):
+    """
+    Maps a three-base export to the one-base structure following the plan compiled
+    from the mapping table (see map_data). Returns the mapped data and the statistics
+    of the consolidation (see _ConsolidationContext.report).
+    """
+    logger = get_logger()
+    plan = _get_plan(mapping_table, layout)
+    context = _ConsolidationContext(details)
+    mapped_data = {"Data Request": {"version": version}}
+    missing_bases = []
+    missing_tables = []
+
+    # Get filtered records
+    _filter_records(plan, data, context)
+    filtered = context.filtered_records
+    logger.debug(f"Filtered {len(filtered)} records in total.")
+
+    # Reuse previously mapped tables whose inputs have not changed
+    reused = dict()
+    if reuse is not None:
+        reuse["tables"] = _get_table_fingerprints(plan, reuse["sources"], filtered)
+        previous = reuse.get("previous", dict())
+        unchanged = [
+            table for table, fp in reuse["tables"].items() if previous.get(table) == fp
+        ]
+        if unchanged and "load" in reuse and version not in _hard_fixes_versions:
+            reused = {
+                table: content
+                for table, content in reuse["load"](unchanged).items()
+                if table in unchanged
+            }
+        reuse["reused"] = [step["table"] for step in plan if step["table"] in reused]
+        logger.info(
+            f"Reusing {len(reused)} of {len(reuse['tables'])} previously consolidated tables."
+        )
+
+    if release_source:
+        read = set().union(*[step["read"] for step in plan])
+        for base in data:
+            for source_table in [st for st in data[base] if (base, st) not in read]:
+                del data[base][source_table]
+
+    # Perform mapping in case of three-base structure
+    # - with several workers, the tables are mapped in a process pool, each worker
+    #   receiving only the source tables read by its step, and collected in the
+    #   order of the mapping table
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    try:
+        futures = dict()
+        for i, step in enumerate(plan):
+            table = step["table"]
+            if step["source_table"] is None:
+                kind, name = step["missing"]
+                (missing_bases if kind == "base" else missing_tables).append(name)
+            elif table in reused:
+                mapped_data["Data Request"][table] = reused[table]
+            elif pool is None:
+                mapped_data["Data Request"][table] = _execute_step(step, data, context)
+            else:
+                source_data = dict()
+                for base, source_table in step["read"]:
+                    if base in data and source_table in data[base]:
+                        source_data.setdefault(base, dict())[source_table] = data[base][
+                            source_table
+                        ]
+                futures[table] = pool.submit(
+                    _execute_step_in_worker,
+                    mapping_table,
+                    layout,
+                    i,
+                    source_data,
+                    filtered,
+                    details,
+                )
+            if release_source:
+                for base, source_table in step["release"]:
+                    if base in data:
+                        data[base].pop(source_table, None)
+        for step in plan:
+            if step["table"] in futures:
+                mapped_table, counts, step_details = futures[step["table"]].result()
+                mapped_data["Data Request"][step["table"]] = mapped_table
+                context.merge(counts, step_details)
+    finally:
+        if pool is not None:
+            for future in futures.values():
+                future.cancel()
+            pool.shutdown()
+
+    if len(missing_bases) > 0:
+        errmsg = (
+            "Encountered missing bases when consolidating the data:"
+            f" {set(missing_bases)}"
+        )
+        logger.critical(errmsg)
+        raise KeyError(errmsg)
+    if len(missing_tables) > 0:
+        logger.warning(
+            "Encountered missing tables when consolidating the data (not"
+            f" necessarily problematic): {missing_tables}"
+        )
+    report = context.report()
+    _log_report(report)
+    return mapped_data, report
+
+
+# Statistics of the consolidation that indicate possible issues with the content,
+#  logged with their level and message
+_report_messages = {
+    "emptied_references": (
+        "warning",
+        "'{table}': Filtered all references for '{attribute}' of {count} record(s).",
+    ),
+    "ambiguous_references": (
+        "warning",
+        "Consolidation of {table}: Multiple matching records found for {count}"
+        " value(s) of attribute '{attribute}'. Using first match.",
+    ),
+    "invalid_operations": (
+        "error",
+        "Consolidation of {table}@{attribute}: Selected 'split' operation"
+        " for a list in {count} record(s).",
+    ),
+    "unmapped_attributes": (
+        "error",
+        "{table}: For attribute '{attribute}' no records could be mapped"
+        " in {count} record(s).",
+    ),
+}
+
+
+def _log_report(report):
+    """Logs the statistics of a consolidation (see _ConsolidationContext.report)."""
+    logger = get_logger()
+    for category, (level, message) in _report_messages.items():
+        for table, attributes in report.get(category, dict()).items():
+            for attribute, count in attributes.items():
+                getattr(logger, level)(
+                    message.format(table=table, attribute=attribute, count=count)
+                )
+    logger.debug(
+        "Consolidation statistics: "
+        + json.dumps({k: v for k, v in report.items() if k != "details"})
+    )
+
+
+def _filter_records(plan, data, context):
+    """
+    Adds the ids of the records removed by the internal filters of the plan to the
+    filtered records of the consolidation context.
+    """
+    for step in plan:
+        if step["source_table"] is None or step["filters"] is None:
+            continue
+        for record_id, record in data[step["source_base"]][step["source_table"]][
+            "records"
+        ].items():
+            if any(predicate(record) is False for predicate in step["filters"]):
+                context.filtered_records.add(record_id)
+                context.count(("filtered_records", step["table"]), record_id)
+
+
+def get_filtered_records(data, mapping_table):
+    """
+    Gets the records of a three-base export that are removed by the internal filters
+    of the mapping table when consolidating the export (see map_data).
+
+    Parameters
+    ----------
+    data : dict
+        Three-base Airtable export.
+    mapping_table : dict
+        The mapping table to apply to map to one base.
+
+    Returns
+    -------
+    set
+        The ids of the filtered records.
+    """
+    context = _ConsolidationContext()
+    _filter_records(_get_plan(mapping_table, _get_layout(data)), data, context)
+    return context.filtered_records
+
+
+def _execute_step(step, data, context):
+    """
+    Maps the source table of a step of the plan to its one-base table (see _execute_plan).
+    """
+    logger = get_logger()
+    table = step["table"]
+    source = data[step["source_base"]][step["source_table"]]
+    filtered = context.filtered_records
+    logger.debug(
+        f"Mapping '{step['source_base']}' : '{step['source_table']}' -> '{table}'"
+    )
+    # Copy the selected data to the one-base structure
+    # - skip filtered records
+    # - rename record attributes according to
+    #   "internal_consistency" settings
+    # - filter references to records for fields that are not
+    #   internally mapped below
+    fields = step["fields"]
+    records = dict()
+    for record_id, record in source["records"].items():
+        if record_id in filtered:
+            continue
+        mapped_record = dict()
+        for reckey, recvalue in record.items():
+            if reckey not in fields:
+                fields[reckey] = step["compile_field"](reckey)
+            if fields[reckey] is not None:
+                mapped_record[fields[reckey][0]] = fields[reckey][1](
+                    recvalue, record_id, context
+                )
+        records[record_id] = mapped_record
+
+    # If record attributes require mapping
+    for intm in step["internal_mapping"]:
+        _execute_internal_mapping(intm, table, step, source, data, records, context)
+    return {**source, "records": records}
+
+
+def _execute_step_in_worker(mapping_table, layout, index, data, filtered, details):
+    """
+    Maps the source table of the step 'index' of the plan in a worker process
+    (see _execute_plan). 'data' only holds the source tables read by the step.
+    Returns the mapped table and the statistics of its mapping.
+    """
+    context = _ConsolidationContext(details)
+    context.filtered_records = filtered
+    mapped_table = _execute_step(_get_plan(mapping_table, layout)[index], data, context)
+    return mapped_table, dict(context.counts), context.details
+
+
+def _execute_internal_mapping(intm, table, step, source, data, records, context):
+    """
+    Maps the references of a record attribute to records of another base
+    (see _compile_internal_mapping).
+    """
+    logger = get_logger()
+    attr = intm["attr"]
+    intm_table_alias = intm["table_alias"]
+    filtered = context.filtered_records
+    index = context.indexes.setdefault((intm["base"], intm_table_alias), dict())
+    for record_id, record in source["records"].items():
+        if record_id in filtered:
+            continue
+        elif (
+            attr not in record
+            or record[attr] is None
+            or record[attr] == ""
+            or record[attr] == []
+        ):
+            # Attribute name not found for record, but might have a different name
+            #  in another export type or release version
+            for a in intm["aliases"]:
+                if a in record:
+                    attr_vals = record[a]
+                    context.count(("alias_fallbacks", table, f"{attr} -> {a}"), record_id)
+                    break
+            else:
+                context.count(("missing_attributes", table, attr), record_id)
+                continue
+        else:
+            attr_vals = record[attr]
+
+        # Get list of record-keys of the attribute (eg. "Variables")
+        #   that is connected to the current record of the "source_table
+        #   (eg. "Variable Groups") by the specified "operation"
+        if intm["operation"] == "split":
+            if isinstance(attr_vals, list):
+                context.count(("invalid_operations", table, attr), record_id)
+                continue
+            else:
+                attr_vals = [x.strip('"') for x in _split_values(attr_vals)]
+        elif intm["operation"] == "":
+            if isinstance(attr_vals, str):
+                attr_vals = [attr_vals]
+        else:
+            errmsg = (
+                f"Unknown internal mapping operation for attribute '{attr}'"
+                f" ('{step['source_table']}'): '{intm['operation']}'"
+            )
+            logger.error(f"ValueError: {errmsg}")
+            raise ValueError(errmsg)
+
+        # Get mapped record_ids for this list of record-keys
+        # entry_type - single record_id or list of record_ids
+        # - map by record_id
+        recordlist = data[intm["base"]][intm_table_alias]["records"]
+        if intm["entry_type"] == "record_id":
+            if intm["error"] is not None:
+                exc, errmsg = intm["error"]
+                logger.error(f"{exc.__name__}: {errmsg}")
+                raise exc(errmsg)
+            record_copies = data[step["source_base"]][intm["base_copy_of_table"]][
+                "records"
+            ]
+            recordIDs_new = []
+            for attr_val in attr_vals:
+                # The record copy in the current base
+                record_copy = record_copies[attr_val]
+                # The entire list of records in the base of origin
+                recordID_new = []
+                for key in intm["map_by_key"]:
+                    if key in record_copy:
+                        recordID_new = _find_records(
+                            recordlist, key, record_copy[key], index
+                        )
+                        if len(recordID_new) == 1:
+                            break
+                recordID_filtered = [
+                    r for r in recordID_new if r not in filtered
+                ]
+                if len(recordID_filtered) == 0:
+                    if len(recordID_new) == 0:
+                        context.count(("unmatched_references", table, attr), record_id)
+                elif len(recordID_filtered) > 1:
+                    context.count(("ambiguous_references", table, attr), record_id)
+                    recordIDs_new.append(recordID_filtered[0])
+                else:
+                    recordIDs_new.append(recordID_filtered[0])
+
+        # entry_type - name (eg. unique label or similar)
+        # - map by attribute value
+        elif intm["entry_type"] == "name":
+            recordIDs_new = []
+            for attr_val in attr_vals:
+                recordID_new = []
+                for key in intm["map_by_key"]:
+                    recordID_new = recordID_new + _find_records(
+                        recordlist, key, attr_val, index
+                    )
+                    if len(recordID_new) == 1:
+                        break
+                recordID_filtered = [
+                    r for r in recordID_new if r not in filtered
+                ]
+                if len(recordID_filtered) == 0:
+                    if len(recordID_new) == 0:
+                        context.count(("unmatched_references", table, attr), record_id)
+                elif len(recordID_filtered) > 1:
+                    context.count(("ambiguous_names", table, attr), record_id)
+                    recordIDs_new.append(recordID_filtered[0])
+                else:
+                    recordIDs_new.append(recordID_filtered[0])
+        else:
+            errmsg = (
+                f"Unknown 'entry_type' specified for attribute '{attr}'"
+                f" ('{step['source_table']}'): '{intm['entry_type']}'"
+            )
+            logger.error(f"ValueError: {errmsg}")
+            raise ValueError(errmsg)
+        if not recordIDs_new:
+            # This case can actually happen for the 'Coordinate and Dimension' table
+            context.count(("unmapped_attributes", table, attr), record_id)
+        try:
+            records[record_id][intm["target_attr"]] = list(
+                dict.fromkeys(recordIDs_new)
+            )
+        except KeyError:
+            logger.debug(
+                f"Consolidation of {table}@{intm_table_alias}:"
+                f" '{record_id}' not found when adding"
+                f" Attribute '{attr}': {recordIDs_new}"
+            )
+
+
+def map_data(
+    data,
+    mapping_table,
+    version,
+    release_source=False,
+    report_details=False,
+    reuse=None,
+    return_report=False,
+    **kwargs,
+):
     """
     Maps the data to the one-base structure using the mapping table.
 
@@ -339,401 +1079,60 @@ def map_data(data, mapping_table, version, **kwargs):
         The mapping table to apply to map to one base.
     version : str
         The version tag of the exported Data Request Content dictionary.
+    release_source : bool, optional
+        Whether to remove the tables of a three-base export from 'data' as soon as
+        they are not needed anymore, to limit the peak memory usage. Defaults to False.
+    consolidation_workers : int, optional
+        Number of worker processes mapping the tables of a three-base export in
+        parallel (0 for one per CPU). Defaults to 1, mapping them in this process.
+    report_details : bool, optional
+        Whether to list every counted event with its record in the statistics of the
+        consolidation of a three-base export (see return_report). Defaults to False.
+    reuse : dict, optional
+        Incremental consolidation of a three-base export, with the fingerprints of the
+        source tables ('sources', see read_export) and, optionally, those of the tables
+        of a previous consolidation ('previous') and a function loading a list of its
+        tables ('load'). The tables whose fingerprint has not changed are loaded instead
+        of being mapped again. The fingerprints of the mapped tables ('tables') and the
+        names of the reused ones ('reused') are added to the dict. Defaults to None.
+    return_report : bool, optional
+        Whether to return the statistics of the consolidation together with the mapped
+        data. Defaults to False.
 
     Returns
     -------
-    dict
-        Mapped data with one-base structure.
+    dict or tuple
+        Mapped data with one-base structure, and, if 'return_report' is True, the
+        statistics of the consolidation as a nested dict {category: {table: {attribute:
+        count}}}, with the list of counted events under 'details' if 'report_details'
+        is True (empty for one-base data).
 
     Note
     ----
         Returns the input dict if the data is already one-base.
+        The statistics of the consolidation of a three-base export (conversions per field,
+        filtered records and references, alias fallbacks, ...) are logged at the end.
     """
     logger = get_logger()
-    missing_bases = []
-    missing_tables = []
-    mapped_data = {"Data Request": {}}
 
     # Check if data is already one-base
     if len(data.keys()) in [3, 4]:
-        # Set version
-        mapped_data["Data Request"]["version"] = version
-
-        # Reset filtered records
-        global filtered_records
-        if filtered_records:
-            filtered_records = []
-        filtered_records_dict = dict()
-
-        # Get filtered records
-        for table, mapinfo in mapping_table.items():
-            if mapinfo["source_base"] in data and any(
-                [st in data[mapinfo["source_base"]] for st in mapinfo["source_table"]]
-            ):
-                source_table = [
-                    st
-                    for st in mapinfo["source_table"]
-                    if st in data[mapinfo["source_base"]]
-                ][0]
-                if "internal_filters" in mapinfo:
-                    for record_id, record in data[mapinfo["source_base"]][source_table][
-                        "records"
-                    ].items():
-                        filter_results = []
-                        for filter_key, filter_val in mapinfo[
-                            "internal_filters"
-                        ].items():
-                            if all(
-                                [
-                                    filter_alias not in record
-                                    for filter_alias in [filter_key]
-                                    + filter_val["aliases"]
-                                ]
-                            ):
-                                filter_results.append(False)
-                            elif filter_val["operator"] == "nonempty":
-                                filter_results.append(
-                                    any(
-                                        [
-                                            bool(record[fk])
-                                            for fk in [filter_key]
-                                            + filter_val["aliases"]
-                                            if fk in record
-                                        ]
-                                    )
-                                )
-                            elif filter_val["operator"] == "in":
-                                for fk in [filter_key] + filter_val["aliases"]:
-                                    if fk in record:
-                                        if isinstance(record[filter_key], list):
-                                            filter_results.append(
-                                                any(
-                                                    fj in filter_val["values"]
-                                                    for fj in record[filter_key]
-                                                )
-                                            )
-                                            break
-                                        else:
-                                            filter_results.append(
-                                                record[filter_key]
-                                                in filter_val["values"]
-                                            )
-                            elif filter_val["operator"] == "not in":
-                                for fk in [filter_key] + filter_val["aliases"]:
-                                    if fk in record:
-                                        if isinstance(record[filter_key], list):
-                                            filter_results.append(
-                                                any(
-                                                    fj not in filter_val["values"]
-                                                    for fj in record[filter_key]
-                                                )
-                                            )
-                                        break
-                                else:
-                                    filter_results.append(
-                                        record[filter_key] not in filter_val["values"]
-                                    )
-                        if not all(filter_results):
-                            logger.debug(
-                                f"Filtered record '{record_id}'"
-                                f" {'(' + record['name'] + ')' if 'name' in record else ''}"
-                                f" from '{table}'."
-                            )
-                            filtered_records.append(record_id)
-                            if table in filtered_records_dict:
-                                filtered_records_dict[table].append(record_id)
-                            else:
-                                filtered_records_dict[table] = [record_id]
-        for key in filtered_records_dict:
-            logger.debug(
-                f"Filtered {len(filtered_records_dict[key])} records for '{key}'."
-            )
-        logger.debug(f"Filtered {len(filtered_records)} records in total.")
-
-        # Perform mapping in case of three-base structure
-        for table, mapinfo in mapping_table.items():
-            intm = mapinfo["internal_mapping"]
-            if mapinfo["source_base"] in data and any(
-                [st in data[mapinfo["source_base"]] for st in mapinfo["source_table"]]
-            ):
-                # Copy the selected data to the one-base structure
-                # - skip filtered records
-                # - rename record attributes according to
-                #   "internal_consistency" settings
-                # - filter references to records for fields that are not
-                #   internally mapped below
-                source_table = [
-                    st
-                    for st in mapinfo["source_table"]
-                    if st in data[mapinfo["source_base"]]
-                ][0]
-                logger.debug(
-                    f"Mapping '{mapinfo['source_base']}' : '{source_table}' -> '{table}'"
-                )
-                mapped_data["Data Request"][table] = {
-                    **data[mapinfo["source_base"]][source_table],
-                    "records": {
-                        record_id: {
-                            mapinfo["internal_consistency"].get(
-                                reckey, reckey
-                            ): _filter_references(
-                                recvalue,
-                                reckey,
-                                table,
-                                record_id,
-                                mapinfo["field_dtypes"].get(
-                                    mapinfo["internal_consistency"].get(reckey, reckey),
-                                    None,
-                                ),
-                            )
-                            for reckey, recvalue in record.items()
-                            if reckey not in mapinfo["drop_keys"]
-                        }
-                        for record_id, record in data[mapinfo["source_base"]][
-                            source_table
-                        ]["records"].items()
-                        if record_id not in filtered_records
-                    },
-                }
-
-                # If record attributes require mapping
-                if intm != {}:
-                    # for each attribute that requires mapping
-                    for attr in intm.keys():
-                        intm_table = [
-                            tn
-                            for tn in mapping_table.keys()
-                            if tn in mapping_table[tn]["source_table"]
-                            and tn == intm[attr]["table"]
-                        ][0]
-                        intm_table_alias = [
-                            tn
-                            for tn in mapping_table[intm_table]["source_table"]
-                            if tn in data[intm[attr]["base"]]
-                        ]
-                        try:
-                            intm_table_alias = intm_table_alias[0]
-                        except IndexError:
-                            errmsg = f"None of the following tables exist in the data: {mapping_table[intm[attr]['table']]['source_table']}."
-                            logger.error(errmsg)
-                            raise ValueError(errmsg)
-
-                        for record_id, record in data[mapinfo["source_base"]][
-                            source_table
-                        ]["records"].items():
-                            if record_id in filtered_records:
-                                continue
-                            elif (
-                                attr not in record
-                                or record[attr] is None
-                                or record[attr] == ""
-                                or record[attr] == []
-                            ):
-                                # Attribute name not found for record, but might have a different name
-                                #  in another export type or release version
-                                logger.debug(
-                                    f"{table}: Attribute '{attr}' not found for record '{record_id}'."
-                                )
-                                attr_aliases = [
-                                    a
-                                    for a in mapinfo["internal_consistency"].keys()
-                                    if mapinfo["internal_consistency"][a] == attr
-                                ]
-                                attr_alias_found = False
-                                for a in attr_aliases:
-                                    if a in record:
-                                        attr_vals = record[a]
-                                        attr_alias_found = True
-                                        logger.debug(
-                                            f"{table}: Using attribute '{a}' instead for record '{record_id}'."
-                                        )
-                                        break
-                                if not attr_alias_found:
-                                    continue
-                            else:
-                                attr_vals = record[attr]
-
-                            # Get list of record-keys of the attribute (eg. "Variables")
-                            #   that is connected to the current record of the "source_table
-                            #   (eg. "Variable Groups") by the specified "operation"
-                            if intm[attr]["operation"] == "split":
-                                if isinstance(attr_vals, list):
-                                    errmsg = (
-                                        f"Consolidation of {table}@{attr}: Selected 'split' operation"
-                                        f" for a list {record_id}:",
-                                        attr_vals,
-                                    )
-                                    logger.error(f"TypeError: {errmsg}")
-                                    continue
-                                    # raise TypeError({errmsg})
-                                else:
-                                    attr_vals = list(
-                                        map(
-                                            lambda x: x.strip('"'),
-                                            re.split(
-                                                r',\s*(?=(?:[^"]|"[^"]*")*$)', attr_vals
-                                            ),
-                                        )
-                                    )
-                            elif intm[attr]["operation"] == "":
-                                if isinstance(attr_vals, str):
-                                    attr_vals = [attr_vals]
-                            else:
-                                errmsg = (
-                                    f"Unknown internal mapping operation for attribute '{attr}'"
-                                    f" ('{source_table}'): '{intm[attr]['operation']}'"
-                                )
-                                logger.error(f"ValueError: {errmsg}")
-                                raise ValueError(errmsg)
-
-                            # Get mapped record_ids for this list of record-keys
-                            # entry_type - single record_id or list of record_ids
-                            # - map by record_id
-                            if intm[attr]["entry_type"] == "record_id":
-                                if not intm[attr]["base_copy_of_table"]:
-                                    errmsg = (
-                                        "A copy of the table in the same base is required if 'entry_type'"
-                                        " is set to 'record_id', but 'base_copy_of_table' is set to"
-                                        f" False: '{source_table}' - '{attr}'"
-                                    )
-                                    logger.error(f"ValueError: {errmsg}")
-                                    raise ValueError(errmsg)
-                                elif not intm[attr]["base"] in data:
-                                    errmsg = f"Base '{intm[attr]['base']}' not found in data."
-                                    logger.error(f"KeyError: {errmsg}")
-                                    raise KeyError(errmsg)
-                                elif (
-                                    intm[attr]["base_copy_of_table"]
-                                    not in data[mapinfo["source_base"]]
-                                ):
-                                    errmsg = f"Table '{intm[attr]['base_copy_of_table']}' not found in base '{mapinfo['source_base']}'."
-                                    logger.error(f"KeyError: {errmsg}")
-                                    raise KeyError(errmsg)
-
-                                recordIDs_new = []
-                                for attr_val in attr_vals:
-                                    # The record copy in the current base
-                                    record_copy = data[mapinfo["source_base"]][
-                                        intm[attr]["base_copy_of_table"]
-                                    ]["records"][attr_val]
-                                    # The entire list of records in the base of origin
-                                    recordlist = data[intm[attr]["base"]][
-                                        intm_table_alias
-                                    ]["records"]
-                                    recordID_new = _map_record_id(
-                                        record_copy,
-                                        recordlist,
-                                        intm[attr]["map_by_key"],
-                                    )
-                                    recordID_filtered = [
-                                        r
-                                        for r in recordID_new
-                                        if r not in filtered_records
-                                    ]
-                                    if len(recordID_filtered) == 0:
-                                        if len(recordID_new) == 0:
-                                            logger.debug(
-                                                f"Consolidation of {table}@{intm_table_alias}: No matching"
-                                                f" record found for attribute '{attr}' with value '{attr_val}'."
-                                            )
-                                    elif len(recordID_filtered) > 1:
-                                        logger.warning(
-                                            f"Consolidation of {table}@{intm_table_alias}:"
-                                            f" Multiple matching records found for attribute '{attr}' with"
-                                            f" value '{attr_val}': {recordID_new}. Using first match."
-                                        )
-                                        recordIDs_new.append(recordID_filtered[0])
-                                    else:
-                                        recordIDs_new.append(recordID_filtered[0])
-
-                            # entry_type - name (eg. unique label or similar)
-                            # - map by attribute value
-                            elif intm[attr]["entry_type"] == "name":
-                                recordIDs_new = []
-                                for attr_val in attr_vals:
-                                    recordID_new = _map_attribute(
-                                        attr_val,
-                                        data[intm[attr]["base"]][intm_table_alias][
-                                            "records"
-                                        ],
-                                        (
-                                            [intm[attr]["map_by_key"]]
-                                            if isinstance(intm[attr]["map_by_key"], str)
-                                            else intm[attr]["map_by_key"]
-                                        ),
-                                    )
-                                    recordID_filtered = [
-                                        r
-                                        for r in recordID_new
-                                        if r not in filtered_records
-                                    ]
-                                    if len(recordID_filtered) == 0:
-                                        if len(recordID_new) == 0:
-                                            logger.debug(
-                                                f"Consolidation of {table}@{intm_table_alias}: No matching"
-                                                f" record found for attribute '{attr}' with value '{attr_val}'."
-                                            )
-                                    elif len(recordID_filtered) > 1:
-                                        logger.debug(
-                                            "Consolidation of"
-                                            f" {table}@{intm_table_alias}: Multiple matching records found"
-                                            f" for attribute '{attr}' with value '{attr_val}': {recordID_new}"
-                                        )
-                                        recordIDs_new.append(recordID_filtered[0])
-                                    else:
-                                        recordIDs_new.append(recordID_filtered[0])
-                            else:
-                                errmsg = (
-                                    f"Unknown 'entry_type' specified for attribute '{attr}'"
-                                    f" ('{source_table}'): '{intm[attr]['entry_type']}'"
-                                )
-                                logger.error(f"ValueError: {errmsg}")
-                                raise ValueError(errmsg)
-                            if not recordIDs_new:
-                                errmsg = (
-                                    f"{table} (record '{record_id}'): For attribute"
-                                    f" '{attr}' no records could be mapped."
-                                )
-                                logger.error(errmsg)
-                                # This case can actually happen for the 'Coordinate and Dimension' table
-                                # raise KeyError(errmsg)
-                            try:
-                                mapped_data["Data Request"][table]["records"][
-                                    record_id
-                                ][
-                                    mapinfo["internal_consistency"].get(attr, attr)
-                                ] = list(
-                                    set(recordIDs_new)
-                                )
-                            except KeyError:
-                                logger.debug(
-                                    f"Consolidation of {table}@{intm_table_alias}:"
-                                    f" '{record_id}' not found when adding"
-                                    f" Attribute '{attr}': {recordIDs_new}"
-                                )
-            else:
-                if mapinfo["source_base"] not in data:
-                    missing_bases.append(mapinfo["source_base"])
-                elif all(
-                    [
-                        st not in data[mapinfo["source_base"]]
-                        for st in mapinfo["source_table"]
-                    ]
-                ):
-                    missing_tables.append(mapinfo["source_table"][0])
-        if len(missing_bases) > 0:
-            errmsg = (
-                "Encountered missing bases when consolidating the data:"
-                f" {set(missing_bases)}"
-            )
-            logger.critical(errmsg)
-            raise KeyError(errmsg)
-        if len(missing_tables) > 0:
-            logger.warning(
-                "Encountered missing tables when consolidating the data (not"
-                f" necessarily problematic): {missing_tables}"
-            )
-        return _apply_hard_fixes(mapped_data)
+        # Apply the mapping table compiled for the table layout of the export
+        workers = kwargs.get("consolidation_workers", 1)
+        if workers == 0:
+            workers = os.cpu_count() or 1
+        mapped_data, report = _execute_plan(
+            mapping_table,
+            _get_layout(data),
+            data,
+            version,
+            release_source=release_source,
+            workers=workers,
+            details=report_details,
+            reuse=reuse,
+        )
+        mapped_data = _apply_hard_fixes(mapped_data)
+        return (mapped_data, report) if return_report else mapped_data
     # Return the data if it is already one-base
     elif len(data.keys()) == 1:
         l_version = next(iter(data.keys())).replace("Data Request", "").strip()
@@ -757,7 +1156,8 @@ def map_data(data, mapping_table, version, **kwargs):
                 raise ValueError(errmsg)
             mapped_data["version"] = version
         mapped_data = _apply_hard_fixes_one_base(mapped_data, version)
-        return {"Data Request": mapped_data}
+        mapped_data = {"Data Request": mapped_data}
+        return (mapped_data, dict()) if return_report else mapped_data
     else:
         errmsg = "The loaded Data Request has an unexpected data structure."
         logger.error(errmsg)
@@ -1,25 +1,42 @@
 #!/usr/bin/env python
 
 import atexit
+import contextlib
+import copy
+import functools
+import gzip
+import hashlib
 import json
 import os
+import pickle
+import re
+import threading
 import time
 import warnings
+import zipfile
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from filecmp import cmp
-from shutil import move
+from shutil import move, rmtree
 
 import data_request_api.utilities.config as dreqcfg
-import pooch
 import requests
 from bs4 import BeautifulSoup
+from data_request_api import version as api_version
 from data_request_api.content import consolidate_export as ce
 from data_request_api.content.mapping_table import mapping_table
 from data_request_api.content.utils import _parse_version, _version_pattern
 from data_request_api.utilities.decorators import append_kwargs_from_config
 from data_request_api.utilities.logger import get_logger  # noqa
-
-# Suppress pooch info output
-pooch.get_logger().setLevel("WARNING")
+from data_request_api.utilities.tools import (
+    file_lock,
+    is_file,
+    list_archive,
+    open_file,
+    split_archive_path,
+)
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 # File names of Airtable exports in JSON format
 # Raw exports
@@ -56,6 +73,10 @@ REPO_PAGE_URL = f"https://github.com/{_github_org}/CMIP7_DReq_content/"
 versions = {"tags": [], "branches": []}
 _versions_retrieved_last = {"tags": 0, "branches": 0}
 
+# File in the cache directory storing the lists of versions (tags, branches) together with
+#  the time they were retrieved, so that they are shared across processes and sessions
+_versions_index = "versions_index.json"
+
 # When retrieving versions (tags, branches), fall back to parsing the public GitHub page for
 #  the GitHub API returning the following status codes:
 #   403 Forbidden
@@ -66,23 +87,216 @@ _versions_retrieved_last = {"tags": 0, "branches": 0}
 #   504 Gateway Timeout
 _fallback_status_codes = [403, 429, 500, 502, 503, 504]
 
+# HTTP settings shared by all requests:
+#  - (connect, read) timeouts in seconds
+#  - number of retries with exponential backoff (0.5s, 1s, 2s, ...) for read errors and
+#    transient server errors (rate limits are handled by the fallback above instead) -
+#    connection errors are not retried, so that being offline fails fast
+#  - default number of concurrent downloads (and size of the connection pool)
+_http_timeout = (10, 120)
+_http_retries = 3
+_http_backoff_factor = 0.5
+_http_retry_status_codes = [500, 502, 503, 504]
+_max_workers = 4
+
+# Suffix of the files storing the HTTP metadata (ETag, Last-Modified) of cached files,
+#  used to revalidate "dev" and branches with conditional requests
+_http_metadata_suffix = ".http.json"
+
+# Manifest in each version directory recording the fingerprint of the inputs (source export,
+#  mapping table, consolidation kwargs, API version) each derived file was generated from.
+#  Derived files are only reused if their fingerprint still matches.
+_manifest = "manifest.json"
+# Kwargs influencing the consolidation and thus part of the fingerprint
+_consolidation_kwargs = ["export"]
+# Formats the consolidated content can be cached in (see config option 'cache_format')
+#  and the suffixes of the respective cache files
+_cache_suffixes = {"json": ".json", "pickle": ".pkl", "pickle.gz": ".pkl.gz"}
+# Cache formats that are unpickled when loaded - unpickling a file can run arbitrary code, so
+#  they are only read from files of the user in the writable cache root (see _is_trusted)
+_pickle_formats = ["pickle", "pickle.gz"]
+# Layout of the consolidated content cache: an index file (named as per _get_cache_filenames)
+#  and one shard file per table, so that single tables can be loaded (see load(tables=...))
+_cache_layout = "sharded"
+# Keys of the manifest entries of consolidated content that are not part of the fingerprint:
+#  the fingerprints of the source tables and of the inputs of each consolidated table, used
+#  to consolidate updated content incrementally (see _load)
+_incremental_keys = ["source_tables", "tables"]
+# Hashes of source files - keyed by path, stored with the size and mtime they are valid for
+_file_hashes = {}
+# Hash of the mapping table, stored with the mapping table object it is valid for
+_mapping_table_hash = None
+
+# File in each version directory of the writable cache root recording the last access time
+#  of each artifact, used to evict the least recently used versions (see config option
+#  'cache_max_size')
+_access_log = "access.json"
+# Whether files have been written to the writable cache root since the cache budget was
+#  last enforced - the budget is only enforced after new files have been written
+_cache_updated = False
+
+# Name of the hash manifest of bundles (zip archives of cached versions, see export_bundle)
+_bundle_manifest = "bundle_manifest.json"
+# Bundles used as read-only cache roots that have been verified - keyed by path, stored with
+#  the modification time and the outcome of the verification
+_verified_bundles = {}
+
+# Pooled HTTP session - will be created on first use by _get_session(), and the size of
+#  its connection pool
+_session = None
+_session_pool_size = 0
+_session_lock = threading.Lock()
+
 # Directory where to find/store the data request JSON files
+#  'cache_dir' may list several cache roots separated by os.pathsep (like PATH): all but the
+#  last are read-only (eg. site-wide) caches that are searched first, the last one is the
+#  writable cache new versions and derived files are stored in. Read-only cache roots may
+#  also be bundles (zip archives, see export_bundle), which are read without extraction
 try:
-    _dreq_res = dreqcfg.load_config()["cache_dir"]
+    _cache_roots = dreqcfg.load_config()["cache_dir"].split(os.pathsep)
+    _dreq_res = _cache_roots[-1]
+    _dreq_res_readonly = _cache_roots[:-1]
 except KeyError:
     _dreq_res = os.path.join(os.path.dirname(os.path.abspath(__file__)), "dreq_res")
+    _dreq_res_readonly = []
 
 _dreq_content_loaded = {}
 
+# In-process memo of the loaded content (see config option 'memo_size'), keyed by
+#  (export file, export, consolidate, force_consolidate, fingerprint) in least recently used order
+_load_memo = OrderedDict()
+_load_memo_lock = threading.Lock()
+
 # Internal flag used to determine whether a warning on API version can be issued
 # (Purpose is to prevent the warning being issued more than once per session)
 _CHECK_API_VERSION = True
 
 
+def _get_cache_roots():
+    """
+    Get the cache roots in the order they are searched.
+
+    Returns
+    -------
+    list
+        The read-only cache roots, followed by the writable cache root (_dreq_res).
+        Bundles failing verification (see verify_bundle) are left out.
+    """
+    return [
+        root
+        for root in _dreq_res_readonly
+        if root != _dreq_res and _is_usable_root(root)
+    ] + [_dreq_res]
+
+
+def _is_usable_root(root):
+    """
+    Whether a read-only cache root can be used. Bundles are verified against their
+    hash manifest when first used as cache root (and again after they changed).
+
+    Parameters
+    ----------
+    root : str
+        The read-only cache root.
+
+    Returns
+    -------
+    bool
+        False if the root is a bundle that is invalid or corrupt, else True.
+    """
+    if not (root.endswith(".zip") and os.path.isfile(root)):
+        return True
+    mtime = os.stat(root).st_mtime_ns
+    if root not in _verified_bundles or _verified_bundles[root][0] != mtime:
+        try:
+            corrupt = verify_bundle(root)
+        except (ValueError, zipfile.BadZipFile) as e:
+            corrupt = [str(e)]
+        if corrupt:
+            get_logger().error(
+                f"Ignoring cache root '{root}', the bundle is invalid or corrupt: {corrupt}"
+            )
+        _verified_bundles[root] = (mtime, not corrupt)
+    return _verified_bundles[root][1]
+
+
+def _find_cached(version, filenames, writable_only=False, fingerprint=None):
+    """
+    Find the cache directory of a version containing all of the given files.
+
+    Parameters
+    ----------
+    version : str
+        The version.
+    filenames : list
+        The names of the files that need to exist in the version directory.
+    writable_only : bool, optional
+        Whether to only consider the writable cache root. Defaults to False.
+    fingerprint : dict, optional
+        If specified, the files also need to have been derived from the inputs with
+        this fingerprint (according to the manifest of the version directory).
+
+    Returns
+    -------
+    str or None
+        The first version directory (searching the read-only cache roots first)
+        containing all files, or None if there is none.
+    """
+    roots = [_dreq_res] if writable_only else _get_cache_roots()
+    for root in roots:
+        version_dir = os.path.join(root, version)
+        if not all(is_file(os.path.join(version_dir, f)) for f in filenames):
+            continue
+        if fingerprint is not None:
+            manifest = _read_manifest(version_dir)
+            if any(
+                _get_manifest_fingerprint(manifest.get(f)) != fingerprint
+                for f in filenames
+            ):
+                continue
+        return version_dir
+    return None
+
+
+def _list_cached(root, json_export):
+    """
+    List the versions of a cache root that include the given content export file.
+
+    Parameters
+    ----------
+    root : str
+        The cache root.
+    json_export : str
+        The file name of the content export.
+
+    Returns
+    -------
+    list
+        The versions, i.e. the names of the subdirectories containing the export file.
+    """
+    if os.path.isfile(root) and root.endswith(".zip"):
+        return sorted(
+            {
+                member.split("/")[0]
+                for member in list_archive(root)
+                if member.count("/") == 1 and member.split("/")[1] == json_export
+            }
+        )
+    if not os.path.isdir(root):
+        return []
+    return [
+        name
+        for name in os.listdir(root)
+        if os.path.isfile(os.path.join(root, name, json_export))
+    ]
+
+
 @append_kwargs_from_config
 def get_cached(**kwargs):
     """Get list of cached versions.
 
+    Versions are listed from all cache roots, including read-only ones.
+
     Parameters
     ----------
     **kwargs
@@ -99,19 +313,13 @@ def get_cached(**kwargs):
     ValueError
         If known kwargs have an invalid value.
     """
+    json_export = _json_raw if kwargs.get("export") == "raw" else _json_release
     local_versions = []
-    if os.path.isdir(_dreq_res):
-        # List all subdirectories in the dreq_res directory that include both dreq.json files
-        #   - the subdirectory name is the tag name
-        if "export" in kwargs:
-            if kwargs["export"] == "raw":
-                json_export = _json_raw
-            elif kwargs["export"] == "release":
-                json_export = _json_release
-        local_versions = [
-            name
-            for name in os.listdir(_dreq_res)
-            if os.path.isfile(os.path.join(_dreq_res, name, json_export))
+    # List all subdirectories in the cache roots that include the dreq.json file
+    #   - the subdirectory name is the tag name
+    for root in _get_cache_roots():
+        local_versions += [
+            v for v in _list_cached(root, json_export) if v not in local_versions
         ]
     return local_versions
 
@@ -134,7 +342,8 @@ def _get_partly_cached(**kwargs):
     list
         The list of partly cached versions, i.e. versions where only derived files
         (eg. the consolidated export file) but not the officially released content
-        export files are cached.
+        export files are cached. Only derived files in the writable cache root are
+        considered, while the content export files may be in any cache root.
 
     Raises
     ------
@@ -167,23 +376,200 @@ def _get_partly_cached(**kwargs):
         local_versions = [
             name
             for name in os.listdir(_dreq_res)
-            if (
-                not os.path.isfile(os.path.join(_dreq_res, name, json_export))
-                or name in assume_deleted
-            )
+            if (not _find_cached(name, [json_export]) or name in assume_deleted)
             and (
                 os.path.isfile(os.path.join(_dreq_res, name, DR))
                 or os.path.isfile(os.path.join(_dreq_res, name, VS))
                 or os.path.isfile(os.path.join(_dreq_res, name, DR_consolidated))
                 or os.path.isfile(os.path.join(_dreq_res, name, VS_consolidated))
-                or os.path.isfile(
-                    os.path.join(_dreq_res, name, json_export_consolidated)
+                or any(
+                    _list_variants(os.path.join(_dreq_res, name), f)
+                    for f in [DR, VS, DR_consolidated, VS_consolidated]
+                )
+                or any(
+                    os.path.isfile(os.path.join(_dreq_res, name, cache_filename))
+                    or _get_shard_filenames(
+                        os.path.join(_dreq_res, name), cache_filename, cache_format
+                    )
+                    for cache_format, cache_filename in _get_cache_filenames(
+                        json_export_consolidated
+                    ).items()
                 )
             )
         ]
     return local_versions
 
 
+def _get_session(pool_size=_max_workers):
+    """
+    Get the HTTP session shared by all requests of this module.
+
+    The session keeps connections to GitHub alive between requests, and retries failed
+    requests with exponential backoff. It is safe to use from several threads.
+
+    Parameters
+    ----------
+    pool_size : int, optional
+        The number of connections that will be used concurrently. The connection pool
+        of the session is enlarged if needed. Defaults to _max_workers.
+
+    Returns
+    -------
+    requests.Session
+        The shared session.
+    """
+    global _session, _session_pool_size
+    with _session_lock:
+        if _session is None:
+            _session = requests.Session()
+        if pool_size > _session_pool_size:
+            retries = Retry(
+                total=_http_retries,
+                connect=0,
+                backoff_factor=_http_backoff_factor,
+                status_forcelist=_http_retry_status_codes,
+                allowed_methods=["GET", "HEAD"],
+                raise_on_status=False,
+            )
+            adapter = HTTPAdapter(
+                max_retries=retries,
+                pool_connections=pool_size,
+                pool_maxsize=pool_size,
+            )
+            _session.mount("https://", adapter)
+            _session.mount("http://", adapter)
+            _session_pool_size = pool_size
+    return _session
+
+
+def _download(url, path, headers=None):
+    """
+    Download a file via the shared HTTP session.
+
+    The content is streamed to a temporary file that is renamed to the target
+    path once the download is complete, so that an interrupted download never
+    leaves a truncated file behind.
+
+    Parameters
+    ----------
+    url : str
+        The URL of the file to download.
+    path : str
+        The path to store the file at.
+    headers : dict, optional
+        Additional request headers, eg. for conditional requests.
+
+    Returns
+    -------
+    dict or None
+        The validators ("etag", "last_modified") sent by the server for the file,
+        or None if the server responded with "304 Not Modified".
+
+    Raises
+    ------
+    requests.exceptions.RequestException
+        If the file could not be downloaded.
+    """
+    path_part = f"{path}.{os.getpid()}.{threading.get_ident()}.part"
+    try:
+        with _get_session().get(
+            url, stream=True, timeout=_http_timeout, headers=headers
+        ) as response:
+            if response.status_code == 304:
+                return None
+            response.raise_for_status()
+            with open(path_part, "wb") as f:
+                for chunk in response.iter_content(chunk_size=1024 * 1024):
+                    f.write(chunk)
+            validators = {
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified"),
+            }
+        os.replace(path_part, path)
+        _mark_cache_updated()
+    finally:
+        if os.path.exists(path_part):
+            os.remove(path_part)
+    return validators
+
+
+def _get_http_metadata_path(json_path):
+    """Get the path of the file storing the HTTP metadata of a cached file."""
+    return json_path + _http_metadata_suffix
+
+
+def _read_http_metadata(json_path, url):
+    """
+    Read the HTTP metadata stored for a cached file.
+
+    Parameters
+    ----------
+    json_path : str
+        The path of the cached file.
+    url : str
+        The URL the cached file has been downloaded from.
+
+    Returns
+    -------
+    dict
+        The HTTP metadata, or an empty dict if no metadata is stored or if it is
+        outdated, ie. if the cached file has been altered since, or has been
+        downloaded from a different URL.
+    """
+    try:
+        with open(_get_http_metadata_path(json_path)) as f:
+            metadata = json.load(f)
+        stat = os.stat(json_path)
+    except (OSError, ValueError):
+        return {}
+    if (
+        not isinstance(metadata, dict)
+        or metadata.get("url") != url
+        or metadata.get("size") != stat.st_size
+        or metadata.get("mtime_ns") != stat.st_mtime_ns
+    ):
+        return {}
+    return metadata
+
+
+def _write_http_metadata(json_path, url, validators):
+    """
+    Store the HTTP metadata of a cached file next to it.
+
+    Parameters
+    ----------
+    json_path : str
+        The path of the cached file.
+    url : str
+        The URL the cached file has been downloaded from.
+    validators : dict
+        The validators ("etag", "last_modified") sent by the server for the file.
+    """
+    stat = os.stat(json_path)
+    metadata = {
+        "url": url,
+        "etag": validators.get("etag"),
+        "last_modified": validators.get("last_modified"),
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+    }
+    metadata_path = _get_http_metadata_path(json_path)
+    metadata_path_part = f"{metadata_path}.{os.getpid()}.{threading.get_ident()}.part"
+    with open(metadata_path_part, "w") as f:
+        json.dump(metadata, f)
+    os.replace(metadata_path_part, metadata_path)
+
+
+def _get_conditional_headers(metadata):
+    """Get the headers to revalidate a cached file given its HTTP metadata."""
+    headers = dict()
+    if metadata.get("etag"):
+        headers["If-None-Match"] = metadata["etag"]
+    if metadata.get("last_modified"):
+        headers["If-Modified-Since"] = metadata["last_modified"]
+    return headers
+
+
 def _send_api_request(api_url, page_url="", target="tags"):
     """
     Send a request to the GitHub API for a list of tags or branches.
@@ -214,7 +600,7 @@ def _send_api_request(api_url, page_url="", target="tags"):
     # Request the list of tags or branches via the GitHub API
     global _fallback_status_codes
     results = []
-    response = requests.get(api_url + target)
+    response = _get_session().get(api_url + target, timeout=_http_timeout)
     try:
         # Raise an error for bad responses
         response.raise_for_status()
@@ -284,7 +670,7 @@ def _send_html_request(page_url, target="tags"):
     current_url = page_url + target + addon
     current_urls = list()
     while current_url:
-        response = requests.get(current_url)
+        response = _get_session().get(current_url, timeout=_http_timeout)
         try:
             # Raise an error for bad responses
             response.raise_for_status()
@@ -334,6 +720,60 @@ def _send_html_request(page_url, target="tags"):
     return results
 
 
+def _read_versions_index():
+    """
+    Read the version index from the cache directory.
+
+    Returns
+    -------
+    dict
+        The indexed versions per target ("tags", "branches"), each a dict with the
+        keys "versions" and "retrieved" (time of retrieval), or an empty dict if
+        the index does not exist or cannot be read.
+    """
+    try:
+        with open(os.path.join(_dreq_res, _versions_index)) as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(index, dict):
+        return {}
+    return {
+        target: entry
+        for target, entry in index.items()
+        if isinstance(entry, dict)
+        and isinstance(entry.get("versions"), list)
+        and isinstance(entry.get("retrieved"), (int, float))
+    }
+
+
+def _write_versions_index(target, target_versions, retrieved):
+    """
+    Update the version index in the cache directory for the given target.
+
+    Parameters
+    ----------
+    target : str
+        The target, either 'tags' or 'branches'.
+    target_versions : list
+        The list of tags or branches.
+    retrieved : float
+        The time the list has been retrieved.
+    """
+    index_path = os.path.join(_dreq_res, _versions_index)
+    index_path_part = f"{index_path}.{os.getpid()}.{threading.get_ident()}.part"
+    try:
+        os.makedirs(_dreq_res, exist_ok=True)
+        with file_lock(index_path + ".lock"):
+            index = _read_versions_index()
+            index[target] = {"versions": list(target_versions), "retrieved": retrieved}
+            with open(index_path_part, "w") as f:
+                json.dump(index, f)
+            os.replace(index_path_part, index_path)
+    except OSError as e:
+        get_logger().debug(f"Could not write the version index '{index_path}': {e}")
+
+
 @append_kwargs_from_config
 def get_versions(target="tags", **kwargs):
     """Fetch list of tags from the GitHub repository using the GitHub API.
@@ -351,6 +791,10 @@ def get_versions(target="tags", **kwargs):
     **kwargs
         offline : bool, optional
             Whether to disable online requests / retrievals. Defaults to False.
+        versions_ttl : int, optional
+            Time (in seconds) after which the list of tags or branches is retrieved again
+            instead of being taken from memory or from the version index in the cache
+            directory. Defaults to 3600.
 
     Returns
     -------
@@ -368,31 +812,57 @@ def get_versions(target="tags", **kwargs):
 
     if target not in ["tags", "branches"]:
         raise ValueError("target must be 'tags' or 'branches'.")
+    ttl = kwargs.get("versions_ttl", 3600)
 
     if "offline" in kwargs and kwargs["offline"]:
         lversions = get_cached(**kwargs)
+        # Classify the cached versions using the version index if available
+        index = _read_versions_index()
+        indexed = {t: index[t]["versions"] for t in index}
         if target == "tags":
             versions[target] = [
                 lv
                 for lv in lversions
-                if lv == "dev" or _parse_version(lv) != (0, 0, 0, "", 0)
+                if lv == "dev"
+                or lv in indexed.get("tags", [])
+                or (
+                    lv not in indexed.get("branches", [])
+                    and _parse_version(lv) != (0, 0, 0, 0, "", 0)
+                )
             ]
         else:
             versions[target] = [
                 lv
                 for lv in lversions
-                if lv != "dev" and _parse_version(lv) == (0, 0, 0, "", 0)
+                if lv != "dev"
+                and lv not in indexed.get("tags", [])
+                and (
+                    lv in indexed.get("branches", [])
+                    or _parse_version(lv) == (0, 0, 0, 0, "", 0)
+                )
             ]
     else:
-        # Retrieve the list of tags or branches from the GitHub API
-        if (
-            not versions[target]
-            or _versions_retrieved_last[target] - time.time() > 60 * 60
-        ):
-            versions[target] = _send_api_request(REPO_API_URL, REPO_PAGE_URL, target)
+        now = time.time()
+        if not versions[target] or now - _versions_retrieved_last[target] > ttl:
+            # Use the version index if it is recent enough (eg. written by another process)
+            indexed = _read_versions_index().get(target, {})
+            if indexed and now - indexed["retrieved"] <= ttl:
+                versions[target] = list(indexed["versions"])
+                _versions_retrieved_last[target] = indexed["retrieved"]
+            else:
+                # Retrieve the list of tags or branches from the GitHub API
+                versions[target] = _send_api_request(
+                    REPO_API_URL, REPO_PAGE_URL, target
+                )
 
-            # Update the last time the tags/branches were retrieved
-            _versions_retrieved_last[target] = time.time()
+                # Update the last time the tags/branches were retrieved
+                _versions_retrieved_last[target] = now
+
+                if versions[target]:
+                    _write_versions_index(target, versions[target], now)
+                elif indexed:
+                    # Fall back to the outdated version index if the retrieval failed
+                    versions[target] = list(indexed["versions"])
 
         if target == "tags" and "dev" not in versions[target]:
             versions[target].append("dev")
@@ -437,39 +907,242 @@ def _get_latest_version(stable=True, **kwargs):
     return max(versions, key=_parse_version)
 
 
-@append_kwargs_from_config
-def retrieve(version="latest_stable", **kwargs):
-    """Retrieve the JSON file for the specified version
+def _get_export_file(version, **kwargs):
+    """
+    Get the name of the content export file to retrieve for a version.
 
     Parameters
     ----------
-    version: str, optional
-        The version to retrieve. Can be 'latest', 'latest_stable',
-        'dev', or 'all' or a specific version, eg. '1.0.0'.
-        (default is 'latest_stable').
+    version : str
+        The version.
     **kwargs
         export : {'raw', 'release'}, optional
-            Export type. Defaults to 'release'.
+            Export type.
+
+    Returns
+    -------
+    str
+        The file name of the content export.
+    """
+    if "export" in kwargs:
+        if kwargs["export"] == "release" or version == "v1.0alpha":
+            return _json_release
+        elif kwargs["export"] == "raw":
+            return _json_raw
+    elif _version_pattern.match(version):
+        return _json_release
+    return _json_raw
+
+
+def _get_export_url(version, json_export, tags):
+    """
+    Get the URL of the content export file of a version.
+
+    Parameters
+    ----------
+    version : str
+        The version. The main branch is used for "dev".
+    json_export : str
+        The file name of the content export.
+    tags : list
+        The list of tags. Versions not in this list are considered branches.
+
+    Returns
+    -------
+    str
+        The URL of the content export file.
+    """
+    if version == "dev":
+        return REPO_RAW_URL_DEV.format(
+            version=_dev_branch,
+            _json_export=json_export,
+            _github_org=_github_org,
+        )
+    return REPO_RAW_URL.format(
+        version=version,
+        _json_export=json_export,
+        _github_org=_github_org,
+        target="tags" if version in tags else "heads",
+    )
+
+
+def _retrieve_export(version, json_export, tags):
+    """
+    Download the content export file of a version, or update it if cached.
+
+    Only "dev" and branches are updated, tags are considered immutable and are also
+    taken from read-only cache roots. Downloads go to the writable cache root.
+
+    Parameters
+    ----------
+    version : str
+        The version.
+    json_export : str
+        The file name of the content export.
+    tags : list
+        The list of tags. Versions not in this list are considered branches.
+
+    Returns
+    -------
+    tuple
+        The path to the content export file, and the exception raised when updating
+        an already cached file (None if the update succeeded or was not required).
+
+    Raises
+    ------
+    Exception
+        If the content export file is not cached and could not be downloaded.
+    """
+    logger = get_logger()
+    # Tags are immutable and may be taken from any cache root, including read-only ones
+    if version != "dev" and version in tags:
+        version_dir = _find_cached(version, [json_export])
+        if version_dir:
+            return os.path.join(version_dir, json_export), None
+
+    # Define the path for storing the dreq.json in the (writable) cache directory
+    #  Store it as cache_dir/version/{_json_raw/release}
+    retrieve_to_dir = os.path.join(_dreq_res, version)
+    json_path = os.path.join(retrieve_to_dir, json_export)
+    os.makedirs(retrieve_to_dir, exist_ok=True)
+    url = _get_export_url(version, json_export, tags)
+
+    # Only one process / thread at a time retrieves a file - the others wait and reuse it
+    with file_lock(json_path + ".lock"):
+        # If not already cached download
+        if not os.path.isfile(json_path):
+            validators = _download(url, json_path)
+            _write_http_metadata(json_path, url, validators)
+            logger.info(f"Retrieved version '{version}'.")
+
+        # or if the version is "dev" or a branch rather than a tag
+        elif version == "dev" or version not in tags:
+            # Revalidate the cached version with a conditional request, if the server
+            #  sent validators for it - in case it was modified, download to temporary
+            #  file and compare to cached version
+            json_path_temp = f"{json_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            try:
+                headers = _get_conditional_headers(_read_http_metadata(json_path, url))
+                validators = _download(url, json_path_temp, headers=headers)
+                if validators is None:
+                    logger.debug(f"Version '{version}' is up to date.")
+                    return json_path, None
+                # Compare files
+                if not cmp(json_path, json_path_temp, shallow=False):
+                    os.replace(json_path_temp, json_path)
+                    logger.info(f"Updated version '{version}'.")
+                _write_http_metadata(json_path, url, validators)
+            except Exception as e:
+                return json_path, e
+            finally:
+                if os.path.exists(json_path_temp):
+                    os.remove(json_path_temp)
+
+    return json_path, None
+
+
+def _retrieve_exports(exports, **kwargs):
+    """
+    Retrieve content export files concurrently.
+
+    Parameters
+    ----------
+    exports : list
+        List of (version, json_export) tuples to retrieve.
+    **kwargs
         offline : bool, optional
             Whether to disable online requests / retrievals. Defaults to False.
+        max_workers : int, optional
+            Maximum number of concurrent downloads.
 
     Returns
     -------
     dict
-        The path to the retrieved JSON file.
+        The paths to the retrieved files, keyed by (version, json_export).
+
+    Warning
+        Listing all content export files that could not be downloaded or updated.
+    """
+    json_paths = dict()
+    exports = list(dict.fromkeys(exports))
+
+    if "offline" in kwargs and kwargs["offline"]:
+        for version, json_export in exports:
+            # Prefer the writable cache root, which holds the most recently updated
+            #  copies of "dev" and branches
+            version_dir = _find_cached(
+                version, [json_export], writable_only=True
+            ) or _find_cached(version, [json_export])
+            if version_dir:
+                json_paths[(version, json_export)] = os.path.join(version_dir, json_export)
+        _record_access(json_paths.values())
+        return json_paths
+
+    if not exports:
+        return json_paths
+
+    tags = get_versions(**kwargs)
+    max_workers = max(1, min(kwargs.get("max_workers", _max_workers), len(exports)))
+    _get_session(pool_size=max_workers)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            (version, json_export): executor.submit(
+                _retrieve_export, version, json_export, tags
+            )
+            for version, json_export in exports
+        }
+
+    # Collect the results and report failures together
+    failed = dict()
+    not_updated = dict()
+    for (version, json_export), future in futures.items():
+        try:
+            json_path, update_error = future.result()
+        except Exception as e:
+            failed[(version, json_export)] = e
+            continue
+        if update_error is not None:
+            not_updated[(version, json_export)] = update_error
+        json_paths[(version, json_export)] = json_path
+
+    if failed:
+        warnings.warn(
+            "Could not retrieve the following version(s):\n"
+            + "\n".join(f"  '{v}' ({j}): {e}" for (v, j), e in failed.items())
+        )
+    if not_updated:
+        warnings.warn(
+            "Potential update failed for the following version(s):\n"
+            + "\n".join(f"  '{v}' ({j}): {e}" for (v, j), e in not_updated.items())
+        )
+
+    _record_access(json_paths.values())
+    return json_paths
+
+
+def _resolve_versions(version, **kwargs):
+    """
+    Get the list of versions matching the requested version.
+
+    Parameters
+    ----------
+    version: str
+        The version. Can be 'latest', 'latest_stable', 'dev', or 'all' or a specific
+        version, eg. '1.0.0'.
+    **kwargs
+        offline : bool, optional
+            Whether to disable online requests / retrievals. Defaults to False.
+
+    Returns
+    -------
+    list
+        The list of versions.
 
     Raises
     ------
     ValueError
         If the specified version is not found.
-    ValueError
-        If the known kwargs have an invalid value.
-    Warning
-        If the specified version does not have the specified export type.
-    Warning
-        If the specified version could not be downloaded or (if applicable) updated.
     """
-    logger = get_logger()
     if version == "latest":
         versions = [_get_latest_version(stable=False, **kwargs)]
     elif version == "latest_stable":
@@ -488,110 +1161,53 @@ def retrieve(version="latest_stable", **kwargs):
 
     if versions == [None] or not versions:
         raise ValueError(f"Version '{version}' not found.")
-    elif version in ["v1.0alpha"] and "export" in kwargs and kwargs["export"] == "raw":
+    return versions
+
+
+@append_kwargs_from_config
+def retrieve(version="latest_stable", **kwargs):
+    """Retrieve the JSON file for the specified version
+
+    Parameters
+    ----------
+    version: str, optional
+        The version to retrieve. Can be 'latest', 'latest_stable',
+        'dev', or 'all' or a specific version, eg. '1.0.0'.
+        (default is 'latest_stable').
+    **kwargs
+        export : {'raw', 'release'}, optional
+            Export type. Defaults to 'release'.
+        offline : bool, optional
+            Whether to disable online requests / retrievals. Defaults to False.
+        max_workers : int, optional
+            Maximum number of versions to download concurrently. Defaults to 4.
+
+    Returns
+    -------
+    dict
+        The path to the retrieved JSON file.
+
+    Raises
+    ------
+    ValueError
+        If the specified version is not found.
+    ValueError
+        If the known kwargs have an invalid value.
+    Warning
+        If the specified version does not have the specified export type.
+    Warning
+        If the specified version(s) could not be downloaded or (if applicable) updated.
+    """
+    versions = _resolve_versions(version, **kwargs)
+    if version in ["v1.0alpha"] and "export" in kwargs and kwargs["export"] == "raw":
         warnings.warn(
             f"For version '{version}' no raw export exists. Defaulting to release export."
         )
 
-    json_paths = dict()
-    for version in versions:
-        # Define the path for storing the dreq.json in the installation directory
-        #  Store it as path_to_api/content/dreq_res/version/{_json_raw/release}
-        retrieve_to_dir = os.path.join(_dreq_res, version)
-        # Decide whether to download release or raw json file
-        if "export" in kwargs:
-            if kwargs["export"] == "release" or version == "v1.0alpha":
-                json_export = _json_release
-            elif kwargs["export"] == "raw":
-                json_export = _json_raw
-        elif _version_pattern.match(version):
-            json_export = _json_release
-        else:
-            json_export = _json_raw
-        json_path = os.path.join(retrieve_to_dir, json_export)
-
-        if "offline" in kwargs and kwargs["offline"]:
-            if os.path.isfile(json_path):
-                json_paths[version] = json_path
-        else:
-            os.makedirs(retrieve_to_dir, exist_ok=True)
-
-            # If not already cached download with POOCH
-            if not os.path.isfile(json_path):
-                # Download with pooch - use "main" branch for "dev"
-                try:
-                    if version == "dev":
-                        url = REPO_RAW_URL_DEV.format(
-                            version=_dev_branch,
-                            _json_export=json_export,
-                            _github_org=_github_org,
-                        )
-                    elif version not in get_versions():
-                        url = REPO_RAW_URL.format(
-                            version=version,
-                            _json_export=json_export,
-                            _github_org=_github_org,
-                            target="heads",
-                        )
-                    else:
-                        url = REPO_RAW_URL.format(
-                            version=version,
-                            _json_export=json_export,
-                            _github_org=_github_org,
-                            target="tags",
-                        )
-                    json_path = pooch.retrieve(
-                        path=retrieve_to_dir,
-                        url=url,
-                        known_hash=None,
-                        fname=json_export,
-                    )
-                except Exception as e:
-                    warnings.warn(f"Could not retrieve version '{version}': {e}")
-                    continue
-                logger.info(f"Retrieved version '{version}'.")
-
-            # or if the version is "dev" or a branch rather than a tag
-            elif version == "dev" or version not in get_versions():
-                # Download with pooch to temporary file and compare to cached version
-                json_path_temp = json_path + ".tmp"
-                try:
-                    # Delete temp file if it exists
-                    if os.path.exists(json_path_temp):
-                        os.remove(json_path_temp)
-                    # Retrieve
-                    if version == "dev":
-                        url = REPO_RAW_URL_DEV.format(
-                            version=_dev_branch,
-                            _json_export=json_export,
-                            _github_org=_github_org,
-                        )
-                    else:
-                        url = REPO_RAW_URL.format(
-                            version=version,
-                            _json_export=json_export,
-                            _github_org=_github_org,
-                            target="heads",
-                        )
-                    json_path_temp = pooch.retrieve(
-                        path=retrieve_to_dir,
-                        url=url,
-                        known_hash=None,
-                        fname=json_export + ".tmp",
-                    )
-                    # Compare files
-                    if not cmp(json_path, json_path_temp, shallow=False):
-                        move(json_path_temp, json_path)
-                        logger.info(f"Updated version '{version}'.")
-                    else:
-                        os.remove(json_path_temp)
-                except Exception as e:
-                    warnings.warn(
-                        f"Potential update for version '{version}' failed: {e}"
-                    )
-
-            # Store the path to the dreq.json in the json_paths dictionary
-            json_paths[version] = json_path
+    retrieved = _retrieve_exports(
+        [(v, _get_export_file(v, **kwargs)) for v in versions], **kwargs
+    )
+    json_paths = {v: json_path for (v, _), json_path in retrieved.items()}
 
     # Capture no correct export found for cached versions (offline mode)
     if not json_paths or json_paths == {}:
@@ -602,6 +1218,62 @@ def retrieve(version="latest_stable", **kwargs):
         else:
             raise ValueError("The version(s) you requested could not be retrieved")
 
+    _enforce_cache_budget(keep=list(json_paths), **kwargs)
+    return json_paths
+
+
+@append_kwargs_from_config
+def prefetch(version="all", exports=("release", "raw"), **kwargs):
+    """Retrieve the JSON files of several versions and export types concurrently.
+
+    Parameters
+    ----------
+    version: str, optional
+        The version(s) to retrieve. Can be 'latest', 'latest_stable',
+        'dev', or 'all' or a specific version, eg. '1.0.0'.
+        (default is 'all').
+    exports : list or tuple, optional
+        The export types to retrieve (default is ('release', 'raw')).
+    **kwargs
+        offline : bool, optional
+            Whether to disable online requests / retrievals. Defaults to False.
+        max_workers : int, optional
+            Maximum number of files to download concurrently. Defaults to 4.
+
+    Returns
+    -------
+    dict
+        The paths to the retrieved JSON files, keyed by export type and version.
+
+    Raises
+    ------
+    ValueError
+        If the specified version is not found or nothing could be retrieved.
+    Warning
+        If any of the JSON files could not be downloaded or (if applicable) updated.
+    """
+    for export in exports:
+        dreqcfg._sanity_check("export", export)
+    kwargs.pop("export", None)
+    versions = _resolve_versions(version, **kwargs)
+
+    exports_per_version = {
+        (export, v): (v, _get_export_file(v, export=export, **kwargs))
+        for export in exports
+        for v in versions
+    }
+    retrieved = _retrieve_exports(list(exports_per_version.values()), **kwargs)
+
+    json_paths = {export: dict() for export in exports}
+    for (export, v), key in exports_per_version.items():
+        if key in retrieved:
+            json_paths[export][v] = retrieved[key]
+
+    _enforce_cache_budget(keep=versions, **kwargs)
+
+    if not any(json_paths.values()):
+        raise ValueError("The version(s) you requested could not be retrieved")
+
     return json_paths
 
 
@@ -610,6 +1282,9 @@ def cleanup(**kwargs):
     """
     Clean up the dreq_res directory.
 
+    Derived files are removed from the writable cache root for versions whose
+    content export file is not cached in any cache root.
+
     Parameters
     ----------
     **kwargs :
@@ -643,11 +1318,17 @@ def cleanup(**kwargs):
             os.path.join(_dreq_res, v, version_type)
             for v in cleanup_versions
             for version_type in [
-                _json_raw_c,
+                *_get_cache_filenames(_json_raw_c).values(),
+                *_list_shards(os.path.join(_dreq_res, v), _json_raw_c),
                 _json_raw_c_DR,
                 _json_raw_c_VS,
                 _json_raw_nc_DR,
                 _json_raw_nc_VS,
+                *[
+                    variant
+                    for f in [_json_raw_c_DR, _json_raw_c_VS, _json_raw_nc_DR, _json_raw_nc_VS]
+                    for variant in _list_variants(os.path.join(_dreq_res, v), f)
+                ],
             ]
         ]
     elif kwargs["export"] == "release":
@@ -655,11 +1336,17 @@ def cleanup(**kwargs):
             os.path.join(_dreq_res, v, version_type)
             for v in cleanup_versions
             for version_type in [
-                _json_release_c,
+                *_get_cache_filenames(_json_release_c).values(),
+                *_list_shards(os.path.join(_dreq_res, v), _json_release_c),
                 _json_release_c_DR,
                 _json_release_c_VS,
                 _json_release_nc_DR,
                 _json_release_nc_VS,
+                *[
+                    variant
+                    for f in [_json_release_c_DR, _json_release_c_VS, _json_release_nc_DR, _json_release_nc_VS]
+                    for variant in _list_variants(os.path.join(_dreq_res, v), f)
+                ],
             ]
         ]
 
@@ -676,10 +1363,500 @@ def cleanup(**kwargs):
                     logger.warning(f"Could not delete '{f}': {e}")
 
 
+def _get_latest_cached(local_versions):
+    """
+    Identify the latest and the latest stable version among cached versions.
+
+    Parameters
+    ----------
+    local_versions : list
+        The cached versions.
+
+    Returns
+    -------
+    tuple
+        The latest version and the latest stable version (False if there is none).
+    """
+    valid_versions = [v for v in local_versions if _version_pattern.match(v)]
+    valid_sversions = [v for v in valid_versions if "a" not in v and "b" not in v]
+    latest = False
+    latest_stable = False
+    if valid_versions:
+        latest = max(valid_versions, key=_parse_version)
+    if valid_sversions:
+        latest_stable = max(valid_sversions, key=_parse_version)
+    return latest, latest_stable
+
+
+def _record_access(paths):
+    """
+    Record the access of cached artifacts in the access log of their version directory.
+
+    Only artifacts in the writable cache root are recorded, as only those can be evicted.
+
+    Parameters
+    ----------
+    paths : iterable
+        The paths of the accessed artifacts.
+    """
+    now = time.time()
+    per_version_dir = dict()
+    for path in paths:
+        version_dir = os.path.dirname(os.path.abspath(path))
+        if os.path.dirname(version_dir) == os.path.abspath(_dreq_res):
+            per_version_dir.setdefault(version_dir, []).append(os.path.basename(path))
+    for version_dir, filenames in per_version_dir.items():
+        access_log_path = os.path.join(version_dir, _access_log)
+        try:
+            with file_lock(access_log_path + ".lock"):
+                access_log = _read_access_log(version_dir)
+                access_log.update({f: now for f in filenames})
+                access_log_path_part = (
+                    f"{access_log_path}.{os.getpid()}.{threading.get_ident()}.part"
+                )
+                with open(access_log_path_part, "w") as f:
+                    json.dump(access_log, f)
+                os.replace(access_log_path_part, access_log_path)
+        except OSError as e:
+            get_logger().debug(f"Could not record access in '{access_log_path}': {e}")
+
+
+def _read_access_log(version_dir):
+    """
+    Read the access log of a version directory.
+
+    Parameters
+    ----------
+    version_dir : str
+        The version directory.
+
+    Returns
+    -------
+    dict
+        The last access times keyed by artifact file name.
+    """
+    try:
+        with open(os.path.join(version_dir, _access_log)) as f:
+            access_log = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return access_log if isinstance(access_log, dict) else {}
+
+
+def get_cache_usage():
+    """
+    Get the disk usage and last access time of the versions in the writable cache root.
+
+    Returns
+    -------
+    dict
+        Keyed by version, dicts with the keys "size" (bytes), "last_access" (time) and
+        "artifacts", the size and last access time of each artifact (file) of the version.
+        Artifacts never recorded as accessed fall back to their modification time.
+    """
+    usage = dict()
+    if not os.path.isdir(_dreq_res):
+        return usage
+    for version in sorted(os.listdir(_dreq_res)):
+        version_dir = os.path.join(_dreq_res, version)
+        if not os.path.isdir(version_dir):
+            continue
+        access_log = _read_access_log(version_dir)
+        artifacts = dict()
+        size = 0
+        for filename in os.listdir(version_dir):
+            try:
+                stat = os.stat(os.path.join(version_dir, filename))
+            except OSError:
+                continue
+            size += stat.st_size
+            if filename.endswith(".lock") or filename == _access_log:
+                continue
+            artifacts[filename] = {
+                "size": stat.st_size,
+                "last_access": access_log.get(filename, stat.st_mtime),
+            }
+        usage[version] = {
+            "size": size,
+            "last_access": max(
+                [a["last_access"] for a in artifacts.values()], default=0
+            ),
+            "artifacts": artifacts,
+        }
+    return usage
+
+
+@append_kwargs_from_config
+def evict(max_size=None, keep=(), **kwargs):
+    """
+    Evict the least recently used versions from the writable cache root until it
+    fits into the cache budget.
+
+    The "dev" version and the latest cached stable version are never evicted, nor
+    are versions being written or read by another process or thread (i.e. of which
+    a file lock is held).
+
+    Parameters
+    ----------
+    max_size : int, optional
+        The cache budget in bytes. Defaults to the config option 'cache_max_size'.
+        No version is evicted if it is 0.
+    keep : list or tuple, optional
+        Versions not to evict (eg. the versions in use). Defaults to ().
+    **kwargs
+        dryrun : bool, optional
+            Whether to only list the versions that would be evicted instead of actually
+            evicting them. Defaults to False.
+
+    Returns
+    -------
+    list
+        The evicted versions.
+    """
+    logger = get_logger()
+    if max_size is None:
+        max_size = kwargs.get("cache_max_size", 0)
+    if not max_size:
+        return []
+
+    usage = get_cache_usage()
+    total = sum(u["size"] for u in usage.values())
+    if total <= max_size:
+        return []
+
+    # Never evict "dev" and the latest stable version
+    cached = _list_cached(_dreq_res, _json_release) + _list_cached(_dreq_res, _json_raw)
+    protected = ["dev", _get_latest_cached(cached)[1]] + list(keep)
+
+    evicted = []
+    for version in sorted(usage, key=lambda v: usage[v]["last_access"]):
+        if total <= max_size:
+            break
+        if version in protected:
+            continue
+        if kwargs.get("dryrun", False):
+            logger.info(f"Dryrun: would evict version '{version}'.")
+        else:
+            version_dir = os.path.join(_dreq_res, version)
+            try:
+                # Hold all the locks of the version, so that no file of it is being
+                #  retrieved or consolidated while it is removed
+                with contextlib.ExitStack() as locks:
+                    for filename in sorted(os.listdir(version_dir)):
+                        if filename.endswith(".lock"):
+                            locks.enter_context(
+                                file_lock(
+                                    os.path.join(version_dir, filename), blocking=False
+                                )
+                            )
+                    rmtree(version_dir)
+                logger.info(f"Evicted version '{version}' from the cache.")
+            except BlockingIOError:
+                logger.info(f"Not evicting version '{version}', it is in use.")
+                continue
+            except OSError as e:
+                logger.warning(f"Could not evict version '{version}': {e}")
+                continue
+        total -= usage[version]["size"]
+        evicted.append(version)
+
+    if total > max_size:
+        logger.warning(
+            f"The cache ({total} bytes) exceeds its budget of {max_size} bytes,"
+            " but only versions in use or protected from eviction are left."
+        )
+    return evicted
+
+
+def _mark_cache_updated():
+    """
+    Record that files have been written to the writable cache root, so that the cache
+    budget is enforced by the next call of _enforce_cache_budget.
+    """
+    global _cache_updated
+    _cache_updated = True
+
+
+def _enforce_cache_budget(keep=(), **kwargs):
+    """
+    Evict least recently used versions if the cache exceeds its budget
+    (config option 'cache_max_size'). Nothing is done if no files have been written
+    to the cache since the budget was last enforced.
+
+    Parameters
+    ----------
+    keep : list or tuple, optional
+        Versions not to evict (eg. the versions in use). Defaults to ().
+    """
+    global _cache_updated
+    if (
+        _cache_updated
+        and kwargs.get("cache_max_size", 0)
+        and not kwargs.get("dryrun", False)
+    ):
+        _cache_updated = False
+        evict(keep=keep, **kwargs)
+
+
+def _is_bundled(filename):
+    """
+    Whether a file of a version directory is to be included in a bundle (artifacts
+    that may travel in a bundle, see _is_known_artifact, but no locks, access logs,
+    HTTP metadata, partial downloads or pickled caches).
+    """
+    return _is_known_artifact(filename)
+
+
+def export_bundle(bundle, version="all"):
+    """
+    Pack cached versions from the writable cache root into a bundle, a zip archive
+    including a hash manifest.
+
+    The bundle contains all artifacts of the versions: content exports, consolidated
+    content (JSON caches only, pickled caches are never bundled) and DR/VS files.
+    It can be imported into another cache with import_bundle,
+    or be used directly (without extraction) as read-only cache root (see 'cache_dir').
+
+    Parameters
+    ----------
+    bundle : str
+        The path of the bundle to create.
+    version : str or list, optional
+        The version(s) to pack, or 'all' (default is 'all').
+
+    Returns
+    -------
+    list
+        The packed versions.
+
+    Raises
+    ------
+    ValueError
+        If a requested version is not cached.
+    """
+    logger = get_logger()
+    cached = (
+        sorted(
+            v
+            for v in os.listdir(_dreq_res)
+            if os.path.isdir(os.path.join(_dreq_res, v))
+            and any(_is_bundled(f) for f in os.listdir(os.path.join(_dreq_res, v)))
+        )
+        if os.path.isdir(_dreq_res)
+        else []
+    )
+    if version == "all":
+        versions = cached
+    else:
+        versions = [version] if isinstance(version, str) else list(version)
+        missing = [v for v in versions if v not in cached]
+        if missing:
+            raise ValueError(f"The following version(s) are not cached: {missing}")
+
+    manifest = {"api_version": api_version, "created": time.time(), "files": {}}
+    bundle_part = f"{bundle}.{os.getpid()}.{threading.get_ident()}.part"
+    try:
+        with zipfile.ZipFile(bundle_part, "w", zipfile.ZIP_DEFLATED) as zf:
+            for v in versions:
+                version_dir = os.path.join(_dreq_res, v)
+                for filename in sorted(os.listdir(version_dir)):
+                    path = os.path.join(version_dir, filename)
+                    if not os.path.isfile(path) or not _is_bundled(filename):
+                        continue
+                    zf.write(path, f"{v}/{filename}")
+                    manifest["files"][f"{v}/{filename}"] = _hash_file(path)
+            zf.writestr(_bundle_manifest, json.dumps(manifest, indent=2))
+        os.replace(bundle_part, bundle)
+    finally:
+        if os.path.exists(bundle_part):
+            os.remove(bundle_part)
+    logger.info(f"Packed version(s) {versions} into bundle '{bundle}'.")
+    return versions
+
+
+def _is_known_artifact(filename):
+    """
+    Whether a file name is the name of an artifact of a version directory that may
+    travel in a bundle (content export, JSON consolidated content cache or shard, DR/VS
+    file or variant, manifest). Pickled caches are excluded: they would be trusted once
+    imported into the writable cache root (see _is_trusted), but the hash manifest of a
+    bundle cannot tell whether their content is safe to unpickle.
+    """
+    consolidated = [_json_raw_c, _json_release_c]
+    transformed = [
+        _json_raw_c_DR, _json_raw_c_VS, _json_raw_nc_DR, _json_raw_nc_VS,
+        _json_release_c_DR, _json_release_c_VS, _json_release_nc_DR, _json_release_nc_VS,
+    ]
+    patterns = [re.escape(f) for f in [_json_raw, _json_release, _manifest]]
+    for json_export_consolidated in consolidated:
+        for cache_format, cache_filename in _get_cache_filenames(
+            json_export_consolidated
+        ).items():
+            if cache_format in _pickle_formats:
+                continue
+            suffix = _cache_suffixes[cache_format]
+            patterns.append(
+                re.escape(cache_filename[: -len(suffix)]) + r"(\.\d{3})?" + re.escape(suffix)
+            )
+    for transformed_filename in transformed:
+        stem, ext = os.path.splitext(transformed_filename)
+        patterns.append(re.escape(stem) + r"(\.[\w-]+)?" + re.escape(ext))
+    return re.fullmatch("|".join(patterns), filename) is not None
+
+
+def _split_bundle_member(member):
+    """
+    Split the name of a bundle member into version and file name.
+
+    Raises
+    ------
+    ValueError
+        If the member is not a known artifact of a version directory, i.e. is not
+        named '<version>/<artifact>'.
+    """
+    parts = member.split("/")
+    if (
+        len(parts) != 2
+        or re.fullmatch(r"[\w.+-]+", parts[0]) is None
+        or parts[0] in [".", ".."]
+        or not _is_known_artifact(parts[1])
+    ):
+        raise ValueError(f"Invalid member '{member}' in bundle.")
+    return parts[0], parts[1]
+
+
+def _read_bundle_manifest(zf):
+    """
+    Read the hash manifest of an opened bundle.
+
+    Raises
+    ------
+    ValueError
+        If the archive has no valid hash manifest.
+    """
+    try:
+        with zf.open(_bundle_manifest) as f:
+            manifest = json.load(f)
+        files = manifest["files"]
+    except (KeyError, ValueError, TypeError):
+        raise ValueError(f"'{zf.filename}' is not a valid bundle (no hash manifest).")
+    return files
+
+
+def verify_bundle(bundle):
+    """
+    Verify the integrity of a bundle against its hash manifest.
+
+    Parameters
+    ----------
+    bundle : str
+        The path of the bundle.
+
+    Returns
+    -------
+    list
+        The members of the bundle that are missing, corrupt or not named like an
+        artifact of a version directory (empty if it is intact).
+
+    Raises
+    ------
+    ValueError
+        If the archive has no valid hash manifest.
+    """
+    corrupt = []
+    with zipfile.ZipFile(bundle) as zf:
+        files = _read_bundle_manifest(zf)
+        members = set(zf.namelist())
+        for member, sha in files.items():
+            try:
+                _split_bundle_member(member)
+            except ValueError:
+                corrupt.append(member)
+                continue
+            if member not in members:
+                corrupt.append(member)
+                continue
+            hasher = hashlib.sha256()
+            with zf.open(member) as f:
+                for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                    hasher.update(chunk)
+            if hasher.hexdigest() != sha:
+                corrupt.append(member)
+    return corrupt
+
+
+def import_bundle(bundle):
+    """
+    Extract the versions of a bundle into the writable cache root.
+
+    Every file is verified against the hash manifest of the bundle before it is
+    placed into the cache. Files already cached with the same content are skipped,
+    and the fingerprints of the derived files are merged into existing manifests.
+    Bundles with members not named '<version>/<artifact>' are rejected as a whole.
+
+    Parameters
+    ----------
+    bundle : str
+        The path of the bundle.
+
+    Returns
+    -------
+    list
+        The imported versions.
+
+    Raises
+    ------
+    ValueError
+        If the archive has no valid hash manifest, or a file of the bundle is invalid
+        or corrupt.
+    """
+    logger = get_logger()
+    versions = []
+    with zipfile.ZipFile(bundle) as zf:
+        files = _read_bundle_manifest(zf)
+        # Validate all members before anything is extracted
+        members = {member: _split_bundle_member(member) for member in files}
+        for member, sha in files.items():
+            v, filename = members[member]
+            if v not in versions:
+                versions.append(v)
+            version_dir = os.path.join(_dreq_res, os.path.basename(v))
+            path = os.path.join(version_dir, os.path.basename(filename))
+            os.makedirs(version_dir, exist_ok=True)
+
+            if filename == _manifest:
+                with zf.open(member) as f:
+                    for derived, fingerprint in json.load(f).items():
+                        _update_manifest(version_dir, derived, fingerprint)
+                continue
+            if os.path.isfile(path) and _hash_file(path) == sha:
+                continue
+
+            path_part = f"{path}.{os.getpid()}.{threading.get_ident()}.part"
+            try:
+                hasher = hashlib.sha256()
+                with zf.open(member) as f, open(path_part, "wb") as fout:
+                    for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                        hasher.update(chunk)
+                        fout.write(chunk)
+                if hasher.hexdigest() != sha:
+                    raise ValueError(f"Corrupt file '{member}' in bundle '{bundle}'.")
+                with file_lock(path + ".lock"):
+                    os.replace(path_part, path)
+            finally:
+                if os.path.exists(path_part):
+                    os.remove(path_part)
+    logger.info(f"Imported version(s) {versions} from bundle '{bundle}'.")
+    return versions
+
+
 @append_kwargs_from_config
 def delete(version="all", keep_latest=False, **kwargs):
     """Delete one or all cached versions with option to keep latest versions.
 
+    Only versions in the writable cache root are deleted, read-only cache roots
+    are left untouched.
+
     Parameters
     ----------
     version : str, optional
@@ -707,22 +1884,15 @@ def delete(version="all", keep_latest=False, **kwargs):
         If 'keep_latest' option is active when 'version' is not 'all'.
     """
     logger = get_logger()
-    # Get locally cached versions
-    local_versions = get_cached(**kwargs)
+    # Get locally cached versions - only the writable cache root can be modified
+    local_versions = _list_cached(
+        _dreq_res, _json_raw if kwargs["export"] == "raw" else _json_release
+    )
 
     if version == "all":
         if keep_latest:
             # Identify the latest stable and prerelease versions
-            valid_versions = [v for v in local_versions if _version_pattern.match(v)]
-            valid_sversions = [
-                v for v in valid_versions if "a" not in v and "b" not in v
-            ]
-            latest = False
-            latest_stable = False
-            if valid_versions:
-                latest = max(valid_versions, key=_parse_version)
-            if valid_sversions:
-                latest_stable = max(valid_sversions, key=_parse_version)
+            latest, latest_stable = _get_latest_cached(local_versions)
             to_keep = [v for v in ["dev", latest, latest_stable] if v]
             local_versions = [v for v in local_versions if v not in to_keep]
     else:
@@ -754,7 +1924,12 @@ def delete(version="all", keep_latest=False, **kwargs):
                 logger.info(f"Dryrun: would delete '{f}'.")
             else:
                 try:
-                    os.remove(f)
+                    # Do not delete a file while it is being retrieved
+                    with file_lock(f + ".lock"):
+                        os.remove(f)
+                        # The HTTP metadata of the file is of no use anymore
+                        if os.path.isfile(_get_http_metadata_path(f)):
+                            os.remove(_get_http_metadata_path(f))
                     logger.info(f"Deleted '{f}'.")
                 except Exception as e:
                     logger.warning(f"Could not delete '{f}': {e}")
@@ -763,15 +1938,712 @@ def delete(version="all", keep_latest=False, **kwargs):
     cleanup(assume_deleted=cached_files, **kwargs)
 
 
+def _get_cache_filenames(json_export_consolidated):
+    """
+    Get the names of the files the consolidated content may be cached in, one per cache format.
+
+    Parameters
+    ----------
+    json_export_consolidated : str
+        The name of the consolidated JSON file, eg. _json_release_c.
+
+    Returns
+    -------
+    dict
+        The file names keyed by cache format.
+    """
+    basename = os.path.splitext(json_export_consolidated)[0]
+    return {
+        cache_format: f"{basename}{suffix}"
+        for cache_format, suffix in _cache_suffixes.items()
+    }
+
+
+def _intern_strings(obj, memo):
+    """
+    Replace equal strings in a JSON-like object by a single string object.
+
+    Record IDs and attribute values reoccur many times in the content, but are
+    distinct objects after parsing the JSON. Sharing them lets pickle store each
+    string only once, which makes the cache files smaller and faster to load.
+
+    Parameters
+    ----------
+    obj : dict, list, str or scalar
+        The object to process.
+    memo : dict
+        The strings encountered so far.
+
+    Returns
+    -------
+    The object with equal strings shared.
+    """
+    if isinstance(obj, str):
+        return memo.setdefault(obj, obj)
+    elif isinstance(obj, dict):
+        return {
+            memo.setdefault(k, k) if isinstance(k, str) else k: _intern_strings(v, memo)
+            for k, v in obj.items()
+        }
+    elif isinstance(obj, list):
+        return [_intern_strings(v, memo) for v in obj]
+    return obj
+
+
+def _dump_cache(obj, path, cache_format):
+    """
+    Serialise the consolidated content to a cache file.
+
+    Parameters
+    ----------
+    obj : dict
+        The consolidated content.
+    path : str
+        The path of the cache file.
+    cache_format : {'json', 'pickle', 'pickle.gz'}
+        The format of the cache file.
+    """
+    if cache_format == "json":
+        with open(path, "w") as f:
+            json.dump(obj, f)
+    elif cache_format == "pickle":
+        with open(path, "wb") as f:
+            pickle.dump(_intern_strings(obj, {}), f, protocol=5)
+    elif cache_format == "pickle.gz":
+        with gzip.open(path, "wb", compresslevel=6) as f:
+            pickle.dump(_intern_strings(obj, {}), f, protocol=5)
+    else:
+        raise ValueError(f"Unknown cache format: {cache_format}.")
+
+
+def _is_trusted(path):
+    """
+    Whether a cache file can be unpickled: it has to be located in the writable cache root
+    (not in a read-only cache root or a bundle) and be owned by the current user.
+
+    Parameters
+    ----------
+    path : str
+        The path of the cache file.
+
+    Returns
+    -------
+    bool
+        Whether the file is trusted.
+    """
+    if split_archive_path(path)[0] is not None:
+        return False
+    root = os.path.realpath(_dreq_res)
+    real_path = os.path.realpath(path)
+    if os.path.commonpath([root, real_path]) != root:
+        return False
+    if hasattr(os, "getuid"):
+        try:
+            return os.stat(real_path).st_uid == os.getuid()
+        except OSError:
+            return False
+    return True
+
+
+def _load_cache(path, cache_format):
+    """
+    Deserialise the consolidated content from a cache file.
+
+    Pickled files are only loaded if they are trusted (see _is_trusted).
+
+    Parameters
+    ----------
+    path : str
+        The path of the cache file.
+    cache_format : {'json', 'pickle', 'pickle.gz'}
+        The format of the cache file.
+
+    Returns
+    -------
+    dict
+        The consolidated content.
+
+    Raises
+    ------
+    ValueError
+        If the cache format is unknown or the pickled file is not trusted.
+    """
+    if cache_format in _pickle_formats and not _is_trusted(path):
+        raise ValueError(f"Refusing to unpickle untrusted cache file: {path}.")
+    if cache_format == "json":
+        with open_file(path) as f:
+            return json.load(f)
+    elif cache_format == "pickle":
+        with open_file(path, "rb") as f:
+            return pickle.load(f)
+    elif cache_format == "pickle.gz":
+        with open_file(path, "rb") as f, gzip.GzipFile(fileobj=f) as gf:
+            return pickle.load(gf)
+    raise ValueError(f"Unknown cache format: {cache_format}.")
+
+
+def _get_shard_filenames(version_dir, cache_filename, cache_format):
+    """
+    List the table shards of a sharded cache that exist in a version directory.
+
+    Parameters
+    ----------
+    version_dir : str
+        The version directory.
+    cache_filename : str
+        The name of the index file of the sharded cache (see _get_cache_filenames).
+    cache_format : {'json', 'pickle', 'pickle.gz'}
+        The format of the cache.
+
+    Returns
+    -------
+    list
+        The names of the shard files.
+    """
+    suffix = _cache_suffixes[cache_format]
+    pattern = re.compile(
+        re.escape(cache_filename[: -len(suffix)]) + r"\.\d{3}" + re.escape(suffix) + "$"
+    )
+    if not os.path.isdir(version_dir):
+        return []
+    return sorted(f for f in os.listdir(version_dir) if pattern.match(f))
+
+
+def _get_variant_filename(filename, variant=None):
+    """
+    Get the name of a variant of a transformed content file (DR/VS file), eg.
+    'DR_release_consolidate_content.cmip6_compound_name.json'. Several variants of the
+    transformed content (eg. with different variable names) can be cached side by side.
+
+    Parameters
+    ----------
+    filename : str
+        The name of the transformed content file, eg. _json_release_c_DR.
+    variant : str, optional
+        The name of the variant. Defaults to None, i.e. the default variant.
+
+    Returns
+    -------
+    str
+        The name of the variant file.
+    """
+    if variant is None:
+        return filename
+    stem, ext = os.path.splitext(filename)
+    return f"{stem}.{variant}{ext}"
+
+
+def _list_variants(version_dir, filename):
+    """
+    List the variants (other than the default one) of a transformed content file
+    that exist in a version directory.
+
+    Parameters
+    ----------
+    version_dir : str
+        The version directory.
+    filename : str
+        The name of the transformed content file, eg. _json_release_c_DR.
+
+    Returns
+    -------
+    list
+        The names of the variant files.
+    """
+    stem, ext = os.path.splitext(filename)
+    pattern = re.compile(re.escape(stem) + r"\.[\w-]+" + re.escape(ext) + "$")
+    if not os.path.isdir(version_dir):
+        return []
+    return sorted(f for f in os.listdir(version_dir) if pattern.match(f))
+
+
+def _list_shards(version_dir, json_export_consolidated):
+    """
+    List the table shards of the sharded caches of all formats in a version directory.
+
+    Parameters
+    ----------
+    version_dir : str
+        The version directory.
+    json_export_consolidated : str
+        The name of the consolidated JSON file, eg. _json_release_c.
+
+    Returns
+    -------
+    list
+        The names of the shard files.
+    """
+    return [
+        shard
+        for cache_format, cache_filename in _get_cache_filenames(
+            json_export_consolidated
+        ).items()
+        for shard in _get_shard_filenames(version_dir, cache_filename, cache_format)
+    ]
+
+
+def _dump_sharded(content, version_dir, cache_filename, cache_format):
+    """
+    Serialise the consolidated content to one shard file per table and an index file.
+
+    The index has the structure of the content, with each table replaced by
+    {"shard": <shard file name>}. It is written last, so that it only ever refers
+    to complete shards. Shards left over from earlier content are removed.
+
+    Parameters
+    ----------
+    content : dict
+        The consolidated content.
+    version_dir : str
+        The version directory.
+    cache_filename : str
+        The name of the index file (see _get_cache_filenames).
+    cache_format : {'json', 'pickle', 'pickle.gz'}
+        The format of the cache.
+
+    Returns
+    -------
+    list
+        The paths of the index and shard files.
+    """
+    suffix = _cache_suffixes[cache_format]
+    index = {}
+    shards = []
+    for base_name, base in content.items():
+        index[base_name] = {}
+        for key, value in base.items():
+            if isinstance(value, dict):
+                shard = f"{cache_filename[: -len(suffix)]}.{len(shards):03d}{suffix}"
+                _dump_cache_atomic(value, os.path.join(version_dir, shard), cache_format)
+                index[base_name][key] = {"shard": shard}
+                shards.append(shard)
+            else:
+                index[base_name][key] = value
+    _dump_cache_atomic(index, os.path.join(version_dir, cache_filename), cache_format)
+    for shard in _get_shard_filenames(version_dir, cache_filename, cache_format):
+        if shard not in shards:
+            os.remove(os.path.join(version_dir, shard))
+    return [os.path.join(version_dir, f) for f in [cache_filename] + shards]
+
+
+def _dump_cache_atomic(obj, path, cache_format):
+    """
+    Serialise an object to a cache file via a temporary file, so that readers never
+    see a partially written file. See _dump_cache for the parameters.
+    """
+    path_part = f"{path}.{os.getpid()}.{threading.get_ident()}.part"
+    try:
+        _dump_cache(obj, path_part, cache_format)
+        os.replace(path_part, path)
+        _mark_cache_updated()
+    finally:
+        if os.path.exists(path_part):
+            os.remove(path_part)
+
+
+def _load_sharded(version_dir, cache_filename, cache_format, tables=None):
+    """
+    Deserialise the consolidated content from a sharded cache, reading only the
+    shards of the requested tables.
+
+    Parameters
+    ----------
+    version_dir : str
+        The version directory (may be located in a zip archive).
+    cache_filename : str
+        The name of the index file (see _get_cache_filenames).
+    cache_format : {'json', 'pickle', 'pickle.gz'}
+        The format of the cache.
+    tables : list, optional
+        The names of the tables to load. Defaults to None, i.e. all tables.
+
+    Returns
+    -------
+    tuple
+        The consolidated content (tables not requested are left out) and
+        the paths of the files that have been read.
+    """
+    paths = [os.path.join(version_dir, cache_filename)]
+    index = _load_cache(paths[0], cache_format)
+    content = {}
+    for base_name, base in index.items():
+        content[base_name] = {}
+        for key, value in base.items():
+            if not isinstance(value, dict):
+                content[base_name][key] = value
+            elif tables is None or key in tables:
+                paths.append(os.path.join(version_dir, value["shard"]))
+                content[base_name][key] = _load_cache(paths[-1], cache_format)
+    return content, paths
+
+
+def _load_reusable_tables(version_dir, cache_filename, cache_format, tables):
+    """
+    Load tables of the cached consolidated content to reuse them when consolidating
+    updated content (see consolidate_export.map_data).
+
+    Parameters
+    ----------
+    version_dir : str
+        The version directory.
+    cache_filename : str
+        The name of the index file (see _get_cache_filenames).
+    cache_format : {'json', 'pickle', 'pickle.gz'}
+        The format of the cache.
+    tables : list
+        The names of the tables to load.
+
+    Returns
+    -------
+    dict
+        The tables that could be loaded, keyed by name.
+    """
+    try:
+        content = _load_sharded(version_dir, cache_filename, cache_format, tables)[0]
+    except Exception as e:
+        get_logger().warning(f"Could not read consolidated data from cache ({e}).")
+        return {}
+    return {
+        key: value
+        for base in content.values()
+        for key, value in base.items()
+        if isinstance(value, dict)
+    }
+
+
+def _select_tables(content, tables=None):
+    """
+    Select tables of the content, keeping the non-table entries (eg. "version") of each base.
+
+    Parameters
+    ----------
+    content : dict
+        The content, keyed by base name.
+    tables : list, optional
+        The names of the tables to keep. Defaults to None, i.e. all tables.
+
+    Returns
+    -------
+    dict
+        The content restricted to the given tables (not a copy if tables is None).
+    """
+    if tables is None:
+        return content
+    return {
+        base_name: {
+            key: value
+            for key, value in base.items()
+            if not isinstance(value, dict) or key in tables
+        }
+        for base_name, base in content.items()
+    }
+
+
+def _hash_file(path):
+    """
+    Compute the SHA-256 hash of a file, reusing the hash computed earlier in this session
+    if the file has not changed in the meantime.
+
+    Parameters
+    ----------
+    path : str
+        The path of the file.
+
+    Returns
+    -------
+    str
+        The hex digest of the file content.
+    """
+    # Files in zip archives are considered unchanged as long as the archive is
+    stat = os.stat(split_archive_path(path)[0] or path)
+    key = (stat.st_size, stat.st_mtime_ns)
+    if path in _file_hashes and _file_hashes[path][0] == key:
+        return _file_hashes[path][1]
+    sha = hashlib.sha256()
+    with open_file(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            sha.update(chunk)
+    _file_hashes[path] = (key, sha.hexdigest())
+    return _file_hashes[path][1]
+
+
+def _get_mapping_table_hash(table):
+    """
+    Compute the SHA-256 hash of the mapping table, reusing the hash computed earlier in
+    this session for the same table object.
+
+    Parameters
+    ----------
+    table : dict
+        The mapping table.
+
+    Returns
+    -------
+    str
+        The hex digest of the mapping table.
+    """
+    global _mapping_table_hash
+    if _mapping_table_hash is None or _mapping_table_hash[0] is not table:
+        _mapping_table_hash = (
+            table,
+            hashlib.sha256(
+                json.dumps(table, sort_keys=True, default=str).encode()
+            ).hexdigest(),
+        )
+    return _mapping_table_hash[1]
+
+
+def _get_fingerprint(json_path, **kwargs):
+    """
+    Get the fingerprint of the inputs the consolidated content is derived from.
+
+    Parameters
+    ----------
+    json_path : str
+        The path of the source export.
+    **kwargs
+        The consolidation kwargs (see _consolidation_kwargs).
+
+    Returns
+    -------
+    dict
+        The fingerprint.
+    """
+    return {
+        "source": _hash_file(json_path),
+        "mapping_table": _get_mapping_table_hash(mapping_table),
+        "kwargs": {key: kwargs.get(key) for key in _consolidation_kwargs},
+        "api_version": api_version,
+        "layout": _cache_layout,
+    }
+
+
+def _get_manifest_fingerprint(entry):
+    """
+    Get the fingerprint recorded in a manifest entry, without the fingerprints used for
+    incremental consolidation.
+
+    Parameters
+    ----------
+    entry : dict or None
+        The manifest entry of a derived file.
+
+    Returns
+    -------
+    dict or None
+        The fingerprint.
+    """
+    if not isinstance(entry, dict):
+        return entry
+    return {k: v for k, v in entry.items() if k not in _incremental_keys}
+
+
+def _read_manifest(version_dir):
+    """
+    Read the manifest of a version directory.
+
+    Parameters
+    ----------
+    version_dir : str
+        The version directory.
+
+    Returns
+    -------
+    dict
+        The fingerprints keyed by the names of the derived files, or an empty dict
+        if the manifest does not exist or cannot be read.
+    """
+    try:
+        with open_file(os.path.join(version_dir, _manifest)) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return manifest if isinstance(manifest, dict) else {}
+
+
+def _update_manifest(version_dir, filename, fingerprint):
+    """
+    Record the fingerprint of a derived file in the manifest of its version directory.
+
+    Parameters
+    ----------
+    version_dir : str
+        The version directory.
+    filename : str
+        The name of the derived file.
+    fingerprint : dict
+        The fingerprint of the inputs the file has been derived from.
+    """
+    manifest_path = os.path.join(version_dir, _manifest)
+    with file_lock(manifest_path + ".lock"):
+        manifest = _read_manifest(version_dir)
+        manifest[filename] = fingerprint
+        manifest_path_part = (
+            f"{manifest_path}.{os.getpid()}.{threading.get_ident()}.part"
+        )
+        with open(manifest_path_part, "w") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(manifest_path_part, manifest_path)
+
+
+def _copy_on_write(value):
+    """
+    Wrap the dicts and lists of the memoised content into copy-on-write views.
+
+    Parameters
+    ----------
+    value : dict, list, str or scalar
+        The value to wrap.
+
+    Returns
+    -------
+    The copy-on-write view of dicts and lists, other values unchanged.
+    """
+    if type(value) is dict:
+        return _CopyOnWriteDict(value)
+    elif type(value) is list:
+        return _CopyOnWriteList(value)
+    return value
+
+
+class _CopyOnWriteDict(dict):
+    """
+    Copy-on-write view of a dict of the memoised content (see load).
+
+    The view is a shallow copy of the dict: its nested dicts and lists are shared with
+    the memoised content until they are accessed, and replaced by copy-on-write views of
+    their own on first access. Callers can thus modify the content returned by load,
+    while the cost of a memo hit only depends on the part of the content that is used.
+    """
+
+    __slots__ = ()
+
+    def __getitem__(self, key):
+        value = dict.__getitem__(self, key)
+        wrapped = _copy_on_write(value)
+        if wrapped is not value:
+            dict.__setitem__(self, key, wrapped)
+        return wrapped
+
+    def __iter__(self):
+        # Overriding __iter__ also makes dict(view) and {**view} go through __getitem__
+        return dict.__iter__(self)
+
+    def get(self, key, default=None):
+        return self[key] if key in self else default
+
+    def values(self):
+        return [self[key] for key in list(dict.keys(self))]
+
+    def items(self):
+        return [(key, self[key]) for key in list(dict.keys(self))]
+
+    def pop(self, key, *default):
+        if key in self:
+            value = self[key]
+            dict.__delitem__(self, key)
+            return value
+        return dict.pop(self, key, *default)
+
+    def popitem(self):
+        if not self:
+            raise KeyError("popitem(): dictionary is empty")
+        key = next(reversed(list(dict.keys(self))))
+        return key, self.pop(key)
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            dict.__setitem__(self, key, default)
+        return self[key]
+
+    def copy(self):
+        return _CopyOnWriteDict(dict.items(self))
+
+    __copy__ = copy
+
+    def __deepcopy__(self, memo):
+        return {
+            copy.deepcopy(key, memo): copy.deepcopy(value, memo)
+            for key, value in dict.items(self)
+        }
+
+    def __reduce__(self):
+        return dict, (dict(dict.items(self)),)
+
+
+class _CopyOnWriteList(list):
+    """
+    Copy-on-write view of a list of the memoised content (see _CopyOnWriteDict).
+    """
+
+    __slots__ = ()
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        value = list.__getitem__(self, index)
+        wrapped = _copy_on_write(value)
+        if wrapped is not value:
+            list.__setitem__(self, index, wrapped)
+        return wrapped
+
+    def __iter__(self):
+        i = 0
+        while i < len(self):
+            yield self[i]
+            i += 1
+
+    def __reversed__(self):
+        for i in range(len(self) - 1, -1, -1):
+            yield self[i]
+
+    def __add__(self, other):
+        return list(self) + other
+
+    def pop(self, index=-1):
+        value = self[index]
+        list.pop(self, index)
+        return value
+
+    def copy(self):
+        return _CopyOnWriteList(list.__iter__(self))
+
+    __copy__ = copy
+
+    def __deepcopy__(self, memo):
+        return [copy.deepcopy(value, memo) for value in list.__iter__(self)]
+
+    def __reduce__(self):
+        return list, (list(list.__iter__(self)),)
+
+
 @append_kwargs_from_config
-def load(version="latest_stable", **kwargs):
-    """Load the JSON file for the specified version, with caching of consolidated results."""
+def load(version="latest_stable", tables=None, optional_tables=None, **kwargs):
+    """Load the JSON file for the specified version, with caching of consolidated results.
+
+    Consolidated content is cached with one file per table, so that tools requiring
+    only some of the tables can load just these by passing their names as 'tables'.
+    Tables that only exist in some versions can be passed as 'optional_tables': they
+    are loaded as well if the version has them (unknown 'tables' raise a ValueError).
+
+    Loaded content is memoised in-process (up to 'memo_size' entries). Every call returns
+    a copy-on-write view of the memoised content (see _CopyOnWriteDict), so callers are
+    free to modify it, and the parts of the content that are not used are not copied.
+    """
 
     _dreq_content_loaded["json_path"] = ""
     logger = get_logger()
 
     if version == "all":
         raise ValueError("Cannot load 'all' versions.")
+    if tables is not None:
+        required = {tables} if isinstance(tables, str) else set(tables)
+        optional = (
+            {optional_tables}
+            if isinstance(optional_tables, str)
+            else set(optional_tables or [])
+        )
+        tables = tuple(sorted(required | optional))
 
     version_dict = retrieve(version, **kwargs)
     if not version_dict:
@@ -784,6 +2656,88 @@ def load(version="latest_stable", **kwargs):
 
     _dreq_content_loaded["json_path"] = json_path
 
+    export_type = kwargs.get("export", "release")
+    consolidate = kwargs.get("consolidate", True)
+
+    # Look up the in-process memo - the key includes the fingerprint of the inputs
+    #  so that updated content (eg. "dev") or a changed mapping table is not served
+    memo_size = kwargs.get("memo_size", 2)
+    if consolidate:
+        fingerprint = _get_fingerprint(json_path, **kwargs)
+    else:
+        fingerprint = {"source": _hash_file(json_path)}
+    memo_key = (
+        json_path,
+        export_type,
+        consolidate,
+        kwargs.get("force_consolidate", False),
+        tables,
+        json.dumps(fingerprint, sort_keys=True),
+    )
+    # Memoised complete content also serves requests for some of the tables
+    memo_key_all = memo_key[:4] + (None,) + memo_key[5:]
+    content = None
+    if memo_size > 0:
+        with _load_memo_lock:
+            for key in [memo_key, memo_key_all]:
+                content = _load_memo.get(key)
+                if content is not None:
+                    _load_memo.move_to_end(key)
+                    break
+    if content is not None:
+        logger.debug(f"Loading version '{version_key}' from memory.")
+        return _CopyOnWriteDict(_select_tables(content, tables))
+
+    content = _load(version, version_key, json_path, tables=tables, **kwargs)
+    _enforce_cache_budget(keep=[version_key], **kwargs)
+
+    if tables is not None and content:
+        loaded = {
+            key
+            for base in content.values()
+            for key, value in base.items()
+            if isinstance(value, dict)
+        }
+        unknown = sorted(table for table in required if table not in loaded)
+        if unknown:
+            raise ValueError(f"Unknown table(s) for version '{version_key}': {unknown}")
+
+    if memo_size > 0 and content:
+        with _load_memo_lock:
+            # Drop outdated entries for the same content and the least recently used ones
+            for key in [k for k in _load_memo if k[:5] == memo_key[:5]]:
+                del _load_memo[key]
+            _load_memo[memo_key] = content
+            while len(_load_memo) > memo_size:
+                _load_memo.popitem(last=False)
+        return _CopyOnWriteDict(content)
+    return content
+
+
+def _load(version, version_key, json_path, tables=None, **kwargs):
+    """
+    Load the JSON file of a version, consolidating it if requested.
+
+    Parameters
+    ----------
+    version : str
+        The requested version.
+    version_key : str
+        The resolved version, eg. "v1.2" for "latest_stable".
+    json_path : str
+        The path of the retrieved JSON file.
+    tables : tuple, optional
+        The names of the tables to load. Defaults to None, i.e. all tables.
+    **kwargs
+        See load().
+
+    Returns
+    -------
+    dict
+        The (consolidated) content.
+    """
+    logger = get_logger()
+
     consolidate_error = (
         "Consolidation mapping is not supported for raw exports of versions < v1.2."
         " Set 'export' to \"release\" (recommended), or set 'consolidate' to True"
@@ -799,41 +2753,130 @@ def load(version="latest_stable", **kwargs):
 
     # determine cache file path
     version_dir = os.path.join(_dreq_res, version_key)
-    os.makedirs(version_dir, exist_ok=True)
-    cache_filename = f"{_json_raw_c}" if export_type == "raw" else f"{_json_release_c}"
+    cache_format = kwargs.get("cache_format", "json")
+    cache_filename = _get_cache_filenames(
+        _json_raw_c if export_type == "raw" else _json_release_c
+    )[cache_format]
     cache_path = os.path.join(version_dir, cache_filename)
 
-    with open(json_path) as f:
-        if consolidate:
+    # The export is only opened if the content cannot be served from the caches
+    if consolidate:
+        if (
+            export_type == "raw"
+            and _parse_version(version) < _parse_version("v1.2")
+            and version != "dev"
+        ):
+            if kwargs.get("force_consolidate", False):
+                logger.warning(consolidate_warning)
+            else:
+                logger.error(consolidate_error)
+                raise ValueError(consolidate_error)
+
+        # Consolidated content in a read-only cache root is reused if it has been
+        #  derived from the same inputs (and is not pickled, see _is_trusted)
+        fingerprint = _get_fingerprint(json_path, **kwargs)
+        readonly_roots = (
+            [] if cache_format in _pickle_formats else _get_cache_roots()[:-1]
+        )
+        for root in readonly_roots:
+            readonly_dir = os.path.join(root, version_key)
+            readonly_path = os.path.join(readonly_dir, cache_filename)
             if (
-                export_type == "raw"
-                and _parse_version(version) < _parse_version("v1.2")
-                and version != "dev"
+                is_file(readonly_path)
+                and _get_manifest_fingerprint(
+                    _read_manifest(readonly_dir).get(cache_filename)
+                )
+                == fingerprint
             ):
-                if kwargs.get("force_consolidate", False):
-                    logger.warning(consolidate_warning)
-                else:
-                    logger.error(consolidate_error)
-                    raise ValueError(consolidate_error)
-
-            # Caching for consolidated dreq content
-            if os.path.exists(cache_path):
-                logger.info(f"Loading consolidated data from cache: {cache_path}")
-                with open(cache_path) as cf:
-                    return json.load(cf)
+                logger.info(f"Loading consolidated data from cache: {readonly_path}")
+                try:
+                    return _load_sharded(
+                        readonly_dir, cache_filename, cache_format, tables
+                    )[0]
+                except Exception as e:
+                    logger.warning(
+                        f"Could not read consolidated data from cache ({e})."
+                    )
 
-            logger.info(
-                "Consolidated data request content not found in cache, performing consolidation..."
+        # Only one process / thread at a time consolidates a version - the others
+        #  wait and reuse the result
+        os.makedirs(version_dir, exist_ok=True)
+        with file_lock(
+            os.path.join(
+                version_dir,
+                (_json_raw_c if export_type == "raw" else _json_release_c) + ".lock",
             )
+        ):
+            # Caching for consolidated dreq content - only reused if it has been
+            #  derived from the same inputs
+            previous = _read_manifest(version_dir).get(cache_filename)
+            if os.path.exists(cache_path):
+                if _get_manifest_fingerprint(previous) == fingerprint:
+                    logger.info(f"Loading consolidated data from cache: {cache_path}")
+                    try:
+                        consolidated, paths = _load_sharded(
+                            version_dir, cache_filename, cache_format, tables
+                        )
+                        _record_access(paths)
+                        return consolidated
+                    except Exception as e:
+                        logger.warning(
+                            f"Could not read consolidated data from cache ({e}), performing consolidation..."
+                        )
+                else:
+                    logger.info(
+                        "Consolidated data request content in cache is outdated, performing consolidation..."
+                    )
+            else:
+                logger.info(
+                    "Consolidated data request content not found in cache, performing consolidation..."
+                )
+            # The export is parsed one table at a time, tables not needed for the mapping
+            #  are dropped while parsing and the others are released once mapped, to
+            #  limit the peak memory usage
+            # If only the source export has changed (eg. update of "dev"), the cached
+            #  tables whose source tables have not changed are reused
+            reuse = {"sources": dict()}
+            with open_file(json_path) as f:
+                data = ce.read_export(f, mapping_table, fingerprints=reuse["sources"])
+            if (
+                os.path.exists(cache_path)
+                and isinstance(previous, dict)
+                and dict(_get_manifest_fingerprint(previous), source=None)
+                == dict(fingerprint, source=None)
+            ):
+                reuse["previous"] = previous.get("tables", dict())
+                reuse["load"] = functools.partial(
+                    _load_reusable_tables, version_dir, cache_filename, cache_format
+                )
             consolidated = ce.map_data(
-                json.load(f), mapping_table, version_key, **kwargs
+                data,
+                mapping_table,
+                version_key,
+                release_source=True,
+                reuse=reuse,
+                **kwargs,
             )
+            del data
 
-            with open(cache_path, "w") as cf:
-                json.dump(consolidated, cf)
-                logger.info(f"Stored consolidated data in cache: {cache_path}")
+            # All tables are cached, also if only some of them have been requested
+            paths = _dump_sharded(
+                consolidated, version_dir, cache_filename, cache_format
+            )
+            _update_manifest(
+                version_dir,
+                cache_filename,
+                dict(
+                    fingerprint,
+                    source_tables=reuse["sources"],
+                    tables=reuse.get("tables", dict()),
+                ),
+            )
+            _record_access(paths)
+            logger.info(f"Stored consolidated data in cache: {cache_path}")
 
-            return consolidated
+            return _select_tables(consolidated, tables)
 
-        else:
-            return json.load(f)
+    else:
+        with open_file(json_path) as f:
+            return _select_tables(json.load(f), tables)
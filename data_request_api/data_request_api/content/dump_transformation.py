@@ -8,21 +8,75 @@ Script to change the basic airtable export into readable files.
 from __future__ import division, print_function, unicode_literals, absolute_import
 
 import copy
+import functools
+import hashlib
 import json
 import os
 import argparse
 import re
+import time
+import traceback
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
 from data_request_api.utilities.decorators import append_kwargs_from_config
 from data_request_api.utilities.logger import get_logger
 from data_request_api.utilities.parser import append_arguments_to_parser
-from data_request_api.utilities.tools import read_json_input_file_content, write_json_output_file_content
+from data_request_api.utilities.tools import read_json_input_file_content, write_json_output_file_content, \
+    file_lock
 from data_request_api.content import dreq_content as dc
 
-default_count = 0
 default_template = "default_{:d}"
 
+# Compiled operations on the records - keyed by the transformation settings and options
+#  (see _get_record_operations)
+_record_operations = dict()
+
+# Content of transform.json, read and validated on first use (see _load_transform), and the settings
+#  resolved for each version (see get_transform_settings)
+_transform = None
+_transform_settings = dict()
+
+# Schema of the transformation settings: {key schema: value schema} for dicts, [item schema] for lists,
+#  a tuple of the valid values, str or _pattern (a string that is a valid regular expression)
+_pattern = "pattern"
+_transform_sections = ("common", "one_to_transform", "several_to_transform")
+_transform_schema = {
+    "tables_to_rename": {_pattern: str},
+    "tables_to_delete": [_pattern],
+    "default_keys_to_delete": [_pattern],
+    "keys_to_delete": {str: [_pattern]},
+    "keys_to_rename": {str: {_pattern: str}},
+    "keys_to_merge": {str: {_pattern: str}},
+    "keys_to_sort": {str: [_pattern]},
+    "keys_to_format": {("list_to_string", "string_to_list"): {str: [_pattern]}},
+    "keys_to_initialize": {str: {str: str}},
+    "keys_to_copy": {str: {str: str}},
+    "several_bases_name": {str: str},
+    "several_bases_link": {str: [[str]]},
+    "tables_provenance": {str: [str]},
+}
+
+
+class _TransformationContext(object):
+    """
+    State of a single transformation (see transform_content_inner), so that several
+    transformations can run concurrently.
+    """
+
+    def __init__(self):
+        # Number of default names generated so far
+        self.default_count = 0
+
+    def get_default_name(self):
+        """
+        Generate a new default name (for elements without name).
+        :return str: the default name
+        """
+        value = default_template.format(self.default_count)
+        self.default_count += 1
+        return value
+
 
 def correct_key_string(input_string, *to_remove_strings):
     """
@@ -45,9 +99,22 @@ def correct_key_string(input_string, *to_remove_strings):
     return input_string
 
 
+@functools.lru_cache(maxsize=8192)
+def _correct_key(key):
+    """
+    Memoised correct_key_string without strings to remove - the same keys (table and field names)
+    are found many times in an export.
+    :param str key: the key to be changed
+    :return str: the changed key
+    """
+    return correct_key_string(key)
+
+
 def correct_dictionaries(input_dict, is_record_ids=False):
     """
     Correct the input_dict to correct the strings except the record ids.
+    The dictionaries are rebuilt, the other values are shared with input_dict or, for lists, shallow copied
+    (see _copy_value).
     :param dict input_dict: the input dictionary to be corrected
     :param bool is_record_ids: a boolean to indicate whether the keys of input_dict contain record ids or not
     :return dict: the corrected dictionary
@@ -57,20 +124,95 @@ def correct_dictionaries(input_dict, is_record_ids=False):
         rep = dict()
         for (key, value) in input_dict.items():
             if not is_record_ids:
-                new_key = correct_key_string(key)
+                new_key = _correct_key(key)
             else:
                 new_key = key
             if isinstance(value, dict):
                 rep[new_key] = correct_dictionaries(value, is_record_ids=key in ["records", "fields"])
             else:
-                rep[new_key] = copy.deepcopy(value)
+                rep[new_key] = _copy_value(value)
         return rep
     else:
         logger.error(f"Deal with dict types, not {type(input_dict).__name__}")
         raise TypeError(f"Deal with dict types, not {type(input_dict).__name__}")
 
 
+def _check_transform_schema(value, schema, path):
+    """
+    Check a value of the transformation settings against its schema (see _transform_schema).
+    :param value: the value to be checked
+    :param schema: the schema of the value
+    :param str path: the location of the value in transform.json (for error messages)
+    """
+    if isinstance(schema, dict):
+        ((key_schema, value_schema), ) = schema.items()
+        if not isinstance(value, dict):
+            raise ValueError(f"Invalid transform settings {path}: expected a dict, not {type(value).__name__}")
+        for (key, val) in value.items():
+            _check_transform_schema(key, key_schema, f"{path} (key {key!r})")
+            _check_transform_schema(val, value_schema, f"{path}/{key}")
+    elif isinstance(schema, list):
+        if not isinstance(value, list):
+            raise ValueError(f"Invalid transform settings {path}: expected a list, not {type(value).__name__}")
+        for (i, val) in enumerate(value):
+            _check_transform_schema(val, schema[0], f"{path}/{i}")
+    elif isinstance(schema, tuple):
+        if value not in schema:
+            raise ValueError(f"Invalid transform settings {path}: {value!r} is not one of {list(schema)}")
+    elif not isinstance(value, str):
+        raise ValueError(f"Invalid transform settings {path}: expected a string, not {type(value).__name__}")
+    elif schema == _pattern:
+        try:
+            re.compile(value)
+        except re.error as e:
+            raise ValueError(f"Invalid transform settings {path}: invalid pattern {value!r} ({e})")
+
+
+def _load_transform():
+    """
+    Read and validate transform.json, once.
+    :return dict: the content of transform.json
+    """
+    global _transform
+    if _transform is None:
+        transform = read_json_input_file_content(os.sep.join([os.path.dirname(os.path.abspath(__file__)),
+                                                              "transform.json"]))
+        if not isinstance(transform, dict):
+            raise ValueError(f"Invalid transform settings: expected a dict, not {type(transform).__name__}")
+        for (section, versions) in transform.items():
+            _check_transform_schema(section, _transform_sections, f"/{section}")
+            if not isinstance(versions, dict) or not isinstance(versions.get("default"), dict):
+                raise ValueError(f"Invalid transform settings /{section}: expected a dict with default settings")
+            for (version, settings) in versions.items():
+                if not isinstance(settings, dict):
+                    raise ValueError(f"Invalid transform settings /{section}/{version}: expected a dict, "
+                                     f"not {type(settings).__name__}")
+                for (key, value) in settings.items():
+                    if key not in _transform_schema:
+                        raise ValueError(f"Invalid transform settings /{section}/{version}: unknown key {key!r}")
+                    _check_transform_schema(value, _transform_schema[key], f"/{section}/{version}/{key}")
+        _transform = transform
+    return _transform
+
+
 def get_transform_settings(version):
+    """
+    Get the transformation settings of a version.
+    The settings are resolved once per version and shared between the calls: they must not be modified.
+    :param str version: the version
+    :return dict: the settings of each transformation
+    """
+    if version not in _transform_settings:
+        _transform_settings[version] = _resolve_transform_settings(version)
+    return _transform_settings[version]
+
+
+def _resolve_transform_settings(version):
+    """
+    Resolve the transformation settings of a version, by merging the default and version specific ones.
+    :param str version: the version
+    :return dict: the settings of each transformation
+    """
     def update_dict(elt_1, elt_2):
         rep = copy.deepcopy(elt_1)
         for (elt, value) in elt_2.items():
@@ -113,7 +255,7 @@ def get_transform_settings(version):
         else:
             return input_dict[target_version]
 
-    transform = read_json_input_file_content(os.sep.join([os.path.dirname(os.path.abspath(__file__)), "transform.json"]))
+    transform = copy.deepcopy(_load_transform())
     common = transform.pop("common", dict())
     if version not in ["default", ]:
         common = update_dict(common["default"], get_config_version(version=version, input_dict=common, default=dict()))
@@ -128,80 +270,204 @@ def get_transform_settings(version):
 
 
 def distribute_on_entry(func):
-    def distribute(content, per_entry_input, **common_inputs):
+    def distribute(content, per_entry_input, context=None, **common_inputs):
         if "default" in per_entry_input:
             default_value = per_entry_input["default"]
         else:
             default_value = None
+        # The context is shared by all entries (not copied as the other common inputs)
+        if context is not None:
+            common_context = dict(context=context)
+        else:
+            common_context = dict()
         for key in sorted(list(content)):
             list_args = [content[key], ]
             if key in per_entry_input:
                 list_args.append(per_entry_input[key])
-            content[key] = func(*list_args, default=copy.deepcopy(default_value), **copy.deepcopy(common_inputs))
+            content[key] = func(*list_args, default=copy.deepcopy(default_value), **common_context,
+                                **copy.deepcopy(common_inputs))
         return content
 
     return distribute
 
 
+def _compile_key_matcher(patterns):
+    """
+    Compile patterns into a function telling whether a key matches any of them.
+    The result is memoised per key, as the same keys are found in all the records of a table.
+    :param list of str patterns: the patterns of the keys
+    :return function: the key matcher
+    """
+    patterns = [re.compile(elt) for elt in patterns]
+    matches = dict()
+
+    def match(key):
+        if key not in matches:
+            matches[key] = any(patt.match(key) is not None for patt in patterns)
+        return matches[key]
+
+    return match
+
+
+def _copy_value(value):
+    """
+    Copy a record value - a deep copy is only needed for nested containers.
+    :param value: the value to be copied
+    :return: the copy
+    """
+    if isinstance(value, list):
+        if all(isinstance(elt, (str, int, float, bool, type(None))) for elt in value):
+            return list(value)
+        return copy.deepcopy(value)
+    elif isinstance(value, dict):
+        return copy.deepcopy(value)
+    return value
+
+
+def _remove_operation(patterns_to_remove):
+    match = _compile_key_matcher(patterns_to_remove)
+
+    def remove(record_id, record):
+        for key in [elt for elt in record if match(elt)]:
+            del record[key]
+
+    return remove
+
+
+def _copy_operation(keys_to_copy):
+    logger = get_logger()
+    keys_to_copy = list(keys_to_copy.items())
+
+    def copy_keys(record_id, record):
+        for (key, val) in keys_to_copy:
+            if key in record:
+                record[val] = _copy_value(record[key])
+            else:
+                logger.warning(f"Key {key} not in found for record id {record_id}.")
+
+    return copy_keys
+
+
+def _rename_operation(patterns_to_rename):
+    patterns_to_rename = [(re.compile(patt), repl, _compile_key_matcher([patt, ]))
+                          for (patt, repl) in patterns_to_rename.items()]
+
+    def rename(record_id, record):
+        for (patt, repl, match) in patterns_to_rename:
+            to_rename = [elt for elt in record if match(elt)]
+            if len(to_rename) == 1:
+                record[repl] = record.pop(to_rename[0])
+            elif len(to_rename) > 1:
+                raise ValueError(f"Several keys ({to_rename}) match pattern {patt}.")
+
+    return rename
+
+
+def _merge_operation(patterns_to_merge):
+    patterns_to_merge = [(repl, _compile_key_matcher([patt, ])) for (patt, repl) in patterns_to_merge.items()]
+
+    def merge(record_id, record):
+        for (repl, match) in patterns_to_merge:
+            to_merge = [elt for elt in record if match(elt)]
+            if len(to_merge) > 0:
+                record[repl] = list()
+                for elts in to_merge:
+                    if isinstance(record[elts], list):
+                        record[repl].extend(record.pop(elts))
+                    else:
+                        record[repl].append(record.pop(elts))
+
+    return merge
+
+
+def _sort_operation(patterns_to_sort):
+    match = _compile_key_matcher(patterns_to_sort)
+
+    def sort_keys(record_id, record):
+        # Sort content of needed keys
+        for key in [elt for (elt, val) in record.items() if isinstance(val, list) and match(elt)]:
+            record[key] = sorted(list(set(record[key])))
+
+    return sort_keys
+
+
+def _reshape_operation(patterns_to_reshape, reshape_style):
+    logger = get_logger()
+    match = _compile_key_matcher(patterns_to_reshape)
+
+    def reshape(uid, record):
+        for key in [elt for elt in record if match(elt)]:
+            val = record[key]
+            if reshape_style in ["list_to_string", ]:
+                if isinstance(val, list):
+                    if len(val) == 1:
+                        record[key] = val[0]
+                    elif len(val) == 0:
+                        logger.warning(f"Remove void key {key} from id {uid}")
+                        del record[key]
+                    else:
+                        logger.error(f"Could not reshape key {key} from id {uid}: contains several elements")
+                        raise ValueError(f"Could not reshape key {key} from id {uid}: contains several elements")
+                elif isinstance(val, str):
+                    logger.warning(f"Could not reshape key {key} from id {uid}: already a string")
+                else:
+                    logger.error(f"Could not reshape key {key} from id {uid}: not a list")
+                    raise ValueError(f"Could not reshape key {key} from id {uid}: not a list")
+            elif reshape_style in ["string_to_list", ]:
+                if isinstance(val, str):
+                    record[key] = [val, ]
+                elif isinstance(val, list):
+                    logger.warning(f"Could not reshape key {key} from id {uid}: already a list")
+                else:
+                    logger.error(f"Could not reshape key {key} from id {uid}: not a string")
+                    raise ValueError(f"Could not reshape key {key} from id {uid}: not a string")
+            else:
+                logger.error(f"Unknown value for reshaping: {reshape_style}")
+                raise ValueError(f"Unknown value for reshaping: {reshape_style}")
+
+    return reshape
+
+
 @distribute_on_entry
 def remove_unused_keys(content, patterns_to_remove=list(), default_patterns_to_remove=list(), default=None):
     content = content["records"]
-    patterns_to_remove.extend(default_patterns_to_remove)
-    patterns_to_remove = [re.compile(elt) for elt in patterns_to_remove]
+    remove = _remove_operation(patterns_to_remove + default_patterns_to_remove)
     for record_id in content:
-        list_keys_to_remove = [elt for elt in content[record_id]
-                               if any(patt.match(elt) is not None for patt in patterns_to_remove)]
-        for key in list_keys_to_remove:
-            del content[record_id][key]
+        remove(record_id, content[record_id])
     return content
 
 
 @distribute_on_entry
 def rename_useful_keys(content, patterns_to_rename=dict(), default=None):
+    rename = _rename_operation(patterns_to_rename)
     for record_id in content:
-        for (patt, repl) in patterns_to_rename.items():
-            patt = re.compile(patt)
-            to_rename = [elt for elt in content[record_id] if patt.match(elt) is not None]
-            if len(to_rename) == 1:
-                content[record_id][repl] = content[record_id].pop(to_rename[0])
-            elif len(to_rename) > 1:
-                raise ValueError(f"Several keys ({to_rename}) match pattern {patt}.")
+        rename(record_id, content[record_id])
     return content
 
 
 @distribute_on_entry
 def merge_useful_keys(content, patterns_to_merge=dict(), default=None):
+    merge = _merge_operation(patterns_to_merge)
     for record_id in content:
-        for (patt, repl) in patterns_to_merge.items():
-            patt = re.compile(patt)
-            to_merge = [elt for elt in content[record_id] if patt.match(elt) is not None]
-            if len(to_merge) > 0:
-                content[record_id][repl] = list()
-                for elts in to_merge:
-                    if isinstance(content[record_id][elts], list):
-                        content[record_id][repl].extend(content[record_id].pop(elts))
-                    else:
-                        content[record_id][repl].append(content[record_id].pop(elts))
+        merge(record_id, content[record_id])
     return content
 
 
 @distribute_on_entry
 def copy_useful_keys(content, keys_to_copy=dict(), default=None):
-    logger = get_logger()
     if default is not None and isinstance(default, dict):
         default.update(keys_to_copy)
         keys_to_copy = default
+    copy_keys = _copy_operation(keys_to_copy)
     for record_id in sorted(list(content)):
-        for (key, val) in keys_to_copy.items():
-            if key in content[record_id]:
-                content[record_id][val] = copy.deepcopy(content[record_id][key])
-            else:
-                logger.warning(f"Key {key} not in found for record id {record_id}.")
+        copy_keys(record_id, content[record_id])
     return content
 
 
 @distribute_on_entry
-def initialize_useful_keys(content, keys_to_initialize=dict(), default=None):
+def initialize_useful_keys(content, keys_to_initialize=dict(), default=None, context=None):
+    if context is None:
+        context = _TransformationContext()
     if default is not None and isinstance(default, dict):
         default.update(keys_to_initialize)
         keys_to_initialize = default
@@ -212,65 +478,93 @@ def initialize_useful_keys(content, keys_to_initialize=dict(), default=None):
                                                             record_id])):
         for (key, val) in keys_to_initialize.items():
             if val not in content[record_id]:
-                global default_count
-                value = default_template.format(default_count)
-                default_count += 1
+                value = context.get_default_name()
                 content[record_id][val] = value
                 logger.debug(f"Undefined {val} for element {record_id}, set {value}")
-            content[record_id][key] = copy.deepcopy(content[record_id][val])
+            content[record_id][key] = _copy_value(content[record_id][val])
     return content
 
 
 @distribute_on_entry
 def sort_useful_keys(content, patterns_to_sort=list(), default=None):
-    patterns_to_sort = [re.compile(elt) for elt in patterns_to_sort]
+    sort_keys = _sort_operation(patterns_to_sort)
     for uid in content:
-        # Sort content of needed keys
-        list_keys_to_sort = [elt for (elt, val) in content[uid].items()
-                             if any(patt.match(elt) is not None and isinstance(val, list) for patt in patterns_to_sort)]
-        for key in list_keys_to_sort:
-            content[uid][key] = sorted(list(set(content[uid][key])))
+        sort_keys(uid, content[uid])
     return content
 
 
 @distribute_on_entry
 def reshape_useful_keys(content, patterns_to_reshape=list(), reshape_style=None, default=None):
-    logger = get_logger()
-    patterns_to_reshape = [re.compile(elt) for elt in patterns_to_reshape]
+    reshape = _reshape_operation(patterns_to_reshape, reshape_style)
     for uid in content:
-        list_keys_to_reshape = [elt for elt in content[uid]
-                                if any(patt.match(elt) is not None for patt in patterns_to_reshape)]
-        for key in list_keys_to_reshape:
-            val = content[uid][key]
-            if reshape_style in ["list_to_string", ]:
-                if isinstance(val, list):
-                    if len(val) == 1:
-                        content[uid][key] = val[0]
-                    elif len(val) == 0:
-                        logger.warning(f"Remove void key {key} from id {uid}")
-                        del content[uid][key]
-                    else:
-                        logger.error(f"Could not reshape key {key} from id {uid}: contains several elements")
-                        raise ValueError(f"Could not reshape key {key} from id {uid}: contains several elements")
-                elif isinstance(val, str):
-                    logger.warning(f"Could not reshape key {key} from id {uid}: already a string")
-                else:
-                    logger.error(f"Could not reshape key {key} from id {uid}: not a list")
-                    raise ValueError(f"Could not reshape key {key} from id {uid}: not a list")
-            elif reshape_style in ["string_to_list", ]:
-                if isinstance(val, str):
-                    content[uid][key] = [val, ]
-                elif isinstance(val, list):
-                    logger.warning(f"Could not reshape key {key} from id {uid}: already a list")
-                else:
-                    logger.error(f"Could not reshape key {key} from id {uid}: not a string")
-                    raise ValueError(f"Could not reshape key {key} from id {uid}: not a string")
-            else:
-                logger.error(f"Unknown value for reshaping: {reshape_style}")
-                raise ValueError(f"Unknown value for reshaping: {reshape_style}")
+        reshape(uid, content[uid])
     return content
 
 
+def _compile_record_operations(settings, force_variable_name=False, variable_name=None):
+    """
+    Compile the transformation settings of the records into lists of operations per table,
+    equivalent to the successive passes of remove_unused_keys, copy_useful_keys,
+    rename_useful_keys and merge_useful_keys ("before_filter") and of sort_useful_keys and
+    reshape_useful_keys ("after_tidy").
+    :param dict settings: the transformation settings (see get_transform_settings)
+    :param bool force_variable_name: should the name of the variables be forced to variable_name?
+    :param str variable_name: the key to be used as name of the variables
+    :return dict: for each step, the operations per table (None for the tables without settings)
+    """
+    keys_to_copy = copy.deepcopy(settings["keys_to_copy"])
+    if force_variable_name:
+        for key in list(keys_to_copy["variables"]):
+            if keys_to_copy["variables"][key] in ["name", ]:
+                del keys_to_copy["variables"][key]
+        keys_to_copy["variables"][correct_key_string(variable_name)] = "name"
+    per_entry_inputs = [settings["keys_to_delete"], keys_to_copy, settings["keys_to_rename"],
+                        settings["keys_to_merge"], settings["keys_to_sort"]] + \
+        list(settings["keys_to_format"].values())
+    tables = sorted(set().union(*per_entry_inputs) - {"default", }) + [None, ]
+    operations = dict(before_filter=dict(), after_tidy=dict())
+    for table in tables:
+        table_keys_to_copy = keys_to_copy.get(table, dict())
+        if isinstance(keys_to_copy.get("default"), dict):
+            table_keys_to_copy = dict(keys_to_copy["default"], **table_keys_to_copy)
+        operations["before_filter"][table] = [
+            _remove_operation(settings["keys_to_delete"].get(table, list()) + settings["default_keys_to_delete"]),
+            _copy_operation(table_keys_to_copy),
+            _rename_operation(settings["keys_to_rename"].get(table, dict())),
+            _merge_operation(settings["keys_to_merge"].get(table, dict()))
+        ]
+        operations["after_tidy"][table] = [_sort_operation(settings["keys_to_sort"].get(table, list()))] + \
+            [_reshape_operation(patterns.get(table, list()), reshape_style)
+             for (reshape_style, patterns) in settings["keys_to_format"].items()]
+    return operations
+
+
+def _get_record_operations(settings, force_variable_name=False, variable_name=None):
+    """
+    Get the compiled operations on the records for the transformation settings
+    (see _compile_record_operations), compiling them on first use.
+    """
+    key = (json.dumps(settings, sort_keys=True), force_variable_name, variable_name)
+    if key not in _record_operations:
+        _record_operations[key] = _compile_record_operations(settings, force_variable_name, variable_name)
+    return _record_operations[key]
+
+
+def _apply_record_operations(content, operations):
+    """
+    Apply the operations of each table to its records, in a single traversal.
+    :param dict content: the records per table
+    :param dict operations: the operations per table (None for the tables without settings)
+    """
+    for table in sorted(list(content)):
+        table_operations = operations.get(table, operations[None])
+        records = content[table]
+        for record_id in sorted(list(records)):
+            record = records[record_id]
+            for operation in table_operations:
+                operation(record_id, record)
+
+
 def add_useful_keys(content):
     logger = get_logger()
     record_to_linked_id_index = defaultdict(lambda: dict())
@@ -418,39 +712,25 @@ def transform_content_inner(content, settings, change_tables=False, force_variab
                 content[re.sub(patt, repl, key)] = content.pop(key)
         for elt in [elt for elt in list(content) if any(re.compile(patt).match(elt) for patt in settings["tables_to_delete"])]:
             del content[elt]
-        # Tidy the content of the export file
-        default_patterns_to_remove = settings["default_keys_to_delete"]
-        to_remove_keys_patterns = settings["keys_to_delete"]
-        to_rename_keys_patterns = settings["keys_to_rename"]
-        to_copy_keys_content = settings["keys_to_copy"]
-        if force_variable_name:
-            for key in list(to_copy_keys_content["variables"]):
-                if to_copy_keys_content["variables"][key] in ["name", ]:
-                    del to_copy_keys_content["variables"][key]
-            to_copy_keys_content["variables"][correct_key_string(variable_name)] = "name"
-        to_merge_keys_patterns = settings["keys_to_merge"]
-        to_sort_keys_content = settings["keys_to_sort"]
+        # Tidy the content of the export file: remove, copy, rename and merge keys of
+        # the records in a single traversal
+        operations = _get_record_operations(settings, force_variable_name=force_variable_name,
+                                            variable_name=variable_name)
+        content = {table: content[table]["records"] for table in content}
+        _apply_record_operations(content, operations["before_filter"])
         to_initialize_keys_content = settings["keys_to_initialize"]
-        content = remove_unused_keys(content=content, per_entry_input=to_remove_keys_patterns,
-                                     default_patterns_to_remove=default_patterns_to_remove)
-        content = copy_useful_keys(content=content, per_entry_input=to_copy_keys_content)
-        content = rename_useful_keys(content=content, per_entry_input=to_rename_keys_patterns)
-        content = merge_useful_keys(content=content, per_entry_input=to_merge_keys_patterns)
         # Filter on status if needed then remove linked keys
         content = filter_content(content)
         # Copy some keys to others
-        global default_count
-        default_count = 0
-        content = initialize_useful_keys(content=content, per_entry_input=to_initialize_keys_content)
+        context = _TransformationContext()
+        content = initialize_useful_keys(content=content, per_entry_input=to_initialize_keys_content,
+                                         context=context)
         # Add name and uid if needed, build equivalence dict between record_id and uid
         content, record_to_uid_index = add_useful_keys(content)
         # Tidy the content of the dictionary by removing unused entries
         content = tidy_content(content, record_to_uid_index)
-        # Sort content of needed keys
-        content = sort_useful_keys(content, per_entry_input=to_sort_keys_content)
-        for (reshape_style, from_list_to_string_keys_content) in settings["keys_to_format"].items():
-            content = reshape_useful_keys(content, per_entry_input=from_list_to_string_keys_content,
-                                          reshape_style=reshape_style)
+        # Sort and reshape content of needed keys in a single traversal
+        _apply_record_operations(content, operations["after_tidy"])
         return content
     else:
         logger.error(f"Deal with dict types, not {type(content).__name__}")
@@ -539,6 +819,45 @@ def transform_content(content, version, force_variable_name=False, variable_name
         raise TypeError(f"Deal with dict types, not {type(content).__name__}")
 
 
+def _get_transformed_content_variant(force_variable_name=False, variable_name=None):
+    """
+    Get the name of the variant of the transformed content (used in the names of the DR/VS files).
+    :param bool force_variable_name: should the name of the variables be forced to variable_name?
+    :param str variable_name: the key to be used as name of the variables
+    :return str: the name of the variant, None for the default variant
+    """
+    if force_variable_name:
+        return re.sub(r"[^\w-]", "_", correct_key_string(variable_name))
+    else:
+        return None
+
+
+def _get_transformed_content_fingerprint(json_path, version, consolidate=False, force_variable_name=False,
+                                         **kwargs):
+    """
+    Get the fingerprint of the inputs the transformed content is derived from: the source export (and the
+    consolidation inputs), the transformation settings, the transformation options and the API version.
+    :param str json_path: the path of the source export
+    :param str version: the version
+    :param bool consolidate: is the content consolidated?
+    :param bool force_variable_name: should the name of the variables be forced to variable_name?
+    :param dict kwargs: the other options (variable_name and the consolidation options)
+    :return dict: the fingerprint
+    """
+    if consolidate:
+        source = dc._get_fingerprint(json_path, **kwargs)
+    else:
+        source = {"source": dc._hash_file(json_path)}
+    settings = json.dumps(get_transform_settings(version), sort_keys=True)
+    return {
+        "source": source,
+        "settings": hashlib.sha256(settings.encode()).hexdigest(),
+        "options": dict(force_variable_name=force_variable_name,
+                        variable_name=kwargs.get("variable_name") if force_variable_name else None),
+        "api_version": dc.api_version
+    }
+
+
 @append_kwargs_from_config
 def get_transformed_content(version="latest_stable", export="release", consolidate=False,
                             force_retrieve=False, output_dir=None, force_variable_name=False,
@@ -575,28 +894,160 @@ def get_transformed_content(version="latest_stable", export="release", consolida
         elif len(versions) == 0:
             raise ValueError("No version found.")
         else:
-            version = list(versions)[0]
-            content = versions[version]
+            version, json_path = list(versions.items())[0]
+            # Transformed content is only reused if it has been derived from the same inputs,
+            # several variants (eg. forced variable names) can live side by side
+            fingerprint = _get_transformed_content_fingerprint(json_path, version, consolidate=consolidate,
+                                                               force_variable_name=force_variable_name, **kwargs)
+            variant = _get_transformed_content_variant(force_variable_name, kwargs["variable_name"])
+            DR_default_content = dc._get_variant_filename(DR_default_content, variant)
+            VS_default_content = dc._get_variant_filename(VS_default_content, variant)
             if output_dir is None:
-                output_dir = os.path.dirname(content)
-            if not os.path.exists(output_dir):
-                os.makedirs(output_dir)
+                # Reuse transformed content from any cache root (including read-only ones and bundles),
+                # otherwise build it in the writable cache root
+                cached_dir = None if force_retrieve else \
+                    dc._find_cached(version, [DR_default_content, VS_default_content], fingerprint=fingerprint)
+                if cached_dir is not None:
+                    DR_content = os.sep.join([cached_dir, DR_default_content])
+                    VS_content = os.sep.join([cached_dir, VS_default_content])
+                    dc._record_access([DR_content, VS_content])
+                    return dict(DR_input=DR_content, VS_input=VS_content)
+                output_dir = os.path.join(dc._dreq_res, version)
+            os.makedirs(output_dir, exist_ok=True)
             DR_content = os.sep.join([output_dir, DR_default_content])
             VS_content = os.sep.join([output_dir, VS_default_content])
-            if force_retrieve or not (all(os.path.exists(filepath) for filepath in [DR_content, VS_content])):
-                if os.path.exists(DR_content):
-                    os.remove(DR_content)
-                if os.path.exists(VS_content):
-                    os.remove(VS_content)
-            if not (all(os.path.exists(filepath) for filepath in [DR_content, VS_content])):
-                content = dc.load(version, export=export, consolidate=consolidate)
-                data_request, vocabulary_server = transform_content(content, version, variable_name=kwargs["variable_name"],
-                                                                    force_variable_name=force_variable_name)
-                write_json_output_file_content(DR_content, data_request)
-                write_json_output_file_content(VS_content, vocabulary_server)
+            # Only one process at a time builds the transformed content - the others wait and reuse it
+            with file_lock(DR_content + ".lock"):
+                manifest = dc._read_manifest(output_dir)
+                if force_retrieve or not all(
+                        os.path.exists(os.path.join(output_dir, filename)) and
+                        dc._get_manifest_fingerprint(manifest.get(filename)) == fingerprint
+                        for filename in [DR_default_content, VS_default_content]):
+                    if os.path.exists(DR_content):
+                        os.remove(DR_content)
+                    if os.path.exists(VS_content):
+                        os.remove(VS_content)
+                if not (all(os.path.exists(filepath) for filepath in [DR_content, VS_content])):
+                    content = dc.load(version, export=export, consolidate=consolidate, **kwargs)
+                    data_request, vocabulary_server = transform_content(content, version,
+                                                                        variable_name=kwargs["variable_name"],
+                                                                        force_variable_name=force_variable_name)
+                    write_json_output_file_content(DR_content, data_request)
+                    write_json_output_file_content(VS_content, vocabulary_server)
+                    dc._update_manifest(output_dir, DR_default_content, fingerprint)
+                    dc._update_manifest(output_dir, VS_default_content, fingerprint)
+                    dc._mark_cache_updated()
+            dc._record_access([DR_content, VS_content])
+            dc._enforce_cache_budget(keep=[version, ], **kwargs)
     return dict(DR_input=DR_content, VS_input=VS_content)
 
 
+def _transform_version(version, export, output_dir=None, validate=False, **kwargs):
+    """
+    Transform the content of a version (see transform_versions) and catch any error, so that
+    a failing version does not stop the transformation of the others.
+    :param str version: the version
+    :param str export: the export type
+    :param str output_dir: the output directory, None to use the cache
+    :param bool validate: should the transformed content be checked by building a DataRequest from it?
+    :param dict kwargs: the other options of get_transformed_content
+    :return dict: the result of the transformation
+    """
+    start = time.perf_counter()
+    result = dict(version=version, export=export)
+    try:
+        content = get_transformed_content(version=version, export=export, output_dir=output_dir, **kwargs)
+        result.update(content)
+        if validate:
+            from data_request_api.query.data_request import DataRequest
+            DataRequest.from_separated_inputs(**content)
+        result["status"] = "ok"
+    except Exception as e:
+        result.update(status="failed", error=f"{type(e).__name__}: {e}", traceback=traceback.format_exc())
+    result["time"] = time.perf_counter() - start
+    return result
+
+
+def transform_versions(version="all", exports=("release", ), workers=0, output_dir=None, validate=False,
+                       **kwargs):
+    """
+    Transform the content of several versions and export types, in a process pool.
+    The exports are retrieved first, then each (version, export) is transformed independently: the errors are
+    reported in the results instead of being raised, and the progress and a summary of the timings are logged.
+    :param str or list version: the version(s) to transform, eg. 'all' or 'v1.2' (see dreq_content.retrieve)
+    :param tuple or list exports: the export types to transform
+    :param int workers: number of worker processes, 0 for the number of CPUs, 1 to transform in this process
+    :param str output_dir: output directory, None to use the cache - if several versions are transformed, a
+                           subdirectory is used for each of them
+    :param bool validate: should the transformed content be checked by building a DataRequest from it?
+    :param dict kwargs: the other options of get_transformed_content (consolidate, force_variable_name...), the
+                        options not given default to the configuration - except offline, which defaults to True for
+                        the transformations (the exports are retrieved beforehand, pass offline=False to check for
+                        updates again when transforming)
+    :return list: the result of each transformation, in the order of the versions and exports, a dict with the
+                  keys version, export, status ('ok' or 'failed'), time (in seconds), DR_input and VS_input
+                  (the paths of the transformed content) or error and traceback
+    """
+    logger = get_logger()
+    if workers == 0:
+        workers = os.cpu_count() or 1
+    kwargs.pop("export", None)
+    tasks = list()
+    for requested in (version if isinstance(version, list) else [version, ]):
+        json_paths = dc.prefetch(requested, exports=exports, **kwargs)
+        for retrieved in dict.fromkeys(v for export in exports for v in json_paths[export]):
+            tasks.extend((retrieved, export) for export in exports
+                         if retrieved in json_paths[export] and (retrieved, export) not in tasks)
+    # A single version is written directly to the output directory
+    single_version = len(set(task[0] for task in tasks)) <= 1
+    # The exports have just been retrieved, the workers do not need to check for updates
+    kwargs.setdefault("offline", True)
+
+    def get_options(version):
+        return dict(kwargs, validate=validate,
+                    output_dir=output_dir if output_dir is None or single_version
+                    else os.path.join(output_dir, version))
+
+    results = dict()
+
+    def report(result):
+        results[result["version"], result["export"]] = result
+        if result["status"] in ["ok", ]:
+            logger.info(f"[{len(results)}/{len(tasks)}] Transformed {result['version']} ({result['export']}) in "
+                        f"{result['time']:.1f}s")
+        else:
+            logger.error(f"[{len(results)}/{len(tasks)}] Could not transform {result['version']} "
+                         f"({result['export']}): {result['error']}")
+            logger.debug(result["traceback"])
+
+    if workers > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as pool:
+            futures = {pool.submit(_transform_version, version, export, **get_options(version)): (version, export)
+                       for (version, export) in tasks}
+            for future in as_completed(futures):
+                version, export = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    # The worker process itself failed (eg. it has been killed)
+                    result = dict(version=version, export=export, status="failed", time=0.,
+                                  error=f"{type(e).__name__}: {e}", traceback=traceback.format_exc())
+                report(result)
+    else:
+        for (version, export) in tasks:
+            report(_transform_version(version, export, **get_options(version)))
+
+    results = [results[task] for task in tasks]
+    failed = [result for result in results if result["status"] not in ["ok", ]]
+    summary = ["Summary of the transformations:", ] + \
+        [f"  {result['version']} ({result['export']}): {result['status']} in {result['time']:.1f}s"
+         for result in results] + \
+        [f"  {len(results) - len(failed)} succeeded, {len(failed)} failed, "
+         f"{sum(result['time'] for result in results):.1f}s in total"]
+    logger.info(os.linesep.join(summary))
+    return results
+
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument("--version", default="latest_stable", help="Version to be used")
@@ -16,7 +16,7 @@ from itertools import product, chain
 
 from data_request_api.utilities.logger import get_logger, change_log_file, change_log_level
 from data_request_api.content.dump_transformation import transform_content
-from data_request_api.utilities.tools import read_json_file, write_csv_output_file_content
+from data_request_api.utilities.tools import read_json_file, write_csv_output_file_content, is_file
 from data_request_api.query.vocabulary_server import VocabularyServer, is_link_id_or_value, build_link_from_id, \
     to_singular, ConstantValueObj, to_plural
 
@@ -562,14 +562,14 @@ class DataRequest(object):
         :return DataRequest: instance of the DataRequest object
         """
         logger = get_logger()
-        if isinstance(DR_input, str) and os.path.isfile(DR_input):
+        if isinstance(DR_input, str) and is_file(DR_input):
             DR = read_json_file(DR_input)
         elif isinstance(DR_input, dict):
             DR = copy.deepcopy(DR_input)
         else:
             logger.error("DR_input should be either the name of a json file or a dictionary.")
             raise TypeError("DR_input should be either the name of a json file or a dictionary.")
-        if isinstance(VS_input, str) and os.path.isfile(VS_input):
+        if isinstance(VS_input, str) and is_file(VS_input):
             VS = VocabularyServer.from_input(VS_input)
         elif isinstance(VS_input, dict):
             VS = VocabularyServer(copy.deepcopy(VS_input))
@@ -943,6 +943,81 @@ class DataRequest(object):
             else:
                 return self.find_element_from_vs(element_type=element_type, value=value, default=default, key=key)
 
+    def find_variables_per_facets(self, pattern=None, **facets):
+        """
+        Find the variables of which the components of the compound names match some values
+        (see VocabularyServer.get_variables_per_facets).
+        :param str pattern: a pattern of CMIP7 compound name, eg. "ocean.*.mon.*"
+        :param dict facets: the values of some components {facet: value or list of values}, eg. branding="tavg-u-hxy-sea"
+        :return list of Variable: the matching variables
+        """
+        return [self.find_element("variables", variable_id)
+                for variable_id in self.VS.get_variables_per_facets(pattern=pattern, **facets)]
+
+    def get_variables_facet_counts(self, facet, pattern=None, **facets):
+        """
+        Count the variables per value of a component of their compound names, among the variables matching some
+        values (see VocabularyServer.get_facet_counts).
+        :param str facet: the component to be counted, eg. "frequency"
+        :param str pattern: a pattern of CMIP7 compound name, eg. "ocean.*"
+        :param dict facets: the values of some components {facet: value or list of values}
+        :return dict: the number of variables per value of the component
+        """
+        return self.VS.get_facet_counts(facet, pattern=pattern, **facets)
+
+    def get_suggestions(self, element_type, value, limit=5):
+        """
+        Suggest the names of the elements of a kind which are the closest to a value that could not be found.
+        :param str element_type: kind of the elements
+        :param str value: the value which could not be found
+        :param int limit: the maximum number of suggestions
+        :return list of str: the suggested names, the closest first
+        """
+        return self.VS.get_suggestions(element_type, value, limit=limit)
+
+    def resolve_many(self, element_type, values, limit=5):
+        """
+        Find the elements of a kind specified by several names (or ids).
+        :param str element_type: kind of the elements
+        :param list values: the names (or ids) to be looked for
+        :param int limit: the maximum number of suggestions for each value not found
+        :return tuple of dict: the elements found {value: element} and the suggested names for the values not found
+                               {value: [names]}
+        """
+        names, _, _ = self.VS.get_names_index(element_type)
+        _, ids = self.VS.get_element_type_ids(element_type)
+        ids = set(ids)
+        found = dict()
+        not_found = dict()
+        for value in values:
+            if value in found or value in not_found:
+                continue
+            check_val = is_link_id_or_value(value)[1]
+            # Look up the names index first rather than scanning the vocabulary server for each value
+            if isinstance(check_val, str) and check_val not in ids and len(names.get(check_val, list())) == 1:
+                elt = self.find_element(element_type, build_link_from_id(names[check_val][0]), default=None)
+            else:
+                elt = self.find_element(element_type, value, default=None)
+            if elt is None:
+                not_found[value] = self.get_suggestions(element_type, value, limit=limit)
+            else:
+                found[value] = elt
+        return found, not_found
+
+    def search(self, text, element_types=None, limit=None):
+        """
+        Full-text search of the elements of which the names, titles, descriptions or comments contain all the words of
+        text (see VocabularyServer.search).
+        :param str text: the words to be looked for, eg. "sea ice thickness"
+        :param str or list of str element_types: the kind(s) of elements to be looked for, None for all of them
+        :param int limit: the maximum number of results, None for all of them
+        :return list: the elements found, the most relevant first
+        """
+        if isinstance(element_types, str):
+            element_types = [element_types, ]
+        return [self.find_element(element_type, element_id)
+                for (element_type, element_id, _) in self.VS.search(text, element_types=element_types, limit=limit)]
+
     def get_elements_per_kind(self, element_type):
         """
         Return the list of elements of kind element_type
@@ -1083,11 +1158,16 @@ class DataRequest(object):
                         new_val = val
                     if new_val is not None:
                         rep[new_val.DR_type].append(new_val)
-                    elif skip_if_missing:
-                        logger.warning(f"Could not find value {val} for element type {req}, skip it.")
                     else:
-                        logger.error(f"Could not find value {val} for element type {req}.")
-                        raise ValueError(f"Could not find value {val} for element type {req}.")
+                        message = f"Could not find value {val} for element type {req}"
+                        suggestions = self.get_suggestions(req, val)
+                        if len(suggestions) > 0:
+                            message += f" (did you mean: {', '.join(suggestions)}?)"
+                        if skip_if_missing:
+                            logger.warning(f"{message}, skip it.")
+                        else:
+                            logger.error(f"{message}.")
+                            raise ValueError(f"{message}.")
             return rep
 
         def apply_operation_on_requests_links(dict_request_links, elements, operation, void_list="full"):
@@ -155,9 +155,11 @@ class DreqTable:
             field['attribute_name'] = attr
             attr2field[attr] = field_name  # remember the Airtable name, in case useful later
             # If field is a link, add the name of the linked table to field_info.
+            # (The linked table may be unknown if only some tables were loaded.)
             if 'linked_table_id' in field:
-                field['linked_table_name'] = table_id2name[field['linked_table_id']]
-                links[attr] = field['linked_table_name']
+                field['linked_table_name'] = table_id2name.get(field['linked_table_id'])
+                if field['linked_table_name'] is not None:
+                    links[attr] = field['linked_table_name']
 
         # Loop over records to create a record object representing each one
         records = table['records']  # dict giving info on each record, keyed by record_id (example: 'reczyxsKbAseqCisA')
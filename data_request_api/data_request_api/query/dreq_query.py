@@ -127,7 +127,7 @@ def _get_base_dict(content, dreq_version, purpose='request', **kwargs):
 
 
 @append_kwargs_from_config
-def create_dreq_tables_for_request(content, dreq_version, **kwargs):
+def create_dreq_tables_for_request(content, dreq_version, tables=None, **kwargs):
     '''
     For the "request" part of the data request content (Opportunities, Variable Groups, etc),
     render airtable export content as DreqTable objects.
@@ -149,6 +149,10 @@ def create_dreq_tables_for_request(content, dreq_version, **kwargs):
         }
     dreq_version : str
         Version string identifier for Data Request Content
+    tables : list, optional
+        Names of the tables to render (default: all tables). Links to other tables
+        are left unresolved. For consolidated content, pass the same list to
+        dreq_content.load() to read only these tables from the cache.
 
     Returns
     -------
@@ -163,12 +167,6 @@ def create_dreq_tables_for_request(content, dreq_version, **kwargs):
     CONFIG.update(kwargs)
     # consolidate = CONFIG['consolidate']
 
-    # Create objects representing data request tables
-    table_id2name = get_table_id2name(base)
-    for table_name, table in base.items():
-        # print('Creating table object for table: ' + table_name)
-        base[table_name] = DreqTable(table, table_id2name)
-
     # Change names of tables if needed
     # (insulates downstream code from upstream name changes that don't affect functionality)
     change_table_names = {}
@@ -178,6 +176,16 @@ def create_dreq_tables_for_request(content, dreq_version, **kwargs):
             'Experiment': 'Experiments',
             'Priority level': 'Priority Level'
         }
+
+    # Create objects representing data request tables
+    table_id2name = get_table_id2name(base)
+    if tables is not None:
+        for table_name in list(base.keys()):
+            if table_name not in tables and change_table_names.get(table_name) not in tables:
+                base.pop(table_name)
+    for table_name, table in base.items():
+        # print('Creating table object for table: ' + table_name)
+        base[table_name] = DreqTable(table, table_id2name)
     for old, new in change_table_names.items():
         assert new not in base, 'New table name already exists: ' + new
         if old not in base:
@@ -186,6 +194,10 @@ def create_dreq_tables_for_request(content, dreq_version, **kwargs):
         base[new] = base[old]
         base.pop(old)
 
+    if tables is not None and 'Opportunity' not in base:
+        # Only other tables were requested
+        return base
+
     # Make some adjustments that are specific to the Opportunity table
     dreq_opps = base['Opportunity']
     dreq_opps.rename_attr('title_of_opportunity', 'title')  # rename title attribute for brevity in downstream code
@@ -7,13 +7,68 @@ Vocabulary server.
 
 from __future__ import division, print_function, unicode_literals, absolute_import
 
+import bisect
 import copy
-from collections import defaultdict
+import fnmatch
+import heapq
+import logging
+import math
+import re
+from collections import Counter, defaultdict
 
 from data_request_api.utilities.logger import get_logger
 from data_request_api.utilities.tools import read_json_file
 
 
+# Weights of the attributes indexed for the full-text search, matched on the end of the attribute names
+#  (eg. "cmip7_compound_name" is a name, "processing_note" a comment)
+search_fields_weights = dict(name=4., title=3., description=1., comment=1., note=1.)
+
+
+# Components of the compound names of the variables, in the order they appear in the names
+#  (the branded variable name is only parsed if the CMIP7 compound name is not available)
+compound_names_facets = dict(
+    cmip7_compound_name=("realm", "variable_root", "branding", "frequency", "region"),
+    cmip6_compound_name=("cmip6_table", "cmip6_variable"),
+    branded_variable_name=("variable_root", "branding")
+)
+compound_names_separators = dict(cmip7_compound_name=".", cmip6_compound_name=".", branded_variable_name="_")
+
+
+def parse_compound_name(name, kind="cmip7_compound_name"):
+    """
+    Split a compound name of a variable into its components
+    :param str name: the compound name, eg. "ocean.tos.tavg-u-hxy-sea.mon.glb"
+    :param str kind: the kind of compound name (a key of compound_names_facets)
+    :return dict: the components of the name {facet: value}, None if the name can not be parsed
+    """
+    if not isinstance(name, str):
+        return None
+    components = name.split(compound_names_separators[kind])
+    if len(components) != len(compound_names_facets[kind]) or not all(components):
+        return None
+    return dict(zip(compound_names_facets[kind], components))
+
+
+def tokenize(text):
+    """
+    Split a text into the lower case words (sequences of letters and digits) used by the full-text search
+    :param str text: the text to be split
+    :return list of str: the words of the text
+    """
+    return re.findall(r"[^\W_]+", text.lower())
+
+
+def trigrams(text):
+    """
+    Get the trigrams (sequences of three characters) of a text, used to suggest names close to a misspelled one
+    :param str text: the text
+    :return set of str: the trigrams of the lower case text, padded with spaces
+    """
+    text = f"  {text.lower()} "
+    return set(text[i:i + 3] for i in range(len(text) - 2))
+
+
 def is_link_id_or_value(elt):
     """
     Check if the input value is a link and transform it into a value if so
@@ -67,6 +122,9 @@ class VocabularyServer(object):
     def __init__(self, input_database, **kwargs):
         self.vocabulary_server = copy.deepcopy(input_database)
         self.version = self.vocabulary_server.pop("version")
+        self.search_index = None
+        self.names_index = dict()
+        self.variables_index = None
         self.check_infinite_loop()
 
     @classmethod
@@ -160,6 +218,254 @@ class VocabularyServer(object):
         element_type = self.get_element_type(element_type)
         return element_type, sorted(list(self.vocabulary_server[element_type]))
 
+    def get_search_field_weight(self, key):
+        """
+        Get the weight of an attribute in the full-text search
+        :param str key: the name of the attribute
+        :return float: the weight of the attribute, None if it is not indexed
+        """
+        for (field, weight) in search_fields_weights.items():
+            if key.endswith(field) or key.endswith(field + "s"):
+                return weight
+        return None
+
+    def get_search_index(self):
+        """
+        Get the inverted index used for the full-text search, built on first use.
+        The index maps each word to the elements of which the names, titles, descriptions or comments contain it,
+        with the weighted number of occurrences of the word in these attributes.
+        :return dict: the index {word: {(element_type, element_id): weighted occurrences}}
+        """
+        if self.search_index is None:
+            search_index = defaultdict(lambda: defaultdict(float))
+            weights = dict()
+            for (element_type, elements) in self.vocabulary_server.items():
+                if not isinstance(elements, dict):
+                    continue
+                for (element_id, element) in elements.items():
+                    for (key, value) in element.items():
+                        if key not in weights:
+                            weights[key] = self.get_search_field_weight(key)
+                        if weights[key] is None:
+                            continue
+                        for text in (value if isinstance(value, list) else [value, ]):
+                            if isinstance(text, str) and not is_link_id_or_value(text)[0]:
+                                for word in tokenize(text):
+                                    search_index[word][element_type, element_id] += weights[key]
+            self.search_index = {word: dict(postings) for (word, postings) in search_index.items()}
+        return self.search_index
+
+    def search(self, text, element_types=None, limit=None):
+        """
+        Full-text search of the elements of which the names, titles, descriptions or comments contain all the words of
+        text. The elements are ranked by relevance: words in names and titles and words which are rare in the
+        vocabulary server count more.
+        :param str text: the words to be looked for
+        :param list of str element_types: the kinds of elements to be looked for, None for all of them
+        :param int limit: the maximum number of results, None for all of them
+        :return list of tuple: the (element_type, element_id, score) found, by decreasing score
+        """
+        search_index = self.get_search_index()
+        words = sorted(set(tokenize(text)), key=lambda word: len(search_index.get(word, dict())))
+        if len(words) == 0 or any(word not in search_index for word in words):
+            return list()
+        if element_types is not None:
+            element_types = set(self.get_element_type(element_type) for element_type in element_types)
+        # Start from the rarest word so that the candidates are as few as possible
+        nb_elements = sum(len(elements) for elements in self.vocabulary_server.values() if isinstance(elements, dict))
+        scores = dict()
+        for (i, word) in enumerate(words):
+            postings = search_index[word]
+            idf = math.log(1. + nb_elements / len(postings))
+            if i == 0:
+                candidates = [key for key in postings if element_types is None or key[0] in element_types]
+            else:
+                candidates = [key for key in scores if key in postings]
+            scores = {key: scores.get(key, 0.) + idf * (1. + math.log(postings[key])) for key in candidates}
+            if len(scores) == 0:
+                return list()
+        results = [(-score, element_type, element_id) for ((element_type, element_id), score) in scores.items()]
+        if limit is None:
+            results = sorted(results)
+        else:
+            results = heapq.nsmallest(limit, results)
+        return [(element_type, element_id, -score) for (score, element_type, element_id) in results]
+
+    def get_names_index(self, element_type, id_type="name"):
+        """
+        Get the index of the values of the attribute id_type of the elements of a kind, built on first use.
+        :param str element_type: kind of the elements
+        :param str id_type: the attribute indexed ("id" for the ids of the elements)
+        :return tuple: the ids of the elements per value {value: [ids]}, the trigram index of the values
+                       {trigram: [values]} and the number of trigrams of each value {value: number}
+        """
+        element_type = self.get_element_type(element_type)
+        if (element_type, id_type) not in self.names_index:
+            values = defaultdict(list)
+            for (element_id, element) in self.vocabulary_server[element_type].items():
+                value = element_id if id_type in ["id", ] else element.get(id_type)
+                for val in (value if isinstance(value, list) else [value, ]):
+                    if isinstance(val, str):
+                        values[val].append(element_id)
+            trigrams_index = defaultdict(list)
+            nb_trigrams = dict()
+            for value in sorted(values):
+                value_trigrams = trigrams(value)
+                nb_trigrams[value] = len(value_trigrams)
+                for trigram in value_trigrams:
+                    trigrams_index[trigram].append(value)
+            self.names_index[element_type, id_type] = (dict(values), dict(trigrams_index), nb_trigrams)
+        return self.names_index[element_type, id_type]
+
+    def get_suggestions(self, element_type, value, id_type="name", limit=5, threshold=0.3):
+        """
+        Suggest the values of the attribute id_type of elements of a kind which are the closest to a value that could
+        not be found (similarity of their trigrams).
+        :param str element_type: kind of the elements
+        :param str value: the value which could not be found
+        :param str id_type: the attribute to be looked at ("id" for the ids of the elements)
+        :param int limit: the maximum number of suggestions
+        :param float threshold: the minimum similarity (between 0 and 1) of the suggestions
+        :return list of str: the suggested values, the closest first
+        """
+        _, trigrams_index, nb_trigrams = self.get_names_index(element_type, id_type=id_type)
+        value_trigrams = trigrams(str(is_link_id_or_value(value)[1]))
+        # Count the trigrams shared with each candidate, then rank the candidates by Dice coefficient
+        shared = Counter()
+        for trigram in value_trigrams:
+            shared.update(trigrams_index.get(trigram, list()))
+        scores = [(-2. * count / (len(value_trigrams) + nb_trigrams[candidate]), candidate)
+                  for (candidate, count) in shared.items()]
+        return [candidate for (score, candidate) in heapq.nsmallest(limit, scores) if -score >= threshold]
+
+    def get_variables_index(self):
+        """
+        Get the index of the variables per components of their compound names (see compound_names_facets), built on
+        first use.
+        :return dict: the components of each variable ("components": {variable_id: {facet: value}}), the variables
+                      per facet value ("facets": {facet: {value: [variable_ids]}}), the sorted values of each
+                      facet ("values": {facet: [values]}) and the CMIP7 compound name of each variable
+                      ("compound_names": {variable_id: name})
+        """
+        if self.variables_index is None:
+            element_type, _ = self.get_element_type_ids("variables")
+            components = dict()
+            compound_names = dict()
+            facets = {facet: defaultdict(list) for kind_facets in compound_names_facets.values()
+                      for facet in kind_facets}
+            for (variable_id, variable) in sorted(self.vocabulary_server[element_type].items()):
+                variable_components = dict()
+                for kind in compound_names_facets:
+                    if kind in ["branded_variable_name", ] and "branding" in variable_components:
+                        continue
+                    variable_components.update(parse_compound_name(variable.get(kind), kind) or dict())
+                components[variable_id] = variable_components
+                if parse_compound_name(variable.get("cmip7_compound_name")) is not None:
+                    compound_names[variable_id] = variable["cmip7_compound_name"]
+                for (facet, value) in variable_components.items():
+                    facets[facet][value].append(variable_id)
+            self.variables_index = dict(components=components,
+                                        facets={facet: dict(values) for (facet, values) in facets.items()},
+                                        values={facet: sorted(values) for (facet, values) in facets.items()},
+                                        compound_names=compound_names)
+        return self.variables_index
+
+    def get_variables_per_facets(self, pattern=None, **facets):
+        """
+        Get the variables of which the components of the compound names match some values.
+        :param str pattern: a pattern of CMIP7 compound name, eg. "ocean.*.mon.*" (wildcards as in fnmatch)
+        :param dict facets: the values of some components {facet: value or list of values}, eg. branding="tavg-u-hxy-sea"
+                            or realm=["ocean", "seaIce"]; the values can include wildcards, eg. frequency="*hr"
+        :return list of str: the sorted ids of the matching variables
+        """
+        logger = get_logger()
+        index = self.get_variables_index()
+        facets = {facet: values if isinstance(values, list) else [values, ] for (facet, values) in facets.items()}
+        match_pattern = False
+        if pattern is not None:
+            # A pattern with a value (or wildcard) per component is turned into facet values, otherwise the
+            #  leading components without wildcards narrow the variables down before matching the whole names
+            values = pattern.split(compound_names_separators["cmip7_compound_name"])
+            kind_facets = compound_names_facets["cmip7_compound_name"]
+            if len(values) == len(kind_facets):
+                pattern_facets = list(zip(kind_facets, values))
+            else:
+                match_pattern = True
+                pattern_facets = list()
+                for (facet, value) in zip(kind_facets, values[:-1]):
+                    if any(char in value for char in "*?["):
+                        break
+                    pattern_facets.append((facet, value))
+            for (facet, value) in pattern_facets:
+                facets[facet] = [value, ] + facets.get(facet, list())
+                if len(facets[facet]) > 1:
+                    logger.error(f"Facet {facet} is specified both in compound name pattern {pattern} and "
+                                 f"as argument.")
+                    raise ValueError(f"Facet {facet} is specified both in compound name pattern {pattern} and "
+                                     f"as argument.")
+        rep = None
+        for (facet, values) in facets.items():
+            if facet not in index["facets"]:
+                logger.error(f"Unknown facet {facet}, should be in {sorted(index['facets'])}.")
+                raise ValueError(f"Unknown facet {facet}, should be in {sorted(index['facets'])}.")
+            found = set()
+            for value in values:
+                if value in ["*", ]:
+                    found = None
+                    break
+                for matching_value in self.get_facet_values(facet, value):
+                    found.update(index["facets"][facet][matching_value])
+            if found is not None:
+                rep = found if rep is None else rep & found
+        if rep is None:
+            rep = index["components"]
+        if match_pattern:
+            rep = [variable_id for variable_id in rep
+                   if fnmatch.fnmatchcase(index["compound_names"].get(variable_id, ""), pattern)]
+        return sorted(rep)
+
+    def get_facet_values(self, facet, value):
+        """
+        Get the values of a facet matching a value, which can include wildcards.
+        :param str facet: the facet
+        :param str value: the value, eg. "tavg-u-hxy-sea", "tavg-*" or "*hr"
+        :return list of str: the values of the facet matching value
+        """
+        index = self.get_variables_index()
+        if not any(char in value for char in "*?["):
+            return [value, ] if value in index["facets"][facet] else list()
+        values = index["values"][facet]
+        prefix = value.rstrip("*")
+        if value.endswith("*") and not any(char in prefix for char in "*?["):
+            # Prefix query on the sorted values
+            start = bisect.bisect_left(values, prefix)
+            end = start
+            while end < len(values) and values[end].startswith(prefix):
+                end += 1
+            return values[start:end]
+        return [val for val in values if fnmatch.fnmatchcase(val, value)]
+
+    def get_facet_counts(self, facet, pattern=None, **facets):
+        """
+        Count the variables per value of a facet, among the variables matching some values (see
+        get_variables_per_facets).
+        :param str facet: the facet to be counted, eg. "frequency"
+        :param str pattern: a pattern of CMIP7 compound name
+        :param dict facets: the values of some components {facet: value or list of values}
+        :return dict: the number of variables per value of the facet
+        """
+        logger = get_logger()
+        index = self.get_variables_index()
+        if facet not in index["facets"]:
+            logger.error(f"Unknown facet {facet}, should be in {sorted(index['facets'])}.")
+            raise ValueError(f"Unknown facet {facet}, should be in {sorted(index['facets'])}.")
+        if pattern is None and len(facets) == 0:
+            return {value: len(variables) for (value, variables) in sorted(index["facets"][facet].items())}
+        counts = Counter(index["components"][variable_id].get(facet)
+                         for variable_id in self.get_variables_per_facets(pattern=pattern, **facets))
+        counts.pop(None, None)
+        return dict(sorted(counts.items()))
+
     def get_element(self, element_type, element_id, element_key=None, default=False, id_type="id"):
         """
         Get an element corresponding to an element_id (corresponding to attribute id_type) of a kind element_type.
@@ -209,15 +515,18 @@ class VocabularyServer(object):
                 elif isinstance(value, dict):
                     value["id"] = element_id
                 return value
-            elif default is not False:
-                logger.debug(f"Could not find {id_type} {element_id} of type {element_type}"
-                             f" in the vocabulary server.")
+            message = f"Could not find {id_type} {element_id} of type {element_type} in the vocabulary server."
+            # Suggestions are only computed if they are reported
+            if isinstance(id_type, str) and (default is False or logger.isEnabledFor(logging.DEBUG)):
+                suggestions = self.get_suggestions(element_type, element_id, id_type=id_type)
+                if len(suggestions) > 0:
+                    message += f" Did you mean: {', '.join(suggestions)}?"
+            if default is not False:
+                logger.debug(message)
                 return default
             else:
-                logger.error(f"Could not find {id_type} {element_id} of type {element_type} "
-                             f"in the vocabulary server.")
-                raise ValueError(f"Could not find {id_type} {element_id} of type {element_type} "
-                                 f"in the vocabulary server.")
+                logger.error(message)
+                raise ValueError(message)
         elif element_id in ["???", None]:
             logger.critical(f"Undefined id of type {element_type}")
             return element_id
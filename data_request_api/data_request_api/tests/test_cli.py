@@ -612,3 +612,34 @@ class TestEstimateDreqVolume:
         assert os.path.exists(ofile) and os.path.getsize(ofile) > 0
         assert os.path.exists(csizecfg) and os.path.getsize(csizecfg) > 0
         assert not os.path.exists(sizecfg) or os.path.getsize(sizecfg) == 0
+
+
+def test_bundle_dreq_cache(tmp_path, monkeypatch):
+    config_file = tmp_path / ".CMIP7_data_request_api_config"
+    monkeypatch.setenv("CMIP7_DR_API_CONFIGFILE", str(config_file))
+    cache_dir = tmp_path / "cache"
+    (cache_dir / "v1.2").mkdir(parents=True)
+    (cache_dir / "v1.2" / dc._json_release).write_text("{}")
+    with open(config_file, "w") as fh:
+        yaml.dump({"cache_dir": str(cache_dir), "offline": True}, fh)
+    bundle = tmp_path / "bundle.zip"
+
+    def run(*args):
+        return subprocess.run(
+            [sys.executable, "-m", "data_request_api.command_line.bundle_dreq_cache", *args],
+            capture_output=True,
+            text=True,
+        )
+
+    result = run("create", str(bundle))
+    assert result.returncode == 0
+    assert "Packed version(s) ['v1.2']" in result.stdout
+    result = run("verify", str(bundle))
+    assert result.returncode == 0
+
+    # Import into an empty cache
+    with open(config_file, "w") as fh:
+        yaml.dump({"cache_dir": str(tmp_path / "other"), "offline": True}, fh)
+    result = run("import", str(bundle))
+    assert result.returncode == 0
+    assert (tmp_path / "other" / "v1.2" / dc._json_release).is_file()
@@ -151,6 +151,24 @@ def test_update_config_update_existing_key(temp_config_file, monkeypatch):
     assert dreqcfg.CONFIG["offline"] is False
 
 
+def test_update_config_int_value(temp_config_file, monkeypatch):
+    monkeypatch.setattr(
+        "data_request_api.utilities.config.CONFIG_FILE", temp_config_file
+    )
+    update_config("versions_ttl", "600")
+    assert dreqcfg.CONFIG["versions_ttl"] == 600
+    with pytest.raises(TypeError):
+        update_config("versions_ttl", "an hour")
+    with pytest.raises(TypeError):
+        _sanity_check("versions_ttl", True)
+    with pytest.raises(ValueError):
+        update_config("memo_size", -1)
+    with pytest.raises(ValueError):
+        update_config("cache_max_size", "-100")
+    update_config("cache_max_size", 0)
+    assert dreqcfg.CONFIG["cache_max_size"] == 0
+
+
 def test_sanity_checks():
     with pytest.raises(KeyError):
         _sanity_check("invalid_key", "invalid_value")
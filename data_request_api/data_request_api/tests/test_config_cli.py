@@ -138,6 +138,43 @@ def test_update_config(temp_config_file, monkeypatch):
     assert config["offline"] is True
 
 
+def test_cache_usage_and_evict(temp_config_file, monkeypatch, tmp_path):
+    monkeypatch.setattr(
+        "data_request_api.utilities.config.CONFIG_FILE", temp_config_file
+    )
+    cache_dir = tmp_path / "cache"
+    for version in ["v1.0", "v1.1", "dev"]:
+        (cache_dir / version).mkdir(parents=True)
+        (cache_dir / version / "dreq_release_export.json").write_text("x" * 100)
+    with open(temp_config_file, "w") as f:
+        yaml.dump({"cache_dir": str(cache_dir), "cache_max_size": 250}, f)
+
+    def run(command):
+        return subprocess.run(
+            [
+                sys.executable,
+                "-m",
+                "data_request_api.command_line.config",
+                command,
+                "--cfgfile",
+                str(temp_config_file),
+            ],
+            capture_output=True,
+            text=True,
+        )
+
+    result = run("usage")
+    assert result.returncode == 0
+    assert "v1.0: 100 bytes" in result.stdout
+    assert "Total: 300 bytes" in result.stdout
+
+    # Neither "dev" nor the latest stable version are evicted
+    result = run("evict")
+    assert result.returncode == 0
+    assert "Evicted version(s): ['v1.0']" in result.stdout
+    assert sorted(os.listdir(cache_dir)) == ["dev", "v1.1"]
+
+
 def test_invalid_command(temp_config_file, monkeypatch):
     monkeypatch.setattr(
         "data_request_api.utilities.config.CONFIG_FILE", temp_config_file
@@ -1,76 +1,64 @@
+import copy
+from concurrent.futures import ThreadPoolExecutor
+
 import data_request_api.utilities.config as dreqcfg
 import pytest
 from data_request_api.content import dreq_content as dc
+from data_request_api.content import consolidate_export as ce
 from data_request_api.content.consolidate_export import (
     _apply_consistency_fixes,
+    _compile_filter,
     _filter_references,
-    _map_attribute,
-    _map_record_id,
+    _find_records,
+    _split_values,
     map_data,
+    read_export,
 )
 from data_request_api.content.mapping_table import (
+    mapping_table,
     version_consistency_drop_fields,
     version_consistency_fields,
 )
 from data_request_api.tests import filepath
 from data_request_api.utilities.logger import change_log_file, change_log_level
 from data_request_api.utilities.tools import (
+    iter_json_items,
     read_json_file,
     write_json_output_file_content,
 )
 
 
-@pytest.mark.skip(reason="Work on this test deferred to allow release")
-def test_map_record_id():
+def test_find_records():
+    "Test finding records by attribute value with an index of the attribute values."
     # Read 3-base export
     several_bases_input = read_json_file(filepath("dreq_raw_export.json"))
-    # Select a variable record to map (day.wap)
-    record = several_bases_input["Data Request Variables (Public)"]["Variable"][
-        "records"
-    ]["recIHH5OexHWtBNgn"]
-    # Select the list of records to map against
-    records = several_bases_input["Data Request Opportunities (Public)"]["Variables"][
-        "records"
-    ]
-    # Assert successful mapping via keys UID and Compound Name
-    assert _map_record_id(record, records, ["Compound Name"]) == ["recIEe4GucNn5Bp1t"]
-    assert _map_record_id(record, records, ["UID"]) == ["recIEe4GucNn5Bp1t"]
-    # Delete the mapped record and assert no match is found
-    record_rm = records.pop("recIEe4GucNn5Bp1t")
-    assert _map_record_id(record, records, ["Compound Name"]) == []
-    # Duplicate the record back in and assert two matches are found now
-    records["test1"] = record_rm
-    records["test2"] = record_rm.copy()
-    assert _map_record_id(record, records, ["UID", "Compound Name"]) == [
-        "test1",
-        "test2",
-    ]
-    # Alter the UID of one duplicated entry and assert one match is found
-    records["test2"]["UID"] = "someUID"
-    assert _map_record_id(record, records, ["UID", "Compound Name"]) == ["test1"]
-
-
-def test_map_attribute():
-    # Read 3-base export
-    several_bases_input = read_json_file(filepath("dreq_raw_export.json"))
-    # Select a CF Standard Name to map (lagrangian_tendency_of_air_pressure)
+    # Select a CF Standard Name to map
     attr = "mole_concentration_of_aragonite_expressed_as_carbon_in_sea_water"
     # Select the list of records to map against
     records = several_bases_input["Data Request Physical Parameters (Public)"][
         "CF Standard Name"
     ]["records"]
-    # Assert successful mapping via key "name"
-    assert _map_attribute(attr, records, ["name"]) == ["rec0ik3QbkrzxJy0n"]
+    # Assert successful mapping via key "name", and the index being built
+    index = {}
+    assert _find_records(records, "name", attr, index) == ["rec0ik3QbkrzxJy0n"]
+    assert index["name"][attr] == ["rec0ik3QbkrzxJy0n"]
+    assert _find_records(records, "unknown key", attr, index) == []
     # Delete the mapped record and assert no match is found
     record_rm = records.pop("rec0ik3QbkrzxJy0n")
-    assert _map_attribute(attr, records, ["name"]) == []
+    assert _find_records(records, "name", attr, {}) == []
     # Duplicate the record back in and assert two matches are found now
     records["test1"] = record_rm
     records["test2"] = record_rm.copy()
-    assert _map_attribute(attr, records, ["name"]) == ["test1", "test2"]
+    assert _find_records(records, "name", attr, {}) == ["test1", "test2"]
     # Alter the name of one duplicated entry and assert one match is found
     records["test2"]["name"] = "someName"
-    assert _map_attribute(attr, records, ["name"]) == ["test1"]
+    assert _find_records(records, "name", attr, {}) == ["test1"]
+    # Unhashable attribute values are compared one record at a time
+    records["test2"]["name"] = [{"a": 1}]
+    index = {}
+    assert _find_records(records, "name", [{"a": 1}], index) == ["test2"]
+    assert index["name"] is None
+    assert _find_records(records, "name", attr, index) == ["test1"]
 
 
 def test_apply_consistency_fixes():
@@ -149,3 +137,459 @@ def test_incorrect_version_raises_error(monkeypatch):
     assert map_data(dreqdict, mapping_table={}, version="v1.2.3rc") == {
         "Data Request": {"version": "v1.2.3rc"}
     }
+
+
+def test_read_export_streaming(monkeypatch):
+    "Test reading a three-base export one table at a time and consolidating it."
+    several_bases_input = read_json_file(filepath("dreq_raw_export.json"))
+
+    # The export is decoded one table at a time, regardless of the chunk size
+    fingerprints = []
+    for chunk_size in [7, 1024 * 1024]:
+        streamed = {}
+        digests = {}
+        with open(filepath("dreq_raw_export.json")) as f:
+            for base, table, content in iter_json_items(
+                f, chunk_size=chunk_size, digests=digests
+            ):
+                streamed.setdefault(base, {})[table] = content
+        assert streamed == several_bases_input
+        fingerprints.append(digests)
+    assert fingerprints[0] == fingerprints[1]
+    assert set(fingerprints[0]) == {
+        (base, table) for base in several_bases_input for table in several_bases_input[base]
+    }
+
+    # Tables the mapping does not read are discarded
+    with open(filepath("dreq_raw_export.json")) as f:
+        data = read_export(f, mapping_table)
+    assert data.keys() == several_bases_input.keys()
+    assert "Comment" not in data["Data Request Variables (Public)"]
+    assert (
+        data["Data Request Variables (Public)"]["Variable"]
+        == several_bases_input["Data Request Variables (Public)"]["Variable"]
+    )
+
+    # Releasing the source tables does not alter the consolidated content
+    #  (the hard fixes do not apply to this outdated test export)
+    monkeypatch.setattr(
+        "data_request_api.content.consolidate_export._apply_hard_fixes",
+        lambda data: data,
+    )
+    mt = {k: v for k, v in mapping_table.items() if not v["internal_mapping"]}
+    with open(filepath("dreq_raw_export.json")) as f:
+        consolidated = map_data(read_export(f, mt), mt, "v1.2", release_source=True)
+    assert consolidated == map_data(several_bases_input, mt, "v1.2")
+
+
+def test_split_values():
+    "Test splitting comma-separated values, ignoring commas within quotes."
+    assert _split_values("a, b,c") == ["a", "b", "c"]
+    assert _split_values('"a, b", c') == ['"a, b"', "c"]
+    assert _split_values('a,, "b, c"') == ["a", "", '"b, c"']
+    assert _split_values("") == [""]
+
+
+def test_compile_filter():
+    "Test the predicates compiled from internal filters."
+    nonempty = _compile_filter("A", {"aliases": ["B"], "operator": "nonempty"})
+    assert nonempty({"B": ["x"]}) is True
+    assert nonempty({"A": []}) is False
+    assert nonempty({}) is False
+    isin = _compile_filter("A", {"aliases": [], "operator": "in", "values": ["x"]})
+    assert isin({"A": "x"}) is True
+    assert isin({"A": ["y", "x"]}) is True
+    assert isin({"A": "y"}) is False
+    notin = _compile_filter("A", {"aliases": [], "operator": "not in", "values": ["x"]})
+    assert notin({"A": ["x"]}) is False
+    assert notin({"A": ["x", "y"]}) is True
+    # Single values are not subject to 'not in' filters
+    assert notin({"A": "x"}) is None
+
+
+def test_map_data_plan(monkeypatch):
+    "Test that the compiled mapping plan is reused for exports with the same table layout."
+    monkeypatch.setattr(ce, "_plans", {})
+    monkeypatch.setattr(ce, "_apply_hard_fixes", lambda data: data)
+    mt = {k: v for k, v in mapping_table.items() if not v["internal_mapping"]}
+    several_bases_input = read_json_file(filepath("dreq_raw_export.json"))
+    consolidated = map_data(several_bases_input, mt, "v1.2")
+    assert len(ce._plans) == 1
+    assert map_data(read_json_file(filepath("dreq_raw_export.json")), mt, "v1.2") == consolidated
+    assert len(ce._plans) == 1
+    filtered = ce.get_filtered_records(several_bases_input, mt)
+    assert not filtered - set(
+        rid
+        for base in several_bases_input.values()
+        for table in base.values()
+        for rid in table["records"]
+    )
+    report = map_data(
+        several_bases_input, mt, "v1.2", report_details=True, return_report=True
+    )[1]
+    assert filtered == {
+        d["record"] for d in report["details"] if d["category"] == "filtered_records"
+    }
+
+
+def test_map_data_concurrent(monkeypatch):
+    "Test that concurrent consolidations give the same results as sequential ones."
+    monkeypatch.setattr(ce, "_apply_hard_fixes", lambda data: data)
+
+    def table_mapping(base, table, internal_filters):
+        return {
+            "source_base": base,
+            "source_table": [table],
+            "internal_mapping": {},
+            "internal_filters": internal_filters,
+            "drop_keys": [],
+            "internal_consistency": {},
+            "field_dtypes": {},
+        }
+
+    # Two mappings filtering different records, which are referenced from another base
+    mappings = [
+        {
+            "T": table_mapping(
+                "B1", "T", {"Status": {"aliases": [], "operator": "in", "values": [status]}}
+            ),
+            "U": table_mapping("B2", "U", {}),
+        }
+        for status in ["odd", "even"]
+    ]
+    data = {
+        "B1": {
+            "T": {
+                "records": {
+                    f"rec{i}": {"Status": ["even", "odd"][i % 2]} for i in range(2000)
+                }
+            }
+        },
+        "B2": {"U": {"records": {"recU": {"T": [f"rec{i}" for i in range(2000)]}}}},
+        "B3": {},
+    }
+    sequential = [map_data(copy.deepcopy(data), mt, "v1.2") for mt in mappings]
+    assert sequential[0] != sequential[1]
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        concurrent = list(
+            pool.map(lambda mt: map_data(copy.deepcopy(data), mt, "v1.2"), mappings * 4)
+        )
+    assert concurrent == sequential * 4
+
+
+def test_map_data_workers(monkeypatch):
+    "Test that consolidating in a process pool gives the same results as in this process."
+    monkeypatch.setattr(ce, "_apply_hard_fixes", lambda data: data)
+    mt = {k: v for k, v in mapping_table.items() if not v["internal_mapping"]}
+    sequential, report = map_data(
+        read_json_file(filepath("dreq_raw_export.json")), mt, "v1.2", return_report=True
+    )
+    several_bases_input = read_json_file(filepath("dreq_raw_export.json"))
+    parallel, parallel_report = map_data(
+        several_bases_input,
+        mt,
+        "v1.2",
+        release_source=True,
+        consolidation_workers=2,
+        return_report=True,
+    )
+    assert parallel == sequential
+    assert list(parallel["Data Request"]) == list(sequential["Data Request"])
+    assert parallel_report == report
+    assert not any(several_bases_input.values())
+
+
+def test_map_data_report(monkeypatch):
+    "Test the statistics gathered during the consolidation."
+    monkeypatch.setattr(ce, "_apply_hard_fixes", lambda data: data)
+    mt = {
+        "T": {
+            "source_base": "B1",
+            "source_table": ["T"],
+            "internal_mapping": {},
+            "internal_filters": {
+                "Status": {"aliases": [], "operator": "in", "values": ["even"]}
+            },
+            "drop_keys": [],
+            "internal_consistency": {"Rank": "Priority"},
+            "field_dtypes": {"Priority": "int"},
+        },
+        "U": {
+            "source_base": "B2",
+            "source_table": ["U"],
+            "internal_mapping": {},
+            "drop_keys": [],
+            "internal_consistency": {},
+            "field_dtypes": {},
+        },
+    }
+    data = {
+        "B1": {
+            "T": {
+                "records": {
+                    f"rec{i}": {"Status": ["even", "odd"][i % 2], "Rank": str(i)}
+                    for i in range(10)
+                }
+            }
+        },
+        "B2": {
+            "U": {
+                "records": {
+                    "recU1": {"T": ["rec0", "rec1", "rec3"]},
+                    "recU2": {"T": "rec5"},
+                }
+            }
+        },
+        "B3": {},
+    }
+    consolidated, report = map_data(copy.deepcopy(data), mt, "v1.2", return_report=True)
+    assert consolidated["Data Request"]["T"]["records"]["rec2"]["Priority"] == 2
+    assert consolidated == map_data(copy.deepcopy(data), mt, "v1.2")
+    assert report == {
+        "conversions": {"T": {"Priority": 5}},
+        "emptied_references": {"U": {"T": 1}},
+        "filtered_records": {"T": 5},
+        "filtered_references": {"U": {"T": 3}},
+    }
+
+    # Per-record details only when requested
+    report = map_data(
+        copy.deepcopy(data), mt, "v1.2", report_details=True, return_report=True
+    )[1]
+    details = report.pop("details")
+    assert report == {
+        "conversions": {"T": {"Priority": 5}},
+        "emptied_references": {"U": {"T": 1}},
+        "filtered_records": {"T": 5},
+        "filtered_references": {"U": {"T": 3}},
+    }
+    assert {
+        "category": "filtered_references",
+        "table": "U",
+        "attribute": "T",
+        "record": "recU1",
+        "count": 2,
+    } in details
+    assert sorted(
+        d["record"] for d in details if d["category"] == "filtered_records"
+    ) == ["rec1", "rec3", "rec5", "rec7", "rec9"]
+    assert ce.get_filtered_records(data, mt) == {"rec1", "rec3", "rec5", "rec7", "rec9"}
+
+
+def test_map_data_internal_mapping(tmp_path):
+    "Test consolidating a small three-base export with the internal mappings of the mapping table."
+    opp, var, phy = (
+        "Data Request Opportunities (Public)",
+        "Data Request Variables (Public)",
+        "Data Request Physical Parameters (Public)",
+    )
+    linked = "Unique list of variables attached to Opportunity (linked)"
+    data = {
+        opp: {
+            "Opportunity": {
+                "records": {
+                    "recO1": {
+                        "Title of Opportunity": "Opp one",
+                        "Status": "Accepted",
+                        linked: ["recOV1", "recOV2", "recOV1"],
+                    },
+                    "recO2": {"Title of Opportunity": "Opp two", "Status": "Rejected"},
+                }
+            },
+            # Copies of the Variables records, mapped by compound name
+            "Variables": {
+                "records": {
+                    "recOV1": {"Compound Name": "Amon.tas"},
+                    "recOV2": {"Compound Name": "Amon.ua"},
+                }
+            },
+            "Variable Group": {
+                "records": {
+                    "recG1": {
+                        "Name": "VG1",
+                        "Final Opportunity selection": ["recO1"],
+                        "Opportunity Status": ["Accepted"],
+                        "Experiment Groups (from Final Opportunity selection)": '"hist, scen", EG2',
+                        "Variables": ["recOV1", "recOV2"],
+                    },
+                    "recG2": {
+                        "Name": "VG2",
+                        "Final Opportunity selection": [],
+                        "Opportunity Status": ["Accepted"],
+                    },
+                }
+            },
+            "Experiment Group": {
+                "records": {
+                    "recE1": {
+                        "Name": "hist, scen",
+                        "Status": ["New"],
+                        "Status (from Opportunities)": ["Accepted"],
+                    },
+                    "recE2": {
+                        "Name": "EG2",
+                        "Status": ["New"],
+                        "Status (from Opportunities)": ["Accepted"],
+                    },
+                }
+            },
+            "Experiments": {
+                "records": {
+                    "recX1": {"Experiment": "historical", linked + " (from Opportunity)": "Amon.pr"},
+                    "recX2": {" Experiment": "piControl"},
+                }
+            },
+        },
+        var: {
+            "Variable": {
+                "records": {
+                    "recV1": {
+                        "Compound Name": "Amon.tas",
+                        "CMIP7 Variable Groups": "VG1",
+                        "Opportunity Status (from CMIP7 Variable Groups)": ["Accepted"],
+                        "Physical Parameter": ["recVP1"],
+                        "CF Standard Name (from MIP Variables)": "air_temperature",
+                        "List of Experiments": "historical, piControl, historical",
+                        "Experiment Groups (from Opportunity)": '"hist, scen"',
+                        "Opportunity (from CMIP7 Variable Groups)": "Opp one",
+                    },
+                    "recV2": {
+                        "Compound Name": "Amon.pr",
+                        "CMIP7 Variable Groups": "VG1, VG2",
+                        "Opportunity Status (from CMIP7 Variable Groups)": ["Accepted"],
+                        "Physical Parameter": ["recVP2"],
+                        "CF Standard Name (from MIP Variables)": "precipitation_flux",
+                    },
+                    "recV3": {
+                        "Compound Name": "Amon.ua",
+                        "CMIP7 Variable Groups": "VG2",
+                        "Opportunity Status (from CMIP7 Variable Groups)": ["Rejected"],
+                    },
+                }
+            },
+            # Copies of the Physical Parameters records - mapped by UID, else by name
+            "Physical Parameter": {
+                "records": {
+                    "recVP1": {"UID": "uid-tas", "Name": "tas"},
+                    "recVP2": {"UID": "outdated-uid", "Name": "pr"},
+                }
+            },
+        },
+        phy: {
+            "Physical Parameters": {
+                "records": {
+                    "recP1": {"Name": "tas", "UID": "uid-tas", "Status": "New", "Variables": "Amon.tas"},
+                    "recP2": {
+                        "Name": "pr",
+                        "UID": "uid-pr",
+                        "Status": "Existing physical parameter",
+                        "Variables": "Amon.pr, Amon.ua",
+                    },
+                }
+            },
+            "CF Standard Names": {
+                "records": {
+                    "recC1": {
+                        "name": "air_temperature",
+                        "Physical parameters": ["recP1"],
+                        "Status (from Physical parameters)": ["New"],
+                    },
+                    "recC2": {
+                        "name": "precipitation_flux",
+                        "Physical parameters": ["recP2"],
+                        "Status (from Physical parameters)": ["Rejected"],
+                    },
+                }
+            },
+        },
+    }
+    expected = {
+        "CF Standard Names": {
+            "recC1": {"Name": "air_temperature", "Physical parameters": ["recP1"]},
+        },
+        "Experiment Group": {
+            "recE1": {"Name": "hist, scen"},
+            "recE2": {"Name": "EG2"},
+        },
+        "Experiments": {
+            "recX1": {"Experiment": "historical", "Variables": ["recV2"]},
+            "recX2": {" Experiment": "piControl"},
+        },
+        "Opportunity": {
+            # Duplicate references are dropped, as are references to filtered records
+            "recO1": {
+                "Title of Opportunity": "Opp one",
+                "Unique list of variables attached to Opportunity": ["recV1"],
+            },
+        },
+        "Physical Parameters": {
+            "recP1": {"Name": "tas", "UID": "uid-tas", "Status": "New", "Variables": ["recV1"]},
+            "recP2": {
+                "Name": "pr",
+                "UID": "uid-pr",
+                "Status": "Existing physical parameter",
+                "Variables": ["recV2"],
+            },
+        },
+        "Variable Group": {
+            # Commas within quotes do not separate names
+            "recG1": {
+                "Name": "VG1",
+                "Opportunity": ["recO1"],
+                "Experiment Groups (from Opportunity)": ["recE1", "recE2"],
+                "Variables": ["recV1"],
+            },
+        },
+        "Variables": {
+            "recV1": {
+                "CMIP6 Compound Name": "Amon.tas",
+                "CMIP7 Variable Groups": ["recG1"],
+                "Physical Parameter": ["recP1"],
+                "CF Standard Name (from Physical Parameter)": ["recC1"],
+                "List of Experiments": ["recX1", "recX2"],
+                "Experiment Groups (from Opportunity)": ["recE1"],
+                "Opportunity (from CMIP7 Variable Groups)": ["recO1"],
+            },
+            "recV2": {
+                "CMIP6 Compound Name": "Amon.pr",
+                "CMIP7 Variable Groups": ["recG1"],
+                "Physical Parameter": ["recP2"],
+                "CF Standard Name (from Physical Parameter)": [],
+            },
+        },
+    }
+    consolidated, report = map_data(
+        copy.deepcopy(data), mapping_table, "v1.3", return_report=True
+    )
+    assert {
+        table: content["records"]
+        for table, content in consolidated["Data Request"].items()
+        if table != "version"
+    } == expected
+    assert report["filtered_records"] == {
+        "CF Standard Names": 1,
+        "Opportunity": 1,
+        "Variable Group": 1,
+        "Variables": 1,
+    }
+    assert report["unmapped_attributes"] == {
+        "Variables": {"CF Standard Name (from MIP Variables)": 1}
+    }
+
+    # Same results when streaming the export and mapping the tables in a process pool
+    write_json_output_file_content(str(tmp_path / "export.json"), data)
+    with open(tmp_path / "export.json") as f:
+        streamed = read_export(f, mapping_table)
+    assert streamed == data
+    assert (
+        map_data(
+            streamed,
+            mapping_table,
+            "v1.3",
+            release_source=True,
+            consolidation_workers=2,
+            return_report=True,
+        )
+        == (consolidated, report)
+    )
@@ -867,6 +867,32 @@ class TestDataRequest(unittest.TestCase):
         elt3 = obj.find_element("max_priority_level", "High")
         self.assertEqual(elt3.DR_type, "max_priority_levels")
 
+    def test_resolve_many(self):
+        obj = DataRequest(input_database=self.input_database, VS=self.vs)
+        found, not_found = obj.resolve_many("experiments", ["historical", "historic", "link::historical"])
+        self.assertEqual(sorted(found), ["historical", "link::historical"])
+        self.assertIs(found["historical"], obj.find_element("experiments", "historical"))
+        self.assertIs(found["link::historical"], found["historical"])
+        self.assertDictEqual(not_found, {"historic": ["historical", ]})
+        with self.assertRaisesRegex(ValueError, "did you mean: historical"):
+            obj.find_experiments(operation="all", experiments="historic")
+
+    def test_find_variables_per_facets(self):
+        obj = DataRequest(input_database=self.input_database, VS=self.vs)
+        variables = obj.find_variables_per_facets("ocean.tos.*", frequency="mon")
+        self.assertEqual(variables, [obj.find_element("variables", "ocean.tos.tavg-u-hxy-sea.mon.glb"), ])
+        self.assertEqual(obj.get_variables_facet_counts("frequency", "ocean.tos.*"), {"3hr": 1, "day": 1, "mon": 1})
+
+    def test_search(self):
+        obj = DataRequest(input_database=self.input_database, VS=self.vs)
+        variables = obj.search("sea ice thickness", element_types="variables")
+        self.assertEqual([elt.id for elt in variables[:2]], ["seaIce.sithick.tavg-u-hxy-si.day.glb",
+                                                         "seaIce.sithick.tavg-u-hxy-si.mon.glb"])
+        self.assertIs(variables[0], obj.find_element("variables", "seaIce.sithick.tavg-u-hxy-si.day.glb"))
+        elts = obj.search("sea ice thickness", limit=3)
+        self.assertEqual([elt.DR_type for elt in elts], ["physical_parameters", "cf_standard_names", "variables"])
+        self.assertEqual(obj.search("unknownword"), list())
+
 
 class TestDataRequestFilter(unittest.TestCase):
     def setUp(self):
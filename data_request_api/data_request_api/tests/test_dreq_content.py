@@ -1,11 +1,19 @@
+import copy
+import email.utils
+import hashlib
+import http.server
+import json
 import os
 import pathlib
 import tempfile
+import threading
+import time
 
 import data_request_api.utilities.config as dreqcfg
 import pytest
 from data_request_api.content import dreq_content as dc
 from data_request_api.utilities.logger import change_log_file, change_log_level
+from data_request_api.utilities.tools import file_lock
 
 # Set up temporary config file with default config
 temp_config_file = tempfile.NamedTemporaryFile(delete=False, suffix=".yaml")
@@ -45,6 +53,42 @@ def test_get_versions_list_branches():
     assert "main" not in branches
 
 
+def test_get_versions_index(tmp_path, monkeypatch):
+    "Test that the version index is shared across sessions and refreshed after its TTL."
+    dc._dreq_res = str(tmp_path)
+    calls = []
+
+    def mock_send_api_request(api_url, page_url, target="tags"):
+        calls.append(target)
+        return ["v1.0", "v1.1"] if target == "tags" else ["feature"]
+
+    monkeypatch.setattr(dc, "_send_api_request", mock_send_api_request)
+    monkeypatch.setattr(dc, "versions", {"tags": [], "branches": []})
+    monkeypatch.setattr(dc, "_versions_retrieved_last", {"tags": 0, "branches": 0})
+
+    assert dc.get_versions() == ["v1.0", "v1.1", "dev"]
+    assert dc.get_versions(target="branches") == ["feature"]
+    assert calls == ["tags", "branches"]
+    assert (tmp_path / dc._versions_index).is_file()
+
+    # A new session reads the index instead of querying GitHub
+    monkeypatch.setattr(dc, "versions", {"tags": [], "branches": []})
+    monkeypatch.setattr(dc, "_versions_retrieved_last", {"tags": 0, "branches": 0})
+    assert dc.get_versions() == ["v1.0", "v1.1", "dev"]
+    assert calls == ["tags", "branches"]
+
+    # An expired index is refreshed
+    assert dc.get_versions(versions_ttl=0) == ["v1.0", "v1.1", "dev"]
+    assert calls == ["tags", "branches", "tags"]
+
+    # The index is used to tell cached tags and branches apart in offline mode
+    for v in ["v1.0", "feature"]:
+        (tmp_path / v).mkdir()
+        (tmp_path / v / dc._json_release).touch()
+    assert dc.get_versions(offline=True) == ["v1.0"]
+    assert dc.get_versions(target="branches", offline=True) == ["feature"]
+
+
 def test_get_latest_version(monkeypatch):
     "Test the _get_latest_version function."
     monkeypatch.setattr(
@@ -108,6 +152,182 @@ def test_retrieve_with_invalid_export(tmp_path):
         dc.retrieve("v1.2.1", export="invalid")
 
 
+class _ContentHandler(http.server.BaseHTTPRequestHandler):
+    """
+    HTTP request handler serving the files of the server's root directory, with
+    ETag / Last-Modified validators and support for conditional requests.
+    """
+
+    def do_GET(self):
+        path = os.path.join(self.server.root, self.path.lstrip("/"))
+        if not os.path.isfile(path):
+            self._respond(404)
+            return
+        with open(path, "rb") as f:
+            content = f.read()
+        etag = f'"{hashlib.sha1(content).hexdigest()}"'
+        last_modified = email.utils.formatdate(os.stat(path).st_mtime, usegmt=True)
+        if self.headers.get("If-None-Match") == etag:
+            self._respond(304)
+            return
+        self._respond(200, content, {"ETag": etag, "Last-Modified": last_modified})
+
+    def _respond(self, status, content=b"", headers={}):
+        self.server.requests.append((self.path, status, dict(self.headers)))
+        self.send_response(status)
+        for key, value in headers.items():
+            self.send_header(key, value)
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def content_server(tmp_path, monkeypatch):
+    "Serve a local stand-in of the content repository over HTTP."
+    root = tmp_path / "server"
+    root.mkdir()
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), _ContentHandler)
+    server.root = str(root)
+    server.requests = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    url = f"http://127.0.0.1:{server.server_port}"
+    monkeypatch.setattr(dc, "REPO_RAW_URL", url + "/{target}/{version}/{_json_export}")
+    monkeypatch.setattr(dc, "REPO_RAW_URL_DEV", url + "/heads/{version}/{_json_export}")
+    try:
+        yield server
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def _serve(server, target, version, json_export, content):
+    "Add a content export file to the local content repository stand-in."
+    path = pathlib.Path(server.root) / target / version
+    path.mkdir(parents=True, exist_ok=True)
+    (path / json_export).write_text(content)
+
+
+def test_retrieve_concurrent(tmp_path, content_server, monkeypatch):
+    "Test the concurrent retrieval of several versions and export types."
+    dc._dreq_res = str(tmp_path / "cache")
+    tags = ["v1.0", "v1.1", "v1.2", "dev"]
+    monkeypatch.setattr(dc, "get_versions", lambda target="tags", **kwargs: tags)
+    for v in ["v1.0", "v1.1", "v1.2"]:
+        for json_export in [dc._json_release, dc._json_raw]:
+            _serve(content_server, "tags", v, json_export, f'{{"{v}": "{json_export}"}}')
+
+    json_paths = dc.retrieve("all", export="release", max_workers=3)
+    assert set(json_paths) == {"v1.0", "v1.1", "v1.2"}
+    # The connection pool is enlarged for more concurrent downloads, connection errors
+    #  are not retried
+    adapter = dc._get_session(pool_size=8).get_adapter("https://")
+    assert adapter._pool_maxsize == 8 and dc._session_pool_size >= 8
+    assert adapter.max_retries.connect == 0
+    assert dc._get_session(pool_size=2).get_adapter("https://") is adapter
+    for v, json_path in json_paths.items():
+        with open(json_path) as f:
+            assert f.read() == f'{{"{v}": "{dc._json_release}"}}'
+
+    json_paths = dc.prefetch("all", exports=["release", "raw"])
+    assert set(json_paths) == {"release", "raw"}
+    for export, json_export in [("release", dc._json_release), ("raw", dc._json_raw)]:
+        assert set(json_paths[export]) == {"v1.0", "v1.1", "v1.2"}
+        for v, json_path in json_paths[export].items():
+            assert json_path == os.path.join(dc._dreq_res, v, json_export)
+            assert os.path.isfile(json_path)
+
+    # No leftovers of partial downloads
+    for v in ["v1.0", "v1.1", "v1.2"]:
+        for f in os.listdir(os.path.join(dc._dreq_res, v)):
+            assert not f.endswith(".part") and not f.endswith(".tmp")
+
+
+def test_retrieve_single_flight(tmp_path, content_server, monkeypatch):
+    "Test that concurrent retrievals of the same version download it only once."
+    dc._dreq_res = str(tmp_path / "cache")
+    monkeypatch.setattr(dc, "get_versions", lambda target="tags", **kwargs: ["v1.0", "dev"])
+    _serve(content_server, "tags", "v1.0", dc._json_release, '{"v1.0": "release"}')
+
+    barrier = threading.Barrier(4)
+
+    def retrieve():
+        barrier.wait()
+        return dc.retrieve("v1.0", export="release")
+
+    threads = [threading.Thread(target=retrieve) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert [r[1] for r in content_server.requests] == [200]
+    with open(os.path.join(dc._dreq_res, "v1.0", dc._json_release)) as f:
+        assert f.read() == '{"v1.0": "release"}'
+
+
+def test_retrieve_failures_reported_together(tmp_path, content_server, monkeypatch):
+    "Test that failed retrievals of several versions are reported in a single warning."
+    dc._dreq_res = str(tmp_path / "cache")
+    tags = ["v1.0", "v1.1", "v1.2", "dev"]
+    monkeypatch.setattr(dc, "get_versions", lambda target="tags", **kwargs: tags)
+    _serve(content_server, "tags", "v1.1", dc._json_release, "{}")
+
+    with pytest.warns(UserWarning) as record:
+        json_paths = dc.retrieve("all", export="release")
+    assert list(json_paths) == ["v1.1"]
+    messages = [str(w.message) for w in record if "Could not retrieve" in str(w.message)]
+    assert len(messages) == 1
+    for v in ["v1.0", "v1.2", "dev"]:
+        assert f"'{v}'" in messages[0]
+    assert not os.path.exists(os.path.join(dc._dreq_res, "v1.0", dc._json_release))
+
+
+def test_retrieve_revalidation(tmp_path, content_server, caplog, monkeypatch):
+    "Test the revalidation of cached 'dev' content with conditional requests."
+    dc._dreq_res = str(tmp_path / "cache")
+    monkeypatch.setattr(dc, "get_versions", lambda target="tags", **kwargs: ["dev"])
+    _serve(content_server, "heads", "main", dc._json_release, '{"content": 1}')
+
+    # Initial download stores the validators next to the cached file
+    json_path = dc.retrieve("dev", export="release")["dev"]
+    assert os.path.isfile(json_path + dc._http_metadata_suffix)
+    assert content_server.requests[-1][1] == 200
+
+    # Unchanged content: the server responds with "304 Not Modified"
+    caplog.clear()
+    json_path = dc.retrieve("dev", export="release")["dev"]
+    path, status, headers = content_server.requests[-1]
+    assert status == 304
+    assert "If-None-Match" in headers
+    assert "If-Modified-Since" in headers
+    assert "Updated version 'dev'." not in caplog.text
+
+    # Changed content on the server is downloaded
+    _serve(content_server, "heads", "main", dc._json_release, '{"content": 2}')
+    json_path = dc.retrieve("dev", export="release")["dev"]
+    assert content_server.requests[-1][1] == 200
+    assert "Updated version 'dev'." in caplog.text
+    with open(json_path) as f:
+        assert f.read() == '{"content": 2}'
+
+    # Altering the cached file invalidates the stored validators
+    caplog.clear()
+    with open(json_path, "w") as f:
+        f.write("{}")
+    json_path = dc.retrieve("dev", export="release")["dev"]
+    path, status, headers = content_server.requests[-1]
+    assert status == 200
+    assert "If-None-Match" not in headers
+    assert "Updated version 'dev'." in caplog.text
+    with open(json_path) as f:
+        assert f.read() == '{"content": 2}'
+    assert not os.path.exists(json_path + ".tmp")
+
+
 def test_api_and_html_request(recwarn):
     "Test the _send_api_request and _send_html_request functions."
     tags1 = set(dc._send_api_request(dc.REPO_API_URL, "", "tags"))
@@ -180,6 +400,658 @@ def test_load_consolidate(tmp_path, monkeypatch):
     assert os.path.isfile(tmp_path / "dev" / dc._json_release)
 
 
+def test_load_consolidate_fingerprint(tmp_path, monkeypatch):
+    "Test that the consolidated content is only reused if its inputs did not change."
+    dc._dreq_res = str(tmp_path)
+    (tmp_path / "v1.2").mkdir()
+    source = tmp_path / "v1.2" / dc._json_release
+    source.write_text('{"Data Request": {"a": 1}}')
+    calls = []
+
+    def mock_map_data(data, mapping_table, version, **kwargs):
+        calls.append(version)
+        return data
+
+    monkeypatch.setattr(dc.ce, "map_data", mock_map_data)
+    kwargs = dict(consolidate=True, export="release", offline=True)
+
+    assert dc.load("v1.2", **kwargs) == {"Data Request": {"a": 1}}
+    assert calls == ["v1.2"]
+    assert (tmp_path / "v1.2" / dc._manifest).is_file()
+
+    # Unchanged inputs - the cached consolidated content is used
+    assert dc.load("v1.2", **kwargs) == {"Data Request": {"a": 1}}
+    assert calls == ["v1.2"]
+
+    # Changed source export
+    source.write_text('{"Data Request": {"a": 2}}')
+    assert dc.load("v1.2", **kwargs) == {"Data Request": {"a": 2}}
+    assert calls == ["v1.2"] * 2
+
+    # Changed API version
+    monkeypatch.setattr(dc, "api_version", "0.0.0")
+    assert dc.load("v1.2", **kwargs) == {"Data Request": {"a": 2}}
+    assert calls == ["v1.2"] * 3
+
+    # Changed mapping table
+    monkeypatch.setattr(dc, "mapping_table", {})
+    assert dc.load("v1.2", **kwargs) == {"Data Request": {"a": 2}}
+    assert calls == ["v1.2"] * 4
+    assert dc.load("v1.2", **kwargs) == {"Data Request": {"a": 2}}
+    assert calls == ["v1.2"] * 4
+
+
+@pytest.mark.parametrize("cache_format", ["json", "pickle", "pickle.gz"])
+def test_load_consolidate_cache_format(tmp_path, monkeypatch, cache_format):
+    "Test caching the consolidated content in the different formats."
+    dc._dreq_res = str(tmp_path)
+    (tmp_path / "v1.2").mkdir()
+    (tmp_path / "v1.2" / dc._json_release).write_text('{"Data Request": {"a": [1]}}')
+    calls = []
+
+    def mock_map_data(data, mapping_table, version, **kwargs):
+        calls.append(version)
+        return data
+
+    monkeypatch.setattr(dc.ce, "map_data", mock_map_data)
+    kwargs = dict(consolidate=True, export="release", offline=True)
+    cache_path = tmp_path / "v1.2" / dc._get_cache_filenames(dc._json_release_c)[
+        cache_format
+    ]
+
+    assert dc.load("v1.2", cache_format=cache_format, **kwargs) == {
+        "Data Request": {"a": [1]}
+    }
+    assert cache_path.is_file()
+    assert dc.load("v1.2", cache_format=cache_format, **kwargs) == {
+        "Data Request": {"a": [1]}
+    }
+    assert calls == ["v1.2"]
+
+    # An unreadable cache file is regenerated
+    dc._load_memo.clear()
+    cache_path.write_bytes(b"\x00corrupt")
+    assert dc.load("v1.2", cache_format=cache_format, **kwargs) == {
+        "Data Request": {"a": [1]}
+    }
+    assert calls == ["v1.2"] * 2
+
+    # The cache files of all formats are removed on cleanup
+    (tmp_path / "v1.2" / dc._json_release).unlink()
+    dc.cleanup(export="release")
+    assert not cache_path.exists()
+
+
+def test_load_tables(tmp_path, monkeypatch):
+    "Test loading only some tables from the sharded cache of the consolidated content."
+    dc._dreq_res = str(tmp_path)
+    (tmp_path / "v1.2").mkdir()
+    (tmp_path / "v1.2" / dc._json_release).write_text(
+        '{"Data Request": {"version": "v1.2", "T1": {"r": 1}, "T2": {"r": 2}}}'
+    )
+    calls = []
+
+    def mock_map_data(data, mapping_table, version, **kwargs):
+        calls.append(version)
+        return data
+
+    monkeypatch.setattr(dc.ce, "map_data", mock_map_data)
+    kwargs = dict(
+        consolidate=True, export="release", offline=True, memo_size=0, cache_format="pickle"
+    )
+
+    # All tables are cached, one shard per table
+    assert dc.load("v1.2", tables=["T1"], **kwargs) == {
+        "Data Request": {"version": "v1.2", "T1": {"r": 1}}
+    }
+    cache_filename = dc._get_cache_filenames(dc._json_release_c)["pickle"]
+    shards = dc._get_shard_filenames(str(tmp_path / "v1.2"), cache_filename, "pickle")
+    assert len(shards) == 2
+
+    # Only the shards of the requested tables are read
+    (tmp_path / "v1.2" / shards[1]).write_bytes(b"\x00corrupt")
+    assert dc.load("v1.2", tables="T1", **kwargs) == {
+        "Data Request": {"version": "v1.2", "T1": {"r": 1}}
+    }
+    assert calls == ["v1.2"]
+    assert dc.load("v1.2", **kwargs) == {
+        "Data Request": {"version": "v1.2", "T1": {"r": 1}, "T2": {"r": 2}}
+    }
+    assert calls == ["v1.2"] * 2
+
+    # Memoised content of all tables serves requests for some of them
+    loads = []
+    original_load = dc._load
+
+    def mock_load(version, version_key, json_path, **kwargs):
+        loads.append(kwargs["tables"])
+        return original_load(version, version_key, json_path, **kwargs)
+
+    monkeypatch.setattr(dc, "_load", mock_load)
+    monkeypatch.setattr(dc, "_load_memo", dc.OrderedDict())
+    dc.load("v1.2", **dict(kwargs, memo_size=1))
+    assert dc.load("v1.2", tables=["T2"], **dict(kwargs, memo_size=1)) == {
+        "Data Request": {"version": "v1.2", "T2": {"r": 2}}
+    }
+    assert loads == [None]
+
+    with pytest.raises(ValueError, match="Unknown table"):
+        dc.load("v1.2", tables=["T3"], **kwargs)
+    # Optional tables are loaded if the version has them
+    assert dc.load("v1.2", tables=["T1"], optional_tables=["T2", "T3"], **kwargs) == {
+        "Data Request": {"version": "v1.2", "T1": {"r": 1}, "T2": {"r": 2}}
+    }
+
+    # The export is not opened if the content is served from the cache
+    open_file = dc.open_file
+
+    def mock_open_file(filename, *args, **kwargs):
+        assert os.path.basename(filename) != dc._json_release
+        return open_file(filename, *args, **kwargs)
+
+    monkeypatch.setattr(dc, "open_file", mock_open_file)
+    assert dc.load("v1.2", tables="T2", **kwargs) == {
+        "Data Request": {"version": "v1.2", "T2": {"r": 2}}
+    }
+    monkeypatch.setattr(dc, "open_file", open_file)
+
+    # Shards are removed on cleanup
+    (tmp_path / "v1.2" / dc._json_release).unlink()
+    dc.cleanup(export="release")
+    assert not dc._get_shard_filenames(str(tmp_path / "v1.2"), cache_filename, "pickle")
+
+
+def test_load_consolidate_incremental(tmp_path, monkeypatch):
+    "Test that only the tables whose source tables changed are consolidated again."
+    dc._dreq_res = str(tmp_path)
+    (tmp_path / "v1.3").mkdir()
+    source = tmp_path / "v1.3" / dc._json_raw
+
+    def table_mapping(base, table, internal_filters=None):
+        mapinfo = {
+            "source_base": base,
+            "source_table": [table],
+            "internal_mapping": {},
+            "drop_keys": [],
+            "internal_consistency": {},
+            "field_dtypes": {},
+        }
+        if internal_filters:
+            mapinfo["internal_filters"] = internal_filters
+        return mapinfo
+
+    status_filter = {"Status": {"aliases": [], "operator": "in", "values": ["ok"]}}
+    monkeypatch.setattr(
+        dc,
+        "mapping_table",
+        {
+            "T": table_mapping("B1", "T", status_filter),
+            "V": table_mapping("B1", "V"),
+            "U": table_mapping("B2", "U"),
+        },
+    )
+    export = {
+        "B1": {
+            "T": {"records": {"rec1": {"Status": "ok"}, "rec2": {"Status": "ok"}}},
+            "V": {"records": {"rec3": {"name": "a"}}},
+        },
+        "B2": {"U": {"records": {"rec4": {"T": ["rec1", "rec2"]}}}},
+        "B3": {},
+    }
+    reused = []
+    original_map_data = dc.ce.map_data
+
+    def mock_map_data(data, mapping_table, version, reuse=None, **kwargs):
+        consolidated = original_map_data(data, mapping_table, version, reuse=reuse, **kwargs)
+        reused.append(reuse["reused"])
+        return consolidated
+
+    monkeypatch.setattr(dc.ce, "map_data", mock_map_data)
+    kwargs = dict(
+        consolidate=True, export="raw", offline=True, memo_size=0, cache_format="pickle"
+    )
+
+    source.write_text(json.dumps(export))
+    dc.load("v1.3", **kwargs)
+    assert reused == [[]]
+    manifest = dc._read_manifest(str(tmp_path / "v1.3"))
+    cache_filename = dc._get_cache_filenames(dc._json_raw_c)["pickle"]
+    assert sorted(manifest[cache_filename]["tables"]) == ["T", "U", "V"]
+    assert sorted(manifest[cache_filename]["source_tables"]["B1"]) == ["T", "V"]
+
+    # Only a table without dependent tables changed
+    export["B1"]["V"]["records"]["rec3"]["name"] = "b"
+    source.write_text(json.dumps(export))
+    consolidated = dc.load("v1.3", **kwargs)
+    assert reused[-1] == ["T", "U"]
+    assert consolidated["Data Request"]["V"]["records"]["rec3"]["name"] == "b"
+    assert consolidated["Data Request"]["U"]["records"]["rec4"]["T"] == ["rec1", "rec2"]
+
+    # Unchanged source export - the cached consolidated content is used
+    dc.load("v1.3", **kwargs)
+    assert len(reused) == 2
+
+    # Changed filtered records - the tables referring to them are consolidated again
+    export["B1"]["T"]["records"]["rec2"]["Status"] = "obsolete"
+    source.write_text(json.dumps(export))
+    consolidated = dc.load("v1.3", **kwargs)
+    assert reused[-1] == []
+    assert consolidated["Data Request"]["U"]["records"]["rec4"]["T"] == ["rec1"]
+    assert consolidated == original_map_data(export, dc.mapping_table, "v1.3")
+
+
+def test_load_consolidate_single_flight(tmp_path, monkeypatch):
+    "Test that concurrent loads of the same version consolidate it only once."
+    dc._dreq_res = str(tmp_path)
+    (tmp_path / "v1.2").mkdir()
+    (tmp_path / "v1.2" / dc._json_release).write_text('{"Data Request": {"a": 1}}')
+    calls = []
+
+    def mock_map_data(data, mapping_table, version, **kwargs):
+        calls.append(version)
+        time.sleep(0.2)
+        return data
+
+    monkeypatch.setattr(dc.ce, "map_data", mock_map_data)
+    results = []
+    barrier = threading.Barrier(4)
+
+    def load():
+        barrier.wait()
+        results.append(
+            dc.load("v1.2", consolidate=True, export="release", offline=True, memo_size=0)
+        )
+
+    threads = [threading.Thread(target=load) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert calls == ["v1.2"]
+    assert results == [{"Data Request": {"a": 1}}] * 4
+
+
+def test_load_memo(tmp_path, monkeypatch):
+    "Test the in-process memo of loaded content."
+    dc._dreq_res = str(tmp_path)
+    for v in ["v1.2", "v1.3"]:
+        (tmp_path / v).mkdir()
+        (tmp_path / v / dc._json_release).write_text(f'{{"Data Request": {{"v": ["{v}"]}}}}')
+    calls = []
+    original_load = dc._load
+
+    def mock_load(version, version_key, json_path, **kwargs):
+        calls.append(version_key)
+        return original_load(version, version_key, json_path, **kwargs)
+
+    monkeypatch.setattr(dc, "_load", mock_load)
+    monkeypatch.setattr(dc, "_load_memo", dc.OrderedDict())
+    kwargs = dict(consolidate=False, export="release", offline=True, memo_size=1)
+
+    content = dc.load("v1.2", **kwargs)
+    assert content == {"Data Request": {"v": ["v1.2"]}}
+    # Modifying the returned content does not alter the memoised content
+    content["Data Request"]["v"].append("modified")
+    assert dc.load("v1.2", **kwargs) == {"Data Request": {"v": ["v1.2"]}}
+    for base in dc.load("v1.2", **kwargs).values():
+        for table in dict(base).values():
+            table[0] = "modified"
+    dc.load("v1.2", **kwargs)["Data Request"].pop("v").clear()
+    content = dc.load("v1.2", **kwargs)
+    assert content == {"Data Request": {"v": ["v1.2"]}}
+    assert json.loads(json.dumps(content)) == content
+    assert type(copy.deepcopy(content)["Data Request"]["v"]) is list
+    assert calls == ["v1.2"]
+
+    # Only one version is kept in memory
+    dc.load("v1.3", **kwargs)
+    dc.load("v1.2", **kwargs)
+    assert calls == ["v1.2", "v1.3", "v1.2"]
+
+    # Updated content is loaded again
+    (tmp_path / "v1.2" / dc._json_release).write_text('{"Data Request": {"v": []}}')
+    assert dc.load("v1.2", **kwargs) == {"Data Request": {"v": []}}
+    assert calls == ["v1.2", "v1.3", "v1.2", "v1.2"]
+    assert len(dc._load_memo) == 1
+
+    # The memo can be disabled
+    dc.load("v1.2", **dict(kwargs, memo_size=0))
+    assert calls == ["v1.2", "v1.3", "v1.2", "v1.2", "v1.2"]
+
+
+def test_layered_cache(tmp_path, monkeypatch):
+    "Test a read-only site cache layered below the writable user cache."
+    site, user = tmp_path / "site", tmp_path / "user"
+    (site / "v1.0").mkdir(parents=True)
+    (site / "v1.0" / dc._json_release).write_text('{"Data Request": {"a": 1}}')
+    calls = []
+
+    def mock_map_data(data, mapping_table, version, **kwargs):
+        calls.append(version)
+        return data
+
+    monkeypatch.setattr(dc.ce, "map_data", mock_map_data)
+    kwargs = dict(
+        consolidate=True, export="release", offline=True, memo_size=0, cache_format="json"
+    )
+
+    # Populate the site cache
+    monkeypatch.setattr(dc, "_dreq_res", str(site))
+    dc.load("v1.0", **kwargs)
+    assert calls == ["v1.0"]
+
+    # Layer the user cache on top
+    monkeypatch.setattr(dc, "_dreq_res", str(user))
+    monkeypatch.setattr(dc, "_dreq_res_readonly", [str(site)])
+    assert dc.get_cached() == ["v1.0"]
+    assert dc.load("v1.0", **kwargs) == {"Data Request": {"a": 1}}
+    assert calls == ["v1.0"]
+    monkeypatch.setattr(dc, "get_versions", lambda target="tags", **kwargs: ["v1.0", "dev"])
+    assert dc.retrieve("v1.0") == {"v1.0": str(site / "v1.0" / dc._json_release)}
+    assert not user.exists()
+
+    # Derived files in the user cache are only built if outdated in the site cache
+    monkeypatch.setattr(dc, "mapping_table", {})
+    dc.load("v1.0", **kwargs)
+    assert calls == ["v1.0"] * 2
+    assert (user / "v1.0" / dc._get_cache_filenames(dc._json_release_c)["json"]).is_file()
+    # ... and are not orphaned as long as the export is cached in the site cache
+    assert dc._get_partly_cached() == []
+
+    # The read-only site cache is never modified
+    dc.delete("v1.0")
+    dc.cleanup()
+    assert (site / "v1.0" / dc._json_release).is_file()
+    assert (user / "v1.0" / dc._get_cache_filenames(dc._json_release_c)["json"]).is_file()
+
+
+def test_pickle_cache_trusted(tmp_path, monkeypatch):
+    "Test that pickled caches are only read from the writable cache root."
+    site, user = tmp_path / "site", tmp_path / "user"
+    (site / "v1.0").mkdir(parents=True)
+    (site / "v1.0" / dc._json_release).write_text('{"Data Request": {"a": 1}}')
+    calls = []
+
+    def mock_map_data(data, mapping_table, version, **kwargs):
+        calls.append(version)
+        return data
+
+    monkeypatch.setattr(dc.ce, "map_data", mock_map_data)
+    kwargs = dict(
+        consolidate=True, export="release", offline=True, memo_size=0, cache_format="pickle"
+    )
+    cache_filename = dc._get_cache_filenames(dc._json_release_c)["pickle"]
+
+    # Pickled caches of the writable cache root are reused
+    monkeypatch.setattr(dc, "_dreq_res", str(site))
+    dc.load("v1.0", **kwargs)
+    dc.load("v1.0", **kwargs)
+    assert calls == ["v1.0"]
+    assert dc._is_trusted(str(site / "v1.0" / cache_filename))
+
+    # ... but never those of read-only cache roots
+    monkeypatch.setattr(dc, "_dreq_res", str(user))
+    monkeypatch.setattr(dc, "_dreq_res_readonly", [str(site)])
+    assert not dc._is_trusted(str(site / "v1.0" / cache_filename))
+    with pytest.raises(ValueError, match="untrusted"):
+        dc._load_cache(str(site / "v1.0" / cache_filename), "pickle")
+    assert dc.load("v1.0", **kwargs) == {"Data Request": {"a": 1}}
+    assert calls == ["v1.0"] * 2
+    assert (user / "v1.0" / cache_filename).is_file()
+
+
+def test_evict(tmp_path, monkeypatch):
+    "Test the eviction of the least recently used versions beyond the cache budget."
+    dc._dreq_res = str(tmp_path)
+    for i, v in enumerate(["v1.2", "v1.0", "v1.1beta", "v1.1", "dev"]):
+        (tmp_path / v).mkdir()
+        (tmp_path / v / dc._json_release).write_text("x" * 100)
+        (tmp_path / v / dc._access_log).write_text(f'{{"{dc._json_release}": {i}}}')
+
+    usage = dc.get_cache_usage()
+    assert usage["v1.0"]["last_access"] == 1
+    assert usage["v1.0"]["artifacts"] == {dc._json_release: {"size": 100, "last_access": 1}}
+
+    # No budget - nothing is evicted
+    assert dc.evict(cache_max_size=0) == []
+
+    # The latest stable version (v1.2) and "dev" are never evicted,
+    #  nor versions explicitly kept
+    assert dc.evict(max_size=250, keep=["v1.1beta"], dryrun=True) == ["v1.0", "v1.1"]
+    assert len(os.listdir(tmp_path)) == 5
+    # A version whose lock is held elsewhere is in use, and is not evicted
+    locked, release = threading.Event(), threading.Event()
+
+    def hold_lock():
+        with file_lock(str(tmp_path / "v1.0" / (dc._json_release + ".lock"))):
+            locked.set()
+            release.wait()
+
+    holder = threading.Thread(target=hold_lock)
+    holder.start()
+    locked.wait()
+    try:
+        assert dc.evict(max_size=250, keep=["v1.1beta"]) == ["v1.1"]
+    finally:
+        release.set()
+        holder.join()
+    assert sorted(os.listdir(tmp_path)) == ["dev", "v1.0", "v1.1beta", "v1.2"]
+    assert dc.evict(max_size=250, keep=["v1.1beta"]) == ["v1.0"]
+    assert sorted(os.listdir(tmp_path)) == ["dev", "v1.1beta", "v1.2"]
+
+    # The budget is only enforced once files have been written to the cache
+    monkeypatch.setattr(dc, "_cache_updated", False)
+    dc._enforce_cache_budget(cache_max_size=1)
+    assert sorted(os.listdir(tmp_path)) == ["dev", "v1.1beta", "v1.2"]
+    dc._mark_cache_updated()
+    dc._enforce_cache_budget(cache_max_size=1)
+    assert sorted(os.listdir(tmp_path)) == ["dev", "v1.2"]
+    assert dc._cache_updated is False
+
+    # Accessing a version marks it as recently used
+    dc.retrieve("v1.2", offline=True)
+    assert dc._read_access_log(str(tmp_path / "v1.2"))[dc._json_release] > 4
+
+
+def test_bundle(tmp_path, monkeypatch):
+    "Test packing cached versions into a bundle, and using and importing the bundle."
+    from data_request_api.content import dump_transformation as dt
+    from data_request_api.content.dump_transformation import get_transformed_content
+    from data_request_api.utilities.tools import read_json_file
+
+    cache, bundle = tmp_path / "cache", str(tmp_path / "bundle.zip")
+    (cache / "v1.2").mkdir(parents=True)
+    (cache / "v1.2" / dc._json_release).write_text('{"Data Request": {"a": 1}}')
+    calls = []
+
+    def mock_map_data(data, mapping_table, version, **kwargs):
+        calls.append(version)
+        return data
+
+    monkeypatch.setattr(dc.ce, "map_data", mock_map_data)
+    monkeypatch.setattr(dt, "transform_content", lambda *args, **kwargs: ({"DR": 1}, {"VS": 1}))
+    kwargs = dict(
+        consolidate=True, export="release", offline=True, memo_size=0, cache_format="json"
+    )
+    monkeypatch.setattr(dc, "_dreq_res", str(cache))
+    dc.load("v1.2", **kwargs)
+    assert calls == ["v1.2"]
+    get_transformed_content("v1.2", export="release", consolidate=False, offline=True)
+
+    with pytest.raises(ValueError, match="not cached"):
+        dc.export_bundle(bundle, version=["v1.3"])
+    # Pickled caches do not travel in bundles
+    pickle_cache = dc._get_cache_filenames(dc._json_release_c)["pickle"]
+    (cache / "v1.2" / pickle_cache).write_bytes(b"pickled")
+    (cache / "v1.2" / "v1.2.lock").write_text("")
+    assert dc.export_bundle(bundle) == ["v1.2"]
+    assert dc.verify_bundle(bundle) == []
+    with dc.zipfile.ZipFile(bundle) as zf:
+        assert "v1.2/" + pickle_cache not in zf.namelist()
+        assert "v1.2/v1.2.lock" not in zf.namelist()
+
+    # Use the bundle directly as read-only cache root
+    monkeypatch.setattr(dc, "_dreq_res", str(tmp_path / "empty"))
+    monkeypatch.setattr(dc, "_dreq_res_readonly", [bundle])
+    assert dc.get_cached() == ["v1.2"]
+    assert dc.load("v1.2", **kwargs) == {"Data Request": {"a": 1}}
+    assert dc.load("v1.2", **dict(kwargs, consolidate=False)) == {"Data Request": {"a": 1}}
+    assert calls == ["v1.2"]
+    paths = get_transformed_content("v1.2", export="release", consolidate=False, offline=True)
+    assert paths["DR_input"] == os.path.join(bundle, "v1.2", dc._json_release_nc_DR)
+    assert read_json_file(paths["VS_input"]) == {"VS": 1}
+    assert not (tmp_path / "empty").exists()
+
+    # Import the bundle
+    monkeypatch.setattr(dc, "_dreq_res_readonly", [])
+    assert dc.import_bundle(bundle) == ["v1.2"]
+    assert dc.load("v1.2", **kwargs) == {"Data Request": {"a": 1}}
+    assert calls == ["v1.2"]
+
+    # Corrupt bundles are detected, and not used as cache root
+    with dc.zipfile.ZipFile(bundle, "a") as zf, pytest.warns(UserWarning, match="Duplicate"):
+        zf.writestr("v1.2/" + dc._json_release, "{}")
+    assert dc.verify_bundle(bundle) == ["v1.2/" + dc._json_release]
+    monkeypatch.setattr(dc, "_dreq_res", str(tmp_path / "other"))
+    monkeypatch.setattr(dc, "_dreq_res_readonly", [bundle])
+    assert dc._get_cache_roots() == [str(tmp_path / "other")]
+    assert dc.get_cached() == []
+
+
+@pytest.mark.parametrize(
+    "member",
+    [
+        "../v1.2/" + dc._json_release,
+        "/tmp/" + dc._json_release,
+        "v1.2/../../" + dc._json_release,
+        "v1.2/sub/" + dc._json_release,
+        "v1.2/notes.txt",
+        "v1.2/" + dc._get_cache_filenames(dc._json_release_c)["pickle"],
+        "v1.2/" + dc._get_cache_filenames(dc._json_release_c)["pickle.gz"],
+        "v1.2/dreq_release_consolidate.000.pkl",
+        dc._json_release,
+    ],
+)
+def test_bundle_invalid_members(tmp_path, monkeypatch, member):
+    "Test that bundles with members not named '<version>/<artifact>' are rejected."
+    cache, bundle = tmp_path / "cache", str(tmp_path / "bundle.zip")
+    manifest = {"files": {
+        "v1.2/" + dc._json_release: dc.hashlib.sha256(b"{}").hexdigest(),
+        member: dc.hashlib.sha256(b"{}").hexdigest(),
+    }}
+    with dc.zipfile.ZipFile(bundle, "w") as zf:
+        zf.writestr("v1.2/" + dc._json_release, "{}")
+        zf.writestr(member, "{}")
+        zf.writestr(dc._bundle_manifest, json.dumps(manifest))
+    monkeypatch.setattr(dc, "_dreq_res", str(cache / "root"))
+
+    assert dc.verify_bundle(bundle) == [member]
+    with pytest.raises(ValueError, match="Invalid member"):
+        dc.import_bundle(bundle)
+    # Nothing has been extracted
+    assert not cache.exists()
+
+
+def test_transformed_content_variants(tmp_path, monkeypatch):
+    "Test that transformed content is rebuilt when its inputs change, and that variants live side by side."
+    from data_request_api.content import dump_transformation as dt
+    from data_request_api.utilities.tools import read_json_file
+
+    (tmp_path / "v1.2").mkdir()
+    (tmp_path / "v1.2" / dc._json_release).write_text('{"Data Request": {"a": 1}}')
+    calls = []
+
+    def mock_transform_content(content, version, force_variable_name=False, variable_name=None):
+        calls.append((content["Data Request"]["a"], force_variable_name, variable_name))
+        return {"DR": variable_name if force_variable_name else None}, {"VS": 1}
+
+    monkeypatch.setattr(dc, "_dreq_res", str(tmp_path))
+    monkeypatch.setattr(dt, "transform_content", mock_transform_content)
+    kwargs = dict(export="release", consolidate=False, offline=True, memo_size=0)
+
+    paths = dt.get_transformed_content("v1.2", **kwargs)
+    assert paths["DR_input"] == str(tmp_path / "v1.2" / dc._json_release_nc_DR)
+    dt.get_transformed_content("v1.2", **kwargs)
+    assert [call[:2] for call in calls] == [(1, False)]
+
+    # Each forced variable name is a separate variant
+    for variable_name in ["CMIP6 Compound Name", "CMIP7 Compound Name", "CMIP6 Compound Name"]:
+        paths_forced = dt.get_transformed_content(
+            "v1.2", force_variable_name=True, variable_name=variable_name, **kwargs
+        )
+        assert read_json_file(paths_forced["DR_input"]) == {"DR": variable_name}
+    assert paths_forced["DR_input"] == str(
+        tmp_path / "v1.2" / "DR_release_not-consolidate_content.cmip6_compound_name.json"
+    )
+    assert len(calls) == 3
+    assert dc._list_variants(str(tmp_path / "v1.2"), dc._json_release_nc_VS) == [
+        "VS_release_not-consolidate_content.cmip6_compound_name.json",
+        "VS_release_not-consolidate_content.cmip7_compound_name.json",
+    ]
+    assert read_json_file(paths["DR_input"]) == {"DR": None}
+
+    # A changed source export invalidates the transformed content
+    (tmp_path / "v1.2" / dc._json_release).write_text('{"Data Request": {"a": 2}}')
+    dt.get_transformed_content("v1.2", **kwargs)
+    assert calls[-1][:2] == (2, False)
+    assert len(calls) == 4
+
+    # Variants are removed with the other derived files once the source export is gone
+    (tmp_path / "v1.2" / dc._json_release).unlink()
+    dc.cleanup(export="release")
+    assert dc._list_variants(str(tmp_path / "v1.2"), dc._json_release_nc_DR) == []
+
+
+def test_transform_versions(tmp_path, monkeypatch):
+    "Test transforming several versions, a failing version not affecting the others."
+    from data_request_api.content import dump_transformation as dt
+
+    for v, content in [("v1.2", '{"Data Request": {"a": 1}}'), ("v1.1", '{"Data Request": {"a": 0}}')]:
+        (tmp_path / v).mkdir()
+        (tmp_path / v / dc._json_release).write_text(content)
+
+    def mock_transform_content(content, version, **kwargs):
+        if content["Data Request"]["a"] == 0:
+            raise ValueError("Invalid content")
+        return {"DR": 1}, {"VS": 1}
+
+    monkeypatch.setattr(dc, "_dreq_res", str(tmp_path))
+    monkeypatch.setattr(dt, "transform_content", mock_transform_content)
+    results = dt.transform_versions(["v1.2", "v1.1"], exports=["release"], workers=1, consolidate=False,
+                                    offline=True, memo_size=0)
+    assert [(r["version"], r["export"], r["status"]) for r in results] == [
+        ("v1.2", "release", "ok"),
+        ("v1.1", "release", "failed"),
+    ]
+    assert results[0]["DR_input"] == str(tmp_path / "v1.2" / dc._json_release_nc_DR)
+    assert results[1]["error"] == "ValueError: Invalid content"
+    assert all(r["time"] >= 0 for r in results)
+
+    # Transform in a process pool, in a dedicated output directory
+    results = dt.transform_versions(["v1.2", "v1.1"], exports=["release"], workers=2, consolidate=False,
+                                    offline=True, memo_size=0, output_dir=str(tmp_path / "output"))
+    assert [(r["version"], r["export"]) for r in results] == [("v1.2", "release"), ("v1.1", "release")]
+    assert results[0]["DR_input"] == str(tmp_path / "output" / "v1.2" / dc._json_release_nc_DR)
+
+    # A single version is written directly to the output directory
+    results = dt.transform_versions("v1.2", exports=["release"], workers=2, consolidate=False,
+                                    offline=True, memo_size=0, output_dir=str(tmp_path / "single"))
+    assert results[0]["DR_input"] == str(tmp_path / "single" / dc._json_release_nc_DR)
+
+    # The transformations are done offline, unless requested otherwise
+    offline = []
+
+    def mock_transform_version(version, export, **kwargs):
+        offline.append(kwargs["offline"])
+        return dict(version=version, export=export, status="ok", time=0.)
+
+    monkeypatch.setattr(dc, "prefetch", lambda version, exports, **kwargs: {"release": {"v1.2": None}})
+    monkeypatch.setattr(dt, "_transform_version", mock_transform_version)
+    dt.transform_versions("v1.2", workers=1)
+    dt.transform_versions("v1.2", workers=1, offline=False)
+    assert offline == [True, False]
+
+
 class TestDreqContent:
     """
     Test various functions of the dreq_content module.
@@ -353,7 +1225,7 @@ class TestDreqContent:
         def mock_requests_get(*args, **kwargs):
             raise Exception("Network request detected despite active offline mode.")
 
-        monkeypatch.setattr("requests.get", mock_requests_get)
+        monkeypatch.setattr("requests.Session.request", mock_requests_get)
 
         # Call dc.load with offline=True
         dc.load("v1.0.0", consolidate=False, offline=True)
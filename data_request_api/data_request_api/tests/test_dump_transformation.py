@@ -8,10 +8,14 @@ from __future__ import print_function, division, unicode_literals, absolute_impo
 
 import copy
 import unittest
+from unittest import mock
+from concurrent.futures import ThreadPoolExecutor
 
 from data_request_api.utilities.tools import read_json_file, write_json_output_file_content
 from data_request_api.content.dump_transformation import correct_key_string, correct_dictionaries, \
-    transform_content_inner, transform_content, split_content_one_base, get_transform_settings
+    transform_content_inner, transform_content, split_content_one_base, get_transform_settings, \
+    remove_unused_keys, copy_useful_keys, rename_useful_keys, merge_useful_keys, _get_record_operations, \
+    _apply_record_operations, _resolve_transform_settings, _load_transform
 from data_request_api.tests import filepath
 
 
@@ -65,6 +69,19 @@ class TestCorrectDictionaries(unittest.TestCase):
         }
         self.assertDictEqual(correct_dictionaries(dict_2), new_dict_2)
 
+    def test_no_shared_containers(self):
+        # Lists are copied (not deep copied), so that changing the corrected dictionary does not
+        # change the input one
+        dict_1 = {"Test1": ["dummy1", "dummy2"], "Test2": [{"Test3": "dummy3"}]}
+        new_dict_1 = correct_dictionaries(dict_1)
+        new_dict_1["test1"].remove("dummy1")
+        new_dict_1["test2"][0]["Test3"] = "dummy4"
+        self.assertDictEqual(dict_1, {"Test1": ["dummy1", "dummy2"], "Test2": [{"Test3": "dummy3"}]})
+        self.assertIs(new_dict_1["test1"][0], dict_1["Test1"][1])
+
+        with self.assertRaises(TypeError):
+            correct_dictionaries({4: "dummy"})
+
     def test_error(self):
         with self.assertRaises(TypeError):
             correct_dictionaries(4)
@@ -76,6 +93,32 @@ class TestCorrectDictionaries(unittest.TestCase):
             correct_dictionaries("test")
 
 
+class TestTransformSettings(unittest.TestCase):
+    def test_memoised(self):
+        settings = get_transform_settings("v1.2.1")
+        self.assertIs(get_transform_settings("v1.2.1"), settings)
+        self.assertDictEqual(settings, _resolve_transform_settings("v1.2.1"))
+        self.assertDictEqual(settings["one_to_transform"]["keys_to_copy"],
+                             {"variables": {"cmip6_compound_name": "name"}})
+
+    def test_error(self):
+        transform = copy.deepcopy(_load_transform())
+        invalid_transforms = list()
+        for (key, value) in [("keys_to_sort", {"variables": "name"}),
+                             ("keys_to_rename", {"variables": {"(name": "label"}}),
+                             ("keys_to_format", {"to_string": {}}),
+                             ("keys_to_dump", {})]:
+            invalid_transform = copy.deepcopy(transform)
+            invalid_transform["common"]["v1.2"][key] = value
+            invalid_transforms.append(invalid_transform)
+        for invalid_transform in invalid_transforms:
+            with mock.patch("data_request_api.content.dump_transformation._transform", None), \
+                    mock.patch("data_request_api.content.dump_transformation.read_json_input_file_content",
+                               return_value=invalid_transform):
+                with self.assertRaises(ValueError):
+                    _load_transform()
+
+
 class TestTransformContent(unittest.TestCase):
     def setUp(self):
         self.version = "test"
@@ -127,6 +170,37 @@ class TestTransformContent(unittest.TestCase):
         self.assertDictEqual(DR_output, self.several_bases_DR_output)
         self.assertDictEqual(VS_output, self.several_bases_VS_output)
 
+    def test_concurrent_transformations(self):
+        # Default names are generated per transformation, so concurrent transformations give
+        # the same results as sequential ones
+        inputs = [self.several_bases_input, self.one_base_input] * 2
+        with ThreadPoolExecutor(max_workers=len(inputs)) as pool:
+            outputs = list(pool.map(lambda content: transform_content(copy.deepcopy(content), version=self.version),
+                                    inputs))
+        for (DR_output, VS_output) in outputs[::2]:
+            self.assertDictEqual(DR_output, self.several_bases_DR_output)
+            self.assertDictEqual(VS_output, self.several_bases_VS_output)
+        for (DR_output, VS_output) in outputs[1::2]:
+            self.assertDictEqual(DR_output, self.one_base_DR_output)
+            self.assertDictEqual(VS_output, self.one_base_VS_output)
+
+    def test_record_operations(self):
+        # The compiled operations, applied in a single traversal, give the same results as the
+        # successive passes over the tables
+        settings = get_transform_settings(self.version)["one_to_transform"]
+        content = correct_dictionaries(self.one_base_input)
+        content = content[list(content)[0]]
+        expected = remove_unused_keys(content=copy.deepcopy(content), per_entry_input=settings["keys_to_delete"],
+                                      default_patterns_to_remove=settings["default_keys_to_delete"])
+        expected = copy_useful_keys(content=expected, per_entry_input=settings["keys_to_copy"])
+        expected = rename_useful_keys(content=expected, per_entry_input=settings["keys_to_rename"])
+        expected = merge_useful_keys(content=expected, per_entry_input=settings["keys_to_merge"])
+        operations = _get_record_operations(settings)
+        self.assertIs(operations, _get_record_operations(copy.deepcopy(settings)))
+        output = {table: value["records"] for (table, value) in copy.deepcopy(content).items()}
+        _apply_record_operations(output, operations["before_filter"])
+        self.assertDictEqual(output, expected)
+
     def test_transform_inner_error(self):
         with self.assertRaises(TypeError):
             transform_content_inner(self.several_bases_input)
@@ -11,7 +11,7 @@ import unittest
 
 from data_request_api.utilities.tools import read_json_input_file_content
 from data_request_api.query.vocabulary_server import VocabularyServer, is_link_id_or_value, build_link_from_id, \
-    to_plural, to_singular
+    to_plural, to_singular, parse_compound_name
 from data_request_api.tests import filepath
 
 
@@ -47,6 +47,20 @@ class TestChangeNumber(unittest.TestCase):
         self.assertEqual(to_plural("variables_group"), "variables_groups")
 
 
+class TestCompoundNames(unittest.TestCase):
+
+    def test_parse_compound_name(self):
+        self.assertDictEqual(parse_compound_name("ocean.tos.tavg-u-hxy-sea.mon.glb"),
+                             dict(realm="ocean", variable_root="tos", branding="tavg-u-hxy-sea", frequency="mon",
+                                  region="glb"))
+        self.assertDictEqual(parse_compound_name("Omon.tos", kind="cmip6_compound_name"),
+                             dict(cmip6_table="Omon", cmip6_variable="tos"))
+        self.assertDictEqual(parse_compound_name("tos_tavg-u-hxy-sea", kind="branded_variable_name"),
+                             dict(variable_root="tos", branding="tavg-u-hxy-sea"))
+        self.assertIsNone(parse_compound_name("ocean.tos.mon.glb"))
+        self.assertIsNone(parse_compound_name(None))
+
+
 class TestVocabularyServer(unittest.TestCase):
     def setUp(self):
         self.vs_file = filepath("VS_release_not-consolidate_content.json")
@@ -166,3 +180,58 @@ class TestVocabularyServer(unittest.TestCase):
 
         with self.assertRaises(ValueError):
             obj = vs.get_element(element_type="mips", element_id="link::TIPMIP", element_key="long_name")
+
+    def test_search(self):
+        vs = VocabularyServer.from_input(self.vs_file)
+        self.assertIsNone(vs.search_index)
+
+        results = vs.search("Sea Ice thickness")
+        self.assertIsNotNone(vs.search_index)
+        self.assertEqual(results[0][:2], ("physical_parameters", "591321f8-9e49-11e5-803c-0d0b866b59f3"))
+        self.assertIn(("variables", "seaIce.sithick.tavg-u-hxy-si.mon.glb"), [result[:2] for result in results])
+        self.assertEqual([result[2] for result in results], sorted([result[2] for result in results], reverse=True))
+
+        self.assertEqual(vs.search("sea ice thickness", element_types=["variable", ], limit=1),
+                         results[2:3])
+        self.assertEqual(vs.search("sea ice thickness", limit=2), results[:2])
+        self.assertEqual(vs.search("sea ice unknownword"), list())
+        self.assertEqual(vs.search(" "), list())
+
+    def test_get_suggestions(self):
+        vs = VocabularyServer.from_input(self.vs_file)
+        self.assertEqual(vs.get_suggestions("experiments", "historic"), ["historical", ])
+        self.assertEqual(vs.get_suggestions("mips", "tipmp", limit=1), ["TIPMIP", ])
+        self.assertEqual(vs.get_suggestions("mips", "TIPMIP", id_type="id", limit=1), ["TIPMIP", ])
+        self.assertEqual(vs.get_suggestions("mips", "zzzz"), list())
+        self.assertEqual(len(vs.get_suggestions("variables", "seaIce.sithick", limit=3)), 3)
+
+        with self.assertRaisesRegex(ValueError, "Did you mean: historical?"):
+            vs.get_element(element_type="experiments", element_id="historic", id_type="name")
+
+    def test_variables_index(self):
+        vs = VocabularyServer.from_input(self.vs_file)
+        self.assertIsNone(vs.variables_index)
+        self.assertEqual(vs.get_variables_per_facets("seaIce.sithick.*"),
+                         ["seaIce.sithick.tavg-u-hxy-si.day.glb", "seaIce.sithick.tavg-u-hxy-si.mon.glb"])
+        self.assertIsNotNone(vs.variables_index)
+        ocean_monthly = vs.get_variables_per_facets("ocean.*.mon.*")
+        self.assertEqual(ocean_monthly, vs.get_variables_per_facets(realm="ocean", frequency="mon"))
+        self.assertEqual(ocean_monthly, vs.get_variables_per_facets("ocean.*.*.mon.*"))
+        self.assertIn("ocean.tos.tavg-u-hxy-sea.mon.glb", ocean_monthly)
+        self.assertEqual(vs.get_variables_per_facets(branding="tavg-u-hxy-sea", frequency="mon", variable_root="to*"),
+                         ["ocean.tos.tavg-u-hxy-sea.mon.glb", ])
+        self.assertEqual(vs.get_variables_per_facets(cmip6_table="SIday", variable_root=["sithick", "siconc"]),
+                         ["seaIce.siconc.tavg-u-hxy-u.day.glb", "seaIce.sithick.tavg-u-hxy-si.day.glb"])
+        self.assertEqual(vs.get_variables_per_facets(frequency="undef"), list())
+        self.assertEqual(len(vs.get_variables_per_facets()), 106)
+        with self.assertRaises(ValueError):
+            vs.get_variables_per_facets(experiment="historical")
+        with self.assertRaises(ValueError):
+            vs.get_variables_per_facets("ocean.*.*.mon.*", realm="seaIce")
+
+        counts = vs.get_facet_counts("frequency")
+        self.assertEqual(sum(counts.values()), 106)
+        self.assertEqual(counts["mon"], 38)
+        self.assertDictEqual(vs.get_facet_counts("realm", frequency="*hr"), {"atmos": 16, "land": 6, "ocean": 4})
+        self.assertEqual(vs.get_facet_counts("realm", "ocean.*.mon.*"), {"ocean": len(ocean_monthly)})
+
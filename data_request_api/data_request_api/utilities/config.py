@@ -23,6 +23,11 @@ DEFAULT_CONFIG = {
     "cache_dir": str(Path.home() / f".{PACKAGE_NAME}_cache"),
     "check_api_version": True,
     "variable_name": "CMIP7 Compound Name",
+    "versions_ttl": 3600,
+    "cache_format": "json",
+    "memo_size": 2,
+    "cache_max_size": 0,
+    "consolidation_workers": 1,
 }
 
 # Valid types and values for each key
@@ -35,6 +40,11 @@ DEFAULT_CONFIG_TYPES = {
     "cache_dir": str,
     "check_api_version": bool,
     "variable_name": str,
+    "versions_ttl": int,
+    "cache_format": str,
+    "memo_size": int,
+    "cache_max_size": int,
+    "consolidation_workers": int,
 }
 
 # Valid types and values for each key
@@ -44,14 +54,28 @@ DEFAULT_CONFIG_HELP = {
     "consolidate": "Should consolidation be done?",
     "log_level": "Log level to use",
     "log_file": "Log file to use",
-    "cache_dir": "Cache directory to use",
+    "cache_dir": "Cache directory to use (or several, separated by os.pathsep, with read-only caches first)",
     "check_api_version": "Check pypi for the latest API version?",
     "variable_name": "Unique identifier to use for requested variables",
+    "versions_ttl": "Time (in seconds) after which the cached list of versions is refreshed",
+    "cache_format": "Format of the cached consolidated content (i.e. json, pickle or pickle.gz)",
+    "memo_size": "Maximum number of loaded versions kept in memory (0 to disable)",
+    "cache_max_size": "Cache budget (in bytes) beyond which the least recently used versions are evicted (0 for no limit)",
+    "consolidation_workers": "Number of processes mapping the tables of raw exports in parallel (0 for one per CPU)",
 }
 
 DEFAULT_CONFIG_VALID_VALUES = {
     "export": ["release", "raw"],
     "log_level": ["debug", "info", "warning", "error", "critical"],
+    "cache_format": ["json", "pickle", "pickle.gz"],
+}
+
+# Minimum values of numeric config keys
+DEFAULT_CONFIG_MIN_VALUES = {
+    "versions_ttl": 0,
+    "memo_size": 0,
+    "cache_max_size": 0,
+    "consolidation_workers": 0,
 }
 
 # Global variable to hold the loaded config
@@ -64,7 +88,9 @@ def _sanity_check(key, value):
         raise KeyError(
             f"Invalid config key: {key}. Valid keys: {sorted(list(DEFAULT_CONFIG.keys()))}"
         )
-    if not isinstance(value, DEFAULT_CONFIG_TYPES[key]):
+    if not isinstance(value, DEFAULT_CONFIG_TYPES[key]) or (
+        DEFAULT_CONFIG_TYPES[key] is int and isinstance(value, bool)
+    ):
         raise TypeError(
             f"Invalid type for config key {key}: {type(value)}. Expected type {DEFAULT_CONFIG_TYPES[key]}"
         )
@@ -75,6 +101,10 @@ def _sanity_check(key, value):
         raise ValueError(
             f"Invalid value for config key {key}: {value}. Valid values: {DEFAULT_CONFIG_VALID_VALUES[key]}"
         )
+    if key in DEFAULT_CONFIG_MIN_VALUES and value < DEFAULT_CONFIG_MIN_VALUES[key]:
+        raise ValueError(
+            f"Invalid value for config key {key}: {value}. Must be at least {DEFAULT_CONFIG_MIN_VALUES[key]}"
+        )
 
 
 def load_config() -> dict:
@@ -126,7 +156,8 @@ def update_config(key, value):
     Args:
         key (str): The configuration key to update.
         value (Any): The new value for the configuration key. Boolean-like strings
-                     ("true", "false") will be converted to actual booleans.
+                     ("true", "false") will be converted to actual booleans, and
+                     integer-like strings to integers for integer-valued keys.
 
     Raises:
         KeyError: If the key is not in the DEFAULT_CONFIG.
@@ -145,6 +176,11 @@ def update_config(key, value):
     value = str(value)
     if value.lower() in {"true", "false"}:
         value = value.lower() == "true"
+    elif DEFAULT_CONFIG_TYPES.get(key) is int:
+        try:
+            value = int(value)
+        except ValueError:
+            pass
     _sanity_check(key, value)
 
     # Overwrite / set the value
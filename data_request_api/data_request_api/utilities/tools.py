@@ -6,17 +6,99 @@ Tools for data request.
 """
 from __future__ import division, absolute_import, print_function, unicode_literals
 
+import hashlib
+import io
 import json
 import os
 import csv
+import threading
+import zipfile
+from contextlib import contextmanager
 
 from data_request_api.utilities.logger import get_logger
 
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+# Lock files held by the current thread (to make file_lock reentrant)
+_held_locks = threading.local()
+
+# Members of the zip archives accessed so far - keyed by archive path, stored with the
+#  archive modification time they are valid for
+_archive_members = dict()
+
+
+def split_archive_path(filename):
+    """
+    Split a path pointing into a zip archive (eg. "bundle.zip/v1.2/file.json") into the
+    path of the archive and the name of the archive member.
+
+    :param str filename: path to split
+    :return: tuple (archive path, member name), archive path being None if the path
+             does not point into a zip archive
+    """
+    parts = os.path.normpath(filename).split(os.sep)
+    for i in range(len(parts) - 1, 0, -1):
+        archive = os.sep.join(parts[:i])
+        if archive.endswith(".zip") and os.path.isfile(archive):
+            return archive, "/".join(parts[i:])
+    return None, filename
+
+
+def list_archive(archive):
+    """
+    List the members of a zip archive.
+
+    :param str archive: path of the zip archive
+    :return: set of member names
+    """
+    mtime = os.stat(archive).st_mtime_ns
+    if archive not in _archive_members or _archive_members[archive][0] != mtime:
+        with zipfile.ZipFile(archive) as zfic:
+            _archive_members[archive] = (mtime, set(zfic.namelist()))
+    return _archive_members[archive][1]
+
+
+def is_file(filename):
+    """
+    Check whether a file exists, either on disk or as member of a zip archive.
+
+    :param str filename: path of the file (see split_archive_path)
+    :return: bool
+    """
+    if os.path.isfile(filename):
+        return True
+    archive, member = split_archive_path(filename)
+    return archive is not None and member in list_archive(archive)
+
+
+def open_file(filename, mode="r"):
+    """
+    Open a file for reading, either on disk or as member of a zip archive.
+
+    :param str filename: path of the file (see split_archive_path)
+    :param str mode: "r" (text) or "rb" (binary)
+    :return: file object
+    """
+    archive, member = split_archive_path(filename)
+    if archive is None:
+        return open(filename, mode)
+    # The member stays readable after the archive is closed
+    with zipfile.ZipFile(archive) as zfic:
+        fic = zfic.open(member)
+    if mode == "rb":
+        return fic
+    return io.TextIOWrapper(fic, encoding="utf-8")
+
 
 def read_json_file(filename):
     logger = get_logger()
-    if os.path.isfile(filename):
-        with open(filename, "r") as fic:
+    if is_file(filename):
+        with open_file(filename, "r") as fic:
             content = json.load(fic)
     else:
         logger.error(f"Filename {filename} is not readable")
@@ -24,6 +106,105 @@ def read_json_file(filename):
     return content
 
 
+class _JSONStream(object):
+    """
+    Buffered reader of a JSON text file decoding one value at a time.
+    """
+
+    def __init__(self, fic, chunk_size):
+        self.fic = fic
+        self.chunk_size = chunk_size
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def _fill(self, size):
+        chunk = self.fic.read(size)
+        self.eof = not chunk
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+
+    def peek(self):
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos].isspace():
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if self.eof:
+                raise ValueError("Unexpected end of JSON file")
+            self._fill(self.chunk_size)
+
+    def expect(self, chars):
+        char = self.peek()
+        if char not in chars:
+            raise ValueError(f"Expected one of {list(chars)} in JSON file, found {char!r}")
+        self.pos += 1
+        return char
+
+    def value(self, hasher=None):
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+                # A number at the end of the buffer may continue in the next chunk
+                if end < len(self.buffer) or self.eof:
+                    if hasher is not None:
+                        hasher.update(self.buffer[self.pos:end].encode())
+                    self.pos = end
+                    return value
+            except ValueError:
+                if self.eof:
+                    raise
+            # Grow the buffer geometrically, so that large values are decoded
+            #  a bounded number of times
+            self._fill(max(self.chunk_size, len(self.buffer) - self.pos))
+
+
+def iter_json_items(fic, chunk_size=1024 * 1024, digests=None):
+    """
+    Iterate over the entries of the objects nested in a JSON object (eg. the tables of the
+    bases of an Airtable export), decoding one entry at a time. Unlike json.load, only
+    the entry being decoded needs to fit in memory besides the entries kept by the caller.
+
+    :param fic: file object (text mode) of the JSON file
+    :param int chunk_size: number of characters read at once
+    :param dict digests: if provided, filled with the sha256 hex digests of the JSON text
+                         of the nested entries, keyed by (key, subkey)
+    :return: iterator of tuples (key, subkey, value) - for top-level values that are
+             not objects or empty objects, subkey is None and value is the whole value
+    """
+    stream = _JSONStream(fic, chunk_size)
+    stream.expect("{")
+    if stream.peek() == "}":
+        return
+    while True:
+        key = stream.value()
+        stream.expect(":")
+        if stream.peek() != "{":
+            yield key, None, stream.value()
+        else:
+            stream.expect("{")
+            if stream.peek() == "}":
+                stream.expect("}")
+                yield key, None, dict()
+            else:
+                while True:
+                    subkey = stream.value()
+                    stream.expect(":")
+                    if digests is None:
+                        yield key, subkey, stream.value()
+                    else:
+                        hasher = hashlib.sha256()
+                        value = stream.value(hasher)
+                        digests[key, subkey] = hasher.hexdigest()
+                        yield key, subkey, value
+                    if stream.expect(",}") == "}":
+                        break
+        if stream.expect(",}") == "}":
+            return
+
+
 def read_json_input_file_content(filename):
     content = read_json_file(filename)
     return content
@@ -36,10 +217,70 @@ def write_json_output_file_content(filename, content, **kwargs):
     if len(dirname) > 0 and not os.path.isdir(dirname):
         logger.warning(f"Create directory {dirname}")
         os.makedirs(dirname)
-    with open(filename, "w") as fic:
-        defaults = dict(indent=4, allow_nan=True, sort_keys=True)
-        defaults.update(kwargs)
-        json.dump(content, fic, **defaults)
+    # Write to a temporary file first, so that concurrent readers never see a partly written file
+    tmp_filename = f"{filename}.{os.getpid()}.{threading.get_ident()}.part"
+    try:
+        with open(tmp_filename, "w") as fic:
+            defaults = dict(indent=4, allow_nan=True, sort_keys=True)
+            defaults.update(kwargs)
+            json.dump(content, fic, **defaults)
+        os.replace(tmp_filename, filename)
+    finally:
+        if os.path.exists(tmp_filename):
+            os.remove(tmp_filename)
+
+
+@contextmanager
+def file_lock(lock_filename, blocking=True):
+    """
+    Context manager holding an exclusive advisory lock on a lock file.
+
+    The lock is shared between processes (also on different nodes, as far as the
+    filesystem supports it) and threads. It is reentrant for the thread holding it.
+    The lock file is created if needed and never removed.
+
+    :param str lock_filename: path of the lock file
+    :param bool blocking: whether to wait for the lock if it is held by someone else,
+                          else BlockingIOError is raised
+    """
+    held = getattr(_held_locks, "paths", None)
+    if held is None:
+        held = _held_locks.paths = set()
+    lock_filename = os.path.abspath(lock_filename)
+    if lock_filename in held:
+        yield
+        return
+    dirname = os.path.dirname(lock_filename)
+    if not os.path.isdir(dirname):
+        os.makedirs(dirname, exist_ok=True)
+    with open(lock_filename, "a+") as fic:
+        if fcntl is not None:
+            fcntl.flock(fic.fileno(), fcntl.LOCK_EX if blocking else (fcntl.LOCK_EX | fcntl.LOCK_NB))
+        elif not blocking:
+            fic.seek(0)
+            try:
+                msvcrt.locking(fic.fileno(), msvcrt.LK_NBLCK, 1)
+            except OSError:
+                raise BlockingIOError(f"The lock {lock_filename} is held.")
+        else:
+            fic.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(fic.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    # LK_LOCK gives up after 10 seconds - keep waiting
+                    pass
+        held.add(lock_filename)
+        try:
+            yield
+        finally:
+            held.discard(lock_filename)
+            if fcntl is not None:
+                fcntl.flock(fic.fileno(), fcntl.LOCK_UN)
+            else:
+                fic.seek(0)
+                msvcrt.locking(fic.fileno(), msvcrt.LK_UNLCK, 1)
 
 
 def write_csv_output_file_content(filename, content, **kwargs):
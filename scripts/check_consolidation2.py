@@ -4,6 +4,7 @@ from collections import defaultdict
 
 import data_request_api.content.consolidate_export as ce
 import data_request_api.content.dreq_content as dc
+from data_request_api.content.mapping_table import mapping_table
 from data_request_api.utilities.logger import (
     change_log_file,
     change_log_level,
@@ -91,6 +92,10 @@ dreqraw = dc.load(
     offline=offlineRAW,
     force_consolidate=True,
 )
+# Records filtered when consolidating the raw export
+filtered_records = ce.get_filtered_records(
+    dc.load(version, export="raw", consolidate=False, offline=True), mapping_table
+)
 if long_summary:
     print(f"{code}")
     if code:
@@ -128,7 +133,7 @@ def compare_dicts(raw, rel):
     print()
     rid_uid_map_raw = ce._gen_rid_uid_map(raw["Data Request"])
     rid_uid_map_rel = ce._gen_rid_uid_map(rel["Data Request"])
-    print(f"- {len(ce.filtered_records)} filtered records")
+    print(f"- {len(filtered_records)} filtered records")
     print(
         f"- {len(rid_uid_map_raw.keys())} rid->UID mapping entries (raw export)"
     )
@@ -279,7 +284,7 @@ def compare_dicts(raw, rel):
                             [
                                 rid
                                 for rid in rawrec[fld]
-                                if rid not in ce.filtered_records
+                                if rid not in filtered_records
                             ]
                         ) < len(rawrec[fld]):
                             diff_rec_count[table_i][fld]["unfiltered"] += 1
@@ -289,7 +294,7 @@ def compare_dicts(raw, rel):
                                 [
                                     rid
                                     for rid in rawrec[fld]
-                                    if rid not in ce.filtered_records
+                                    if rid not in filtered_records
                                 ]
                             )
                     if len(rawuids) == len(reluids):
@@ -6,6 +6,7 @@ from collections import defaultdict
 import data_request_api.content.consolidate_export as ce
 import data_request_api.content.dreq_content as dc
 import data_request_api.content.dump_transformation as dtrans
+from data_request_api.content.mapping_table import mapping_table
 from data_request_api.utilities.logger import (
     change_log_file,
     change_log_level,
@@ -97,6 +98,10 @@ dreqraw = dc.load(
     offline=offlineRAW,
     force_consolidate=True,
 )
+# Records filtered when consolidating the raw export
+filtered_records = ce.get_filtered_records(
+    dc.load(version, export="raw", consolidate=False, offline=True), mapping_table
+)
 if long_summary:
     print(f"{code}")
     if code:
@@ -327,7 +332,7 @@ def compare_dicts(raw, rel):
                             [
                                 rid
                                 for rid in rawrec[fld]
-                                if rid not in ce.filtered_records
+                                if rid not in filtered_records
                             ]
                         ) < len(rawrec[fld]):
                             diff_rec_count[table_i][fld]["unfiltered"] += 1
@@ -337,7 +342,7 @@ def compare_dicts(raw, rel):
                                 [
                                     rid
                                     for rid in rawrec[fld]
-                                    if rid not in ce.filtered_records
+                                    if rid not in filtered_records
                                 ]
                             )
                     if len(rawuids) == len(reluids):